@@ -0,0 +1,117 @@
+"""
+Adaptive sampling interval.
+
+The next interval is picked from how close each alert metric is to its
+threshold and how fast it is moving towards it: flat metrics far from their
+limits back off gradually to max_interval, while a metric trending towards a
+limit (or already past it) tightens sampling immediately, down to
+min_interval. On top of that the agent's own CPU use is held to a hard budget:
+the interval never drops below (CPU seconds per cycle / cpu_budget).
+"""
+import time
+import logging
+from typing import Dict, Optional
+
+from instrumentation import registry as instrumentation
+
+logger = logging.getLogger(__name__)
+
+# A metric this far below its threshold (as a fraction of the threshold) counts as idle
+FAR_MARGIN = 0.5
+# Sample at least this many times before a rising metric is projected to cross its threshold
+SAMPLES_BEFORE_CROSSING = 4
+# Growth factor per cycle when backing off; tightening is immediate
+BACKOFF_FACTOR = 1.5
+
+
+class AdaptiveScheduler:
+    def __init__(self, thresholds: Dict[str, float], min_interval: float = 0.5, max_interval: float = 60.0,
+                 cpu_budget: float = 0.02, smoothing: float = 0.3):
+        self.thresholds = thresholds
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cpu_budget = cpu_budget
+        self.smoothing = smoothing
+        self.interval = min_interval
+        self.reason = 'startup'
+        self._last_values: Dict[str, float] = {}
+        self._slopes: Dict[str, float] = {}
+        self._last_wall: Optional[float] = None
+        self._last_cpu: Optional[float] = None
+        self._cycle_cpu: Optional[float] = None
+
+    def _update_cost(self):
+        cpu = time.process_time()
+        if self._last_cpu is not None:
+            spent = cpu - self._last_cpu
+            self._cycle_cpu = spent if self._cycle_cpu is None else \
+                self.smoothing * spent + (1 - self.smoothing) * self._cycle_cpu
+        self._last_cpu = cpu
+
+    def _metric_interval(self, name: str, value: float, elapsed: Optional[float]) -> float:
+        threshold = self.thresholds[name]
+        previous = self._last_values.get(name)
+        if previous is not None and elapsed:
+            slope = (value - previous) / elapsed
+            old = self._slopes.get(name)
+            self._slopes[name] = slope if old is None else self.smoothing * slope + (1 - self.smoothing) * old
+        self._last_values[name] = value
+
+        headroom = threshold - value
+        if headroom <= 0:
+            return self.min_interval
+
+        # Far from the limit -> long interval, close -> short
+        margin = min(1.0, headroom / (threshold * FAR_MARGIN))
+        interval = self.min_interval + (self.max_interval - self.min_interval) * margin
+
+        slope = self._slopes.get(name, 0.0)
+        if slope > 0:
+            time_to_threshold = headroom / slope
+            interval = min(interval, time_to_threshold / SAMPLES_BEFORE_CROSSING)
+        return interval
+
+    def observe(self, values: Dict[str, float], now: Optional[float] = None) -> float:
+        """Feed the latest alert metrics (name -> value) and get the seconds until the next sample"""
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._last_wall if self._last_wall is not None else None
+        self._last_wall = now
+        self._update_cost()
+
+        desired, reason = self.max_interval, 'idle'
+        for name, value in values.items():
+            if name not in self.thresholds or value is None:
+                continue
+            interval = self._metric_interval(name, value, elapsed)
+            if interval < desired:
+                desired, reason = interval, name
+
+        # Tighten at once, relax gradually so one quiet sample doesn't jump straight to max_interval
+        if desired > self.interval:
+            desired = min(desired, self.interval * BACKOFF_FACTOR)
+        interval = max(self.min_interval, min(self.max_interval, desired))
+
+        if self.cpu_budget and self._cycle_cpu:
+            floor = self._cycle_cpu / self.cpu_budget
+            if floor > interval:
+                interval, reason = floor, 'cpu_budget'
+                instrumentation.increment('scheduler.budget_limited')
+
+        if reason != self.reason:
+            logger.debug(f"Sampling interval {interval:.2f}s ({reason})")
+        self.interval, self.reason = interval, reason
+        return interval
+
+    def cpu_fraction(self) -> Optional[float]:
+        """Smoothed agent CPU seconds per wall second at the current interval"""
+        if self._cycle_cpu is None or not self.interval:
+            return None
+        return self._cycle_cpu / self.interval
+
+    def stats(self) -> Dict:
+        return {
+            'interval': self.interval,
+            'reason': self.reason,
+            'cycle_cpu_seconds': self._cycle_cpu,
+            'cpu_budget': self.cpu_budget
+        }
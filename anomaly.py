@@ -0,0 +1,185 @@
+"""
+Streaming anomaly detection over performance samples.
+
+Every percent gauge (cpu.percent, memory.percent, disk.percent:<mount>, ...)
+and every CPU core is tracked with O(1) state: a slow EWMA mean and variance
+(the baseline) plus a fast EWMA mean (the current level). Each sample is
+checked for:
+
+    outlier      |value - baseline| / baseline std above z_threshold
+    level shift  fast mean held shift_sigmas baseline stds (and at least
+                 min_shift points) away from the baseline for shift_samples
+                 samples; reported until the baseline catches up
+    imbalance    one core at least imbalance_gap points above the mean of all
+                 cores for imbalance_samples consecutive samples, e.g. a core
+                 pinned at 100% while overall usage reads 20%
+
+Series are updated in bulk: one pass over flat per-series lists per sample,
+so all cores cost one loop and no per-core objects. Outliers move the
+baseline mean by a clipped step but never its variance, so a spike can't
+widen the band that later readings are judged against.
+"""
+import math
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from instrumentation import registry as instrumentation
+from rollups import flatten
+
+logger = logging.getLogger(__name__)
+
+# Standard deviation floor (in points) so flat series don't turn noise into huge z-scores
+MIN_STD = 2.0
+
+
+class SeriesGroup:
+    """EWMA baseline/level state for a set of named series, stored column-wise"""
+
+    def __init__(self, alpha: float, fast_alpha: float, clip: float, warmup: int):
+        self.alpha = alpha
+        self.fast_alpha = fast_alpha
+        # After warmup, readings beyond this many stds are outliers: clipped mean step, no variance update
+        self.clip = clip
+        self.warmup = warmup
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.mean: List[float] = []
+        self.var: List[float] = []
+        self.fast: List[float] = []
+        self.count: List[int] = []
+        self.shifted: List[int] = []
+
+    def _ensure(self, names: List[str]) -> List[int]:
+        for name in names:
+            if name not in self.index:
+                self.index[name] = len(self.names)
+                self.names.append(name)
+                self.mean.append(0.0)
+                self.var.append(0.0)
+                self.fast.append(0.0)
+                self.count.append(0)
+                self.shifted.append(0)
+        return [self.index[name] for name in names]
+
+    def update(self, names: List[str], values: List[float]) -> List[tuple]:
+        """
+        Fold one value per series into its state. Returns per series
+        (z against the previous baseline, baseline mean, baseline std, samples seen).
+        """
+        alpha, fast_alpha, clip, warmup = self.alpha, self.fast_alpha, self.clip, self.warmup
+        mean, var, fast, count = self.mean, self.var, self.fast, self.count
+        results = []
+        for i, value in zip(self._ensure(names), values):
+            n = count[i]
+            if n == 0:
+                mean[i] = fast[i] = value
+                count[i] = 1
+                results.append((0.0, value, MIN_STD, 1))
+                continue
+            std = max(math.sqrt(var[i]), MIN_STD)
+            diff = value - mean[i]
+            results.append((diff / std, mean[i], std, n))
+            # Plain running mean/variance until 1/n drops below alpha, so early estimates aren't biased to 0
+            rate = max(alpha, 1.0 / (n + 1))
+            if n >= warmup and abs(diff) > clip * std:
+                mean[i] += rate * math.copysign(clip * std, diff)
+            else:
+                increment = rate * diff
+                mean[i] += increment
+                var[i] = (1 - rate) * (var[i] + diff * increment)
+            fast[i] += max(fast_alpha, 1.0 / (n + 1)) * (value - fast[i])
+            count[i] = n + 1
+        return results
+
+
+class AnomalyDetector:
+    def __init__(self, alpha: float = 0.05, fast_alpha: float = 0.3, z_threshold: float = 4.0, warmup: int = 30,
+                 shift_sigmas: float = 3.0, min_shift: float = 10.0, shift_samples: int = 3,
+                 imbalance_gap: float = 40.0, imbalance_samples: int = 5):
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.shift_sigmas = shift_sigmas
+        self.min_shift = min_shift
+        self.shift_samples = shift_samples
+        self.imbalance_gap = imbalance_gap
+        self.imbalance_samples = imbalance_samples
+        self.metrics = SeriesGroup(alpha, fast_alpha, z_threshold, warmup)
+        self.cores = SeriesGroup(alpha, fast_alpha, z_threshold, warmup)
+        # Consecutive samples each core has spent imbalance_gap above the core average
+        self._imbalanced: List[int] = []
+        self._findings: List[Dict] = []
+
+    def _check(self, group: SeriesGroup, names: List[str], values: List[float], label, findings: List[Dict]):
+        for name, value, (z, mean, std, n) in zip(names, values, group.update(names, values)):
+            if n < self.warmup:
+                continue
+            i = group.index[name]
+            shift = group.fast[i] - group.mean[i]
+            baseline_std = max(math.sqrt(group.var[i]), MIN_STD)
+            group.shifted[i] = group.shifted[i] + 1 \
+                if abs(shift) >= max(self.shift_sigmas * baseline_std, self.min_shift) else 0
+            if group.shifted[i] >= self.shift_samples:
+                if group.shifted[i] == self.shift_samples:
+                    instrumentation.increment('anomaly.level_shifts')
+                findings.append(self._finding('Level Shift', name, shift / baseline_std,
+                                              f"{label(name)} moved from {group.mean[i]:.1f}% to {group.fast[i]:.1f}%"))
+            elif abs(z) >= self.z_threshold:
+                # Not reported during a shift: its readings are expected to be off-baseline then
+                findings.append(self._finding('Anomalous Reading', name, z,
+                                              f"{label(name)} at {value:.1f}% (typical {mean:.1f}% ± {std:.1f}, z={z:.1f})"))
+
+    def _check_imbalance(self, cores: List[float], findings: List[Dict]):
+        if len(cores) < 2:
+            return
+        if len(self._imbalanced) != len(cores):
+            self._imbalanced = [0] * len(cores)
+        average = sum(cores) / len(cores)
+        gap = self.imbalance_gap
+        self._imbalanced = [streak + 1 if value - average >= gap else 0
+                            for streak, value in zip(self._imbalanced, cores)]
+        for core, (streak, value) in enumerate(zip(self._imbalanced, cores)):
+            if streak >= self.imbalance_samples:
+                findings.append(self._finding('Core Imbalance', f'core{core}', (value - average) / gap,
+                                              f"Core {core} at {value:.1f}% while cores average {average:.1f}% "
+                                              f"for {streak} samples"))
+
+    @staticmethod
+    def _finding(kind: str, metric: str, score: float, message: str) -> Dict:
+        return {
+            'type': kind,
+            'metric': metric,
+            'score': round(score, 2),
+            'message': message,
+            'timestamp': datetime.now().strftime("%I:%M:%S %p")
+        }
+
+    def observe(self, perf: Dict) -> List[Dict]:
+        """Update every series with one performance_metrics sample; returns the current findings"""
+        findings: List[Dict] = []
+        try:
+            row = {name: value for name, value in flatten(perf).items() if name.split(':')[0].endswith('percent')}
+            self._check(self.metrics, list(row), list(row.values()), lambda name: name, findings)
+
+            cores = [float(value) for value in (perf.get('cpu') or {}).get('per_core_usage') or []]
+            self._check(self.cores, [f'core{i}' for i in range(len(cores))], cores,
+                        lambda name: f"Core {name[4:]}", findings)
+            self._check_imbalance(cores, findings)
+        except Exception as e:
+            logger.error(f"Error running anomaly detection: {e}")
+        if findings:
+            instrumentation.increment('anomaly.findings', len(findings))
+        self._findings = findings
+        return findings
+
+    def findings(self) -> List[Dict]:
+        """Findings from the latest sample"""
+        return list(self._findings)
+
+    def baseline(self, metric: str) -> Optional[Dict[str, float]]:
+        """Current EWMA state of a metric ('cpu.percent') or core ('core3')"""
+        group = self.cores if metric in self.cores.index else self.metrics
+        i = group.index.get(metric)
+        if i is None:
+            return None
+        return {'mean': group.mean[i], 'std': math.sqrt(group.var[i]), 'level': group.fast[i], 'samples': group.count[i]}
@@ -1,17 +1,80 @@
-import asyncio
 import tkinter as tk
 from tkinter import ttk, messagebox
-import requests
 import json
 from datetime import datetime
 import threading
 
-from device_info_collector import DeviceInfoCollector, API_HOST, send_device_info, logger
+from adaptive_scheduler import AdaptiveScheduler
+from device_info_collector import DeviceInfoCollector, ALERT_THRESHOLDS, API_HOST, send_device_info, logger
+from log_config import configure_logging
+from payload_compression import load_default_dictionary
+from send_queue import QueueSender, SendQueue
+from snapshot_shm import SnapshotPublisher, SnapshotReader, active_writer
+
+collector = None
+_collector_lock = threading.Lock()
+# Held while a run_app cycle is in progress
+_run_lock = threading.Lock()
+_reader_lock = threading.Lock()
+publisher = None
+reader = None
+sender = None
+
+
+def get_collector() -> DeviceInfoCollector:
+    """Create the shared collector on first use rather than at import"""
+    global collector
+    with _collector_lock:
+        if collector is None:
+            published = read_agent_snapshot()
+            collector = DeviceInfoCollector.from_snapshot(published, use_inventory_worker=True) if published \
+                else DeviceInfoCollector(use_inventory_worker=True)
+        return collector
+
+
+def read_agent_snapshot():
+    """A running agent's latest published system_info, or None when no agent is publishing"""
+    global reader
+    if active_writer() is None:
+        return None
+    with _reader_lock:
+        if reader is None:
+            reader = SnapshotReader()
+        return reader.read_json()
+
+
+def get_publisher() -> SnapshotPublisher:
+    """Shared snapshot other local tools (dashboard, monitor, cli snapshot) read while no agent is running"""
+    global publisher
+    with _collector_lock:
+        if publisher is None:
+            # Never takes the segment from an agent; publish() yields while one is attached
+            publisher = SnapshotPublisher(takeover=False)
+        return publisher
+
+
+def get_sender() -> QueueSender:
+    """
+    Single sender thread behind a bounded latest-wins queue: while the server
+    is slow, a new report replaces the queued one instead of piling up
+    threads each holding its own payload.
+    """
+    global sender
+    with _collector_lock:
+        if sender is None:
+            websocket_url = f"ws://{API_HOST}/ws/device-tracker/"
+            dictionary = load_default_dictionary()
+            sender = QueueSender(
+                SendQueue(maxsize=1, policy='latest_per_section'),
+                lambda payload: send_device_info(websocket_url, device_info=payload, dictionary=dictionary)
+            ).start()
+        return sender
+
 
-collector = DeviceInfoCollector()
 def run_app():
     try:
-        logger.info("Starting device information collection")
+        logger.debug("Starting device information collection")
+        collector = get_collector()
 
 
         # Check for command line arguments
@@ -19,23 +82,42 @@ def run_app():
         if len(sys.argv) > 1 and sys.argv[1] == "--dashboard":
             collector.display_live_dashboard()
         else:
+            published = read_agent_snapshot()
+            if published is not None:
+                # The agent samples, publishes and reports; the UI just shows its latest snapshot
+                if published is not collector.system_info:
+                    collector.adopt_snapshot(published)
+                return
+
             collector.print_info()
+            collector.refresh_performance()
             device_info = collector.to_json()
+            if active_writer() is None:
+                get_publisher().publish_json(device_info)
 
             # Save to JSON file
             with open('device_info.json', 'w') as f:
                 f.write(device_info)
-            logger.info("Device information has been saved to 'device_info.json'")
+            logger.debug("Device information has been saved to 'device_info.json'")
 
-            # Replace with your WebSocket URL
-            websocket_url = f"ws://{API_HOST}/ws/device-tracker/"
-            asyncio.run(send_device_info(websocket_url, device_info=device_info))
+            get_sender().queue.put(device_info)
 
     except Exception as e:
         logger.error(f"Error in main execution: {e}")
 
+def _run_app_once():
+    try:
+        run_app()
+    finally:
+        _run_lock.release()
+
+
 def run_app_threaded():
-    thread = threading.Thread(target=run_app)
+    # The scheduler can fire faster than a cycle completes; never run two at once
+    if not _run_lock.acquire(blocking=False):
+        logger.debug("Previous collection still running; skipping this cycle")
+        return
+    thread = threading.Thread(target=_run_app_once)
     thread.daemon = True
     thread.start()
 class DeviceInfoUI:
@@ -86,11 +168,18 @@ class DeviceInfoUI:
         # Initialize with local data
         self.update_local_info()
         self.fetch_api_data_threaded() # Fetch API data on initialization
+        self.scheduler = AdaptiveScheduler(ALERT_THRESHOLDS, min_interval=1.0, max_interval=60.0)
         self.schedule_run_app()
     def schedule_run_app(self):
         run_app_threaded()
-        # Schedule next run in 5000 milliseconds (5 seconds)
-        self.root.after(5000, self.schedule_run_app)
+        # Next run comes sooner as metrics approach their alert thresholds, later while they are flat
+        interval = self.scheduler.interval
+        try:
+            perf = get_collector().system_info['performance_metrics']
+            interval = self.scheduler.observe(get_collector().alert_values(perf))
+        except Exception as e:
+            logger.error(f"Error picking the next sampling interval: {e}")
+        self.root.after(int(interval * 1000), self.schedule_run_app)
 
     def create_header(self):
         header_frame = ttk.Frame(self.main_frame)
@@ -255,8 +344,15 @@ class DeviceInfoUI:
         self.alerts_text.grid(row=3, column=1, columnspan=2, rowspan=2, sticky=tk.W + tk.E, padx=5)
 
         # Processes
-        ttk.Label(self.performance_tab, text="Top Processes", style='Header.TLabel').grid(row=5, column=0, columnspan=3,
+        ttk.Label(self.performance_tab, text="Top Processes", style='Header.TLabel').grid(row=5, column=0, columnspan=2,
                                                                                           sticky=tk.W, pady=(10, 5))
+        self.tree_view_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            self.performance_tab,
+            text="Tree view",
+            variable=self.tree_view_var,
+            command=self.toggle_process_view
+        ).grid(row=5, column=2, sticky=tk.E, pady=(10, 5))
 
         self.process_tree = ttk.Treeview(
             self.performance_tab,
@@ -293,7 +389,7 @@ class DeviceInfoUI:
 
     def update_local_info(self):
         try:
-            system_info = collector.system_info
+            system_info = get_collector().system_info
 
             # Clear existing widgets in basic info frame
             for widget in self.basic_info_frame.winfo_children():
@@ -340,7 +436,9 @@ class DeviceInfoUI:
         try:
             # CPU
             cpu_usage = perf_metrics['cpu']['overall_usage']
-            self.cpu_usage.config(text=f"{cpu_usage:.1f}%")
+            last_hour = get_collector().summarize(['cpu.percent'], '-1h', how='max')['cpu.percent']
+            peak = f" (1h peak {last_hour:.1f}%)" if last_hour is not None else ""
+            self.cpu_usage.config(text=f"{cpu_usage:.1f}%{peak}")
 
             # Memory
             mem = perf_metrics['memory']
@@ -361,7 +459,7 @@ class DeviceInfoUI:
             self.network_upload.config(text=f"Upload: {upload_speed:.2f} MB")
 
             # Alerts
-            alerts = collector.get_active_alerts()
+            alerts = get_collector().get_active_alerts(perf_metrics)
             self.alerts_text.config(state=tk.NORMAL)
             self.alerts_text.delete(1.0, tk.END)
 
@@ -376,26 +474,77 @@ class DeviceInfoUI:
             self.alerts_text.config(state=tk.DISABLED)
 
             # Processes
-            self.process_tree.delete(*self.process_tree.get_children())
-            processes = collector.get_running_processes(10)
-            for proc in processes:
-                self.process_tree.insert('', tk.END, values=(
-                    proc['pid'],
-                    proc['name'],
-                    f"{proc['cpu']:.1f}",
-                    f"{proc['memory']:.1f}",
-                    proc['status']
-                ))
+            self.update_process_view()
 
         except Exception as e:
             self.status_var.set(f"Error updating performance metrics: {str(e)}")
 
+    def toggle_process_view(self):
+        """Switch the process pane between the top-10 list and the process tree"""
+        if self.tree_view_var.get():
+            self.process_tree.configure(show='tree headings')
+            self.process_tree.heading('cpu', text='CPU % (tree)')
+            self.process_tree.heading('memory', text='Memory % (tree)')
+        else:
+            self.process_tree.configure(show='headings')
+            self.process_tree.heading('cpu', text='CPU %')
+            self.process_tree.heading('memory', text='Memory %')
+        self.update_process_view()
+
+    def update_process_view(self):
+        if self.tree_view_var.get():
+            self.update_process_tree_view()
+            return
+        self.process_tree.delete(*self.process_tree.get_children())
+        processes = get_collector().get_running_processes(10)
+        for proc in processes:
+            self.process_tree.insert('', tk.END, values=(
+                proc['pid'],
+                proc['name'],
+                f"{proc['cpu']:.1f}" if proc['cpu'] is not None else '-',
+                f"{proc['memory']:.1f}" if proc['memory'] is not None else '-',
+                proc['status']
+            ))
+
+    def update_process_tree_view(self):
+        """Show every process under its parent, with CPU/memory rolled up over each subtree"""
+        tree = get_collector().get_process_tree()
+        expanded = {item for item in self._iter_process_items() if self.process_tree.item(item, 'open')}
+        self.process_tree.delete(*self.process_tree.get_children())
+
+        def by_cpu(pid):
+            return tree.subtree_totals(pid)['cpu_percent']
+
+        stack = [('', pid) for pid in sorted(tree.roots(), key=by_cpu)]
+        while stack:
+            parent_item, pid = stack.pop()
+            totals = tree.subtree_totals(pid)
+            item = str(pid)
+            self.process_tree.insert(parent_item, tk.END, iid=item, text=tree.names.get(pid) or '',
+                                     open=item in expanded, values=(
+                pid,
+                tree.names.get(pid),
+                f"{totals['cpu_percent']:.1f}",
+                f"{totals['memory_percent']:.1f}",
+                tree.status.get(pid)
+            ))
+            stack.extend((item, child) for child in sorted(tree.children(pid), key=by_cpu))
+
+    def _iter_process_items(self):
+        stack = list(self.process_tree.get_children())
+        while stack:
+            item = stack.pop()
+            yield item
+            stack.extend(self.process_tree.get_children(item))
+
     def fetch_api_data_threaded(self):
         """Start API fetch in a separate thread to prevent UI freezing"""
         self.status_var.set("Fetching API data...")
         threading.Thread(target=self.fetch_api_data, daemon=True).start()
 
     def fetch_api_data(self):
+        import requests
+
         try:
             hostname = self.hostname_entry.get().strip()
             if not hostname:
@@ -455,7 +604,12 @@ class DeviceInfoUI:
         self.fetch_api_data_threaded()
 
 
-if __name__ == "__main__":
+def main():
+    configure_logging()
     root = tk.Tk()
     app = DeviceInfoUI(root)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark: preset-dictionary (zdict) compression vs plain deflate for the
+messages send_device_info puts on the wire.
+
+The dictionary is trained from the given samples and measured on reports it
+was not trained on: a sibling of the fixture device (other hostname, addresses
+and serial, some packages upgraded, removed or added, freshly sampled
+performance metrics) and, with --live, a fresh snapshot of this machine.
+
+Usage:
+    python benchmarks/bench_compression.py [--level 6] [--iterations 200] [--live] [SAMPLE ...]
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import re
+import string
+import sys
+import time
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from payload_compression import PayloadDictionary, build_message, read_samples
+
+
+def cpu_per_call(func, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - start) / iterations
+
+
+def _token(rng, length):
+    return ''.join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(length))
+
+
+def sibling(system_info, seed=1):
+    """Another device of the same fleet: own identity, and a package list that has drifted from this one"""
+    rng = random.Random(seed)
+    info = copy.deepcopy(system_info)
+    info['hostname'] = _token(rng, len(info.get('hostname') or '') or 14)
+    info['ip_address'] = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+    info['mac_address'] = ':'.join(f'{rng.randrange(256):02x}' for _ in range(6))
+    info['serial_number'] = _token(rng, 8)
+    software = []
+    for entry in info.get('installed_software') or []:
+        roll = rng.random()
+        if roll < 0.1:
+            continue  # not installed here
+        if roll < 0.3 and entry.get('version'):
+            entry['version'] = re.sub(r'(\d+)(?!.*\d)', lambda m: str(int(m.group(1)) + rng.randint(1, 9)),
+                                      entry['version'])
+        software.append(entry)
+    for _ in range(len(software) // 10):
+        software.insert(rng.randrange(len(software) + 1), {
+            'name': f"{_token(rng, 6).title()} {rng.choice(('Agent', 'Runtime', 'Driver', 'Tools'))}",
+            'version': f"{rng.randint(1, 30)}.{rng.randint(0, 9)}.{rng.randint(0, 999)}",
+            'publisher': f"{_token(rng, 5).title()} Inc."
+        })
+    info['installed_software'] = software
+    return info
+
+
+def payloads(live=False):
+    """(name, message) pairs none of which is a training sample"""
+    from device_info_collector import DeviceInfoCollector
+
+    with open(os.path.join(ROOT, 'device_info.json'), 'r') as f:
+        collector = DeviceInfoCollector.from_snapshot(sibling(json.load(f)), use_proc_sampler=False)
+    collector.refresh_performance()
+    messages = [
+        ('sibling report', build_message(collector.to_json())),
+        ('performance only', build_message(json.dumps(collector.system_info['performance_metrics'], indent=2)))
+    ]
+    if live:
+        messages.append(('this machine', build_message(DeviceInfoCollector().to_json())))
+    return messages
+
+
+def deflate(text, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(text.encode('utf-8')) + compressor.flush()
+
+
+def inflate(payload):
+    return zlib.decompress(payload, -15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('samples', nargs='*', default=[os.path.join(ROOT, 'device_info.json')],
+                        help='Training samples (default: device_info.json)')
+    parser.add_argument('--level', type=int, default=6, help='zlib compression level')
+    parser.add_argument('--iterations', type=int, default=200, help='Calls per CPU measurement')
+    parser.add_argument('--live', action='store_true', help='Also measure a fresh snapshot of this machine')
+    args = parser.parse_args()
+
+    start = time.process_time()
+    dictionary = PayloadDictionary.train(read_samples(args.samples))
+    print(f"Trained {dictionary.id} ({len(dictionary.data)} bytes) in {time.process_time() - start:.2f}s CPU\n")
+
+    print(f"{'payload':<18} {'method':<8} {'bytes':>8} {'ratio':>7} {'compress us':>12} {'inflate us':>11}")
+    for name, message in payloads(args.live):
+        raw = len(message.encode('utf-8'))
+        plain = deflate(message, args.level)
+        primed = dictionary.compress(message, args.level)
+        assert dictionary.decompress(primed) == message
+
+        print(f"{name:<18} {'none':<8} {raw:>8} {1.0:>7.2f} {'-':>12} {'-':>11}")
+        for method, body, compress, decompress in (
+            ('deflate', plain, lambda: deflate(message, args.level), lambda: inflate(plain)),
+            ('zdict', primed, lambda: dictionary.compress(message, args.level), lambda: dictionary.decompress(primed)),
+        ):
+            print(f"{'':<18} {method:<8} {len(body):>8} {raw / len(body):>7.2f} "
+                  f"{cpu_per_call(compress, args.iterations) * 1e6:>12.1f} "
+                  f"{cpu_per_call(decompress, args.iterations) * 1e6:>11.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Resident-memory comparison of the legacy dict shape vs the slotted record
+types, measured with tracemalloc on the shipped processes.json and
+device_info.json fixtures.
+
+Usage:
+    python benchmarks/bench_record_memory.py
+"""
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from records import ProcessRecord, SoftwareRecord
+
+
+def load_fixture(name):
+    with open(os.path.join(ROOT, name), 'r') as f:
+        return f.read()
+
+
+def measure(build):
+    """Bytes still allocated after build() returns, with its result kept alive"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    processes_text = load_fixture('processes.json')
+    device_info_text = load_fixture('device_info.json')
+
+    cases = [
+        ('processes (dicts)', lambda: json.loads(processes_text)),
+        ('processes (records)', lambda: [ProcessRecord.from_dict(p) for p in json.loads(processes_text)]),
+        ('installed_software (dicts)', lambda: json.loads(device_info_text)['installed_software']),
+        ('installed_software (records)', lambda: [
+            SoftwareRecord.from_dict(s) for s in json.loads(device_info_text)['installed_software']
+        ]),
+    ]
+
+    print(f"{'fixture':<30} {'bytes':>12}")
+    for name, build in cases:
+        print(f"{name:<30} {measure(build):>12,}")
+
+
+if __name__ == '__main__':
+    main()
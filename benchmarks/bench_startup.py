@@ -0,0 +1,79 @@
+"""
+Startup-time budget for the CLI, measured with `python -X importtime`.
+
+Runs `cli.py --help` in a fresh interpreter, sums the cumulative import time
+of top-level modules and fails (exit 1) when it exceeds the budget or when a
+heavy module is imported, directly or by anything else, before any subcommand
+needs it. tests/test_startup.py runs the same check.
+
+Usage:
+    python benchmarks/bench_startup.py [--budget-ms 150]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must stay out of `--help` startup
+HEAVY_MODULES = ('psutil', 'tkinter', 'requests', 'websockets', 'curses', 'device_info_collector', 'app')
+
+
+def import_times(args):
+    """
+    Return ({module: cumulative microseconds} for top-level imports, every
+    module imported at any nesting level)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.join(ROOT, 'cli.py')] + args,
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    times = {}
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        modules.add(name.strip())
+        # Nested imports are indented under their parent; only top-level entries add to the total
+        if not name.startswith('  '):
+            times[name.strip()] = int(cumulative)
+    return times, modules
+
+
+def check_startup(args=('--help',)):
+    """(top-level import times, total ms, heavy modules imported at any depth) for `cli.py <args>`"""
+    times, modules = import_times(list(args))
+    total_ms = sum(times.values()) / 1000
+    heavy = sorted(name for name in modules if name.split('.')[0] in HEAVY_MODULES)
+    return times, total_ms, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=150.0, help='Maximum total import time in milliseconds')
+    args = parser.parse_args()
+
+    times, total_ms, heavy = check_startup()
+    for name, micros in sorted(times.items(), key=lambda item: item[1], reverse=True)[:10]:
+        print(f"{micros / 1000:>8.1f} ms  {name}")
+    print(f"{total_ms:>8.1f} ms  total (budget {args.budget_ms:.0f} ms)")
+
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        return 1
+    if total_ms > args.budget_ms:
+        print("FAIL: startup import time over budget")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Fleet load simulator: many simulated agents in one asyncio process, each
+replaying the device_info.json fixture through the real send_device_info path
+(connect, device_id handshake, send, ack) on the run_app cadence.
+
+By default the bundled ws_stub_server runs in a child process, so the CPU
+reported here is the client's alone. A reconnect storm (every agent reporting
+at the same instant, as after a server restart) can be injected mid-run.
+
+Usage:
+    python benchmarks/fleet_sim.py [--agents 1000] [--duration 30] [--interval 5]
+                                   [--storm-at 15] [--dictionary payload.zdict]
+                                   [--url ws://host/ws/device-tracker/] [--json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from device_info_collector import send_device_info
+from payload_compression import PayloadDictionary
+
+
+def _stub_process(conn, dictionary_paths):
+    """Child process: run the stub until told to stop, then report its stats"""
+    from ws_stub_server import StubServer
+
+    async def run():
+        server = StubServer(dictionaries=[PayloadDictionary.load(path) for path in dictionary_paths])
+        await server.start()
+        conn.send(server.port)
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+        await server.stop()
+        stats = server.snapshot_stats()
+        stats['cpu_seconds'] = time.process_time()
+        conn.send(stats)
+
+    asyncio.run(run())
+
+
+class StubProcess:
+    def __init__(self, dictionary_paths=()):
+        self._conn, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_stub_process, args=(child, list(dictionary_paths)), daemon=True)
+
+    def start(self) -> str:
+        self._process.start()
+        port = self._conn.recv()
+        return f"ws://127.0.0.1:{port}/ws/device-tracker/"
+
+    def stop(self):
+        self._conn.send('stop')
+        stats = self._conn.recv()
+        self._process.join(timeout=5)
+        return stats
+
+
+def raise_fd_limit(needed: int):
+    """Each in-flight report holds a socket; lift the soft fd limit towards the hard one"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard == resource.RLIM_INFINITY else min(hard, max(soft, needed))
+    if target > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Fleet:
+    def __init__(self, url, payload, agents, interval, duration, dictionary=None, storm_at=None, jitter=0.1):
+        self.url = url
+        self.payload = payload
+        self.agents = agents
+        self.interval = interval
+        self.duration = duration
+        self.dictionary = dictionary
+        self.storm_at = storm_at
+        self.jitter = jitter
+        # Latencies of acknowledged reports only; a failed connect would skew them either way
+        self.latencies = []
+        self.storm_latencies = []
+        self.sent = 0
+        self.failed = 0
+
+    async def _report(self, storm=False):
+        start = time.perf_counter()
+        ok = await send_device_info(self.url, self.payload, dictionary=self.dictionary)
+        elapsed = time.perf_counter() - start
+        if not ok:
+            self.failed += 1
+            return
+        (self.storm_latencies if storm else self.latencies).append(elapsed)
+        self.sent += 1
+
+    async def _agent(self, started: float, storm: asyncio.Event):
+        # Stagger the first report across one interval, like a fleet that booted over time
+        next_report = started + random.uniform(0, self.interval)
+        deadline = started + self.duration
+        while True:
+            now = time.monotonic()
+            if next_report >= deadline:
+                return
+            try:
+                await asyncio.wait_for(storm.wait(), timeout=max(0.0, next_report - now))
+            except asyncio.TimeoutError:
+                await self._report()
+                next_report += self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+                continue
+            # Storm: every agent reconnects at once, then resumes its own cadence
+            await self._report(storm=True)
+            next_report = time.monotonic() + random.uniform(0, self.interval)
+
+    async def run(self):
+        started = time.monotonic()
+        storm = asyncio.Event()
+        tasks = [asyncio.create_task(self._agent(started, storm)) for _ in range(self.agents)]
+        if self.storm_at is not None:
+            await asyncio.sleep(self.storm_at)
+            storm.set()
+            await asyncio.sleep(0)
+            storm.clear()
+        await asyncio.gather(*tasks)
+        return time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate a fleet of agents reporting over WebSocket')
+    parser.add_argument('--agents', type=int, default=1000, help='Number of simulated agents')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+    parser.add_argument('--interval', type=float, default=5, help='Seconds between reports per agent (run_app cadence)')
+    parser.add_argument('--storm-at', type=float, help='Make every agent report at once this many seconds in')
+    parser.add_argument('--dictionary', help='Compress payloads with this zdict (the stub is given it too)')
+    parser.add_argument('--url', help='Target an existing server instead of the bundled stub')
+    parser.add_argument('--payload', default=os.path.join(ROOT, 'device_info.json'), help='device_info JSON to replay')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    # send_device_info logs every exchange; keep only real failures
+    logging.basicConfig(level=logging.CRITICAL)
+    raise_fd_limit(args.agents * 2 + 256)
+
+    with open(args.payload, 'r') as f:
+        payload = f.read()
+    dictionary = PayloadDictionary.load(args.dictionary) if args.dictionary else None
+
+    stub = None
+    url = args.url
+    if url is None:
+        stub = StubProcess([args.dictionary] if args.dictionary else [])
+        url = stub.start()
+
+    fleet = Fleet(url, payload, args.agents, args.interval, args.duration, dictionary, args.storm_at)
+    cpu_start = time.process_time()
+    elapsed = asyncio.run(fleet.run())
+    client_cpu = time.process_time() - cpu_start
+    server_stats = stub.stop() if stub is not None else None
+
+    attempts = fleet.sent + fleet.failed
+    results = {
+        'agents': args.agents,
+        'duration_seconds': elapsed,
+        'reports': fleet.sent,
+        'failed': fleet.failed,
+        # send_device_info opens a fresh connection (and handshake) per report, so this is also the connection rate
+        'throughput_per_second': fleet.sent / elapsed,
+        'latency_p50_ms': percentile(fleet.latencies, 0.5) * 1000,
+        'latency_p99_ms': percentile(fleet.latencies, 0.99) * 1000,
+        'client_cpu_seconds': client_cpu,
+        'client_cpu_per_agent_percent': client_cpu / elapsed / args.agents * 100,
+        'client_cpu_per_report_ms': client_cpu / attempts * 1000 if attempts else 0.0,
+    }
+    if fleet.storm_latencies:
+        results['storm_reports'] = len(fleet.storm_latencies)
+        results['storm_latency_p50_ms'] = percentile(fleet.storm_latencies, 0.5) * 1000
+        results['storm_latency_p99_ms'] = percentile(fleet.storm_latencies, 0.99) * 1000
+    if server_stats is not None:
+        results['server'] = server_stats
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for key, value in results.items():
+            if isinstance(value, float):
+                value = f"{value:.3f}"
+            print(f"{key:<32} {value}")
+    return 0 if fleet.failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Benchmark suite for the collector hot paths.
+
+Live benchmarks sample this machine; the serialization and parser benchmarks
+replay the checked-in device_info.json / processes.json fixtures so their
+numbers are comparable between runs and machines.
+
+Usage:
+    python benchmarks/run.py [--filter parse] [--output results.json]
+    python benchmarks/run.py --baseline baseline.json [--threshold 15]
+
+Results are written as JSON. With --baseline, any benchmark whose per-call
+CPU time regressed by more than the threshold is reported and the run exits 1.
+
+Calls the collector caches (the per-section JSON memo, the 1s process
+snapshot) are reported twice: [warm] repeats hit the cache, [cold] ones drop
+it before every call, so neither number hides the other.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEVICE_INFO_FIXTURE = os.path.join(ROOT, 'device_info.json')
+PROCESSES_FIXTURE = os.path.join(ROOT, 'processes.json')
+
+# (name, repeat, setup) where setup is a context manager yielding the callable to time,
+# or a (callable, reset) pair where reset runs untimed before every call
+BENCHMARKS = []
+
+
+def benchmark(name, repeat=20):
+    def decorator(setup):
+        BENCHMARKS.append((name, repeat, contextmanager(setup)))
+        return setup
+    return decorator
+
+
+def load_fixture(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def fixture_software():
+    # A few registry entries in the fixture have no DisplayName; real parsers never emit those
+    return [s for s in load_fixture(DEVICE_INFO_FIXTURE)['installed_software'] if 'name' in s]
+
+
+# Fixture renderers: turn installed_software back into each tool's raw output
+
+def render_dpkg_status(software_list):
+    stanzas = []
+    for software in software_list:
+        stanzas.append(
+            f"Package: {software['name'].replace(' ', '-').lower()}\n"
+            f"Status: install ok installed\n"
+            f"Priority: optional\n"
+            f"Maintainer: {software.get('publisher', 'Unknown')}\n"
+            f"Architecture: amd64\n"
+            f"Version: {software.get('version', '0')}\n"
+            f"Description: {software['name']}\n"
+            f" Extended description line\n"
+        )
+    return '\n'.join(stanzas)
+
+
+def render_rpm_output(software_list):
+    return ''.join(
+        f"{s['name']}\t{s.get('version', 'Unknown')}\t{s.get('publisher', 'Unknown')}\t1720000000\n"
+        for s in software_list
+    )
+
+
+def render_registry_output(software_list):
+    blocks = []
+    for i, software in enumerate(software_list):
+        lines = [f"HKEY_LOCAL_MACHINE\\Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\{{{i:08d}}}"]
+        lines.append(f"    DisplayName    REG_SZ    {software['name']}")
+        lines.append(f"    DisplayVersion    REG_SZ    {software.get('version', '')}")
+        lines.append(f"    Publisher    REG_SZ    {software.get('publisher', '')}")
+        if 'install_date' in software:
+            lines.append(f"    InstallDate    REG_SZ    {software['install_date'].replace('-', '')}")
+        lines.append("    EstimatedSize    REG_DWORD    0x1000")
+        blocks.append('\n'.join(lines))
+    return '\n\n'.join(blocks) + '\n'
+
+
+# Live benchmarks
+
+@benchmark('collector.get_system_performance', repeat=10)
+def bench_system_performance():
+    from device_info_collector import DeviceInfoCollector
+    collector = DeviceInfoCollector.from_snapshot(load_fixture(DEVICE_INFO_FIXTURE))
+    yield collector.get_system_performance
+
+
+@benchmark('collector.get_system_performance[psutil]', repeat=3)
+def bench_system_performance_psutil():
+    from device_info_collector import DeviceInfoCollector
+    collector = DeviceInfoCollector.from_snapshot(load_fixture(DEVICE_INFO_FIXTURE), use_proc_sampler=False)
+    yield collector.get_system_performance
+
+
+@benchmark('collector.get_running_processes[warm]', repeat=10)
+def bench_running_processes():
+    from device_info_collector import DeviceInfoCollector
+    collector = DeviceInfoCollector.from_snapshot(load_fixture(DEVICE_INFO_FIXTURE), use_proc_sampler=False)
+    yield lambda: collector.get_running_processes(10)
+
+
+@benchmark('collector.get_running_processes[cold]', repeat=10)
+def bench_running_processes_cold():
+    from device_info_collector import DeviceInfoCollector
+    collector = DeviceInfoCollector.from_snapshot(load_fixture(DEVICE_INFO_FIXTURE), use_proc_sampler=False)
+    # Rescan first, as the first call after the snapshot's max_age does
+    yield lambda: (collector.get_process_snapshot(max_age=0), collector.get_running_processes(10))
+
+
+def bench_process_profile(profile, repeat):
+    def setup():
+        import processes
+        yield lambda: processes.get_processes(profile)
+    benchmark(f'processes.get_processes[{profile}]', repeat)(setup)
+
+
+# Per-profile scan cost: `light` is meant for every cycle, `full` for occasional runs
+for _profile, _repeat in (('light', 10), ('standard', 5), ('full', 3)):
+    bench_process_profile(_profile, _repeat)
+
+
+# Fixture-driven benchmarks
+
+def bench_to_json(cold):
+    def setup():
+        from device_info_collector import DeviceInfoCollector
+        collector = DeviceInfoCollector.from_snapshot(load_fixture(DEVICE_INFO_FIXTURE), use_proc_sampler=False)
+        # Cold: every section is re-encoded, as on the first report
+        yield (collector.to_json, collector._serializer.invalidate) if cold else collector.to_json
+    benchmark(f"collector.to_json[{'cold' if cold else 'warm'}]", 30)(setup)
+
+
+def bench_to_json_file(cold):
+    def setup():
+        from device_info_collector import DeviceInfoCollector
+        collector = DeviceInfoCollector.from_snapshot(load_fixture(DEVICE_INFO_FIXTURE), use_proc_sampler=False)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'device_info.json')
+            func = lambda: collector.to_json_file(path)
+            yield (func, collector._serializer.invalidate) if cold else func
+    benchmark(f"collector.to_json_file[{'cold' if cold else 'warm'}]", 30)(setup)
+
+
+for _cold in (False, True):
+    bench_to_json(_cold)
+    bench_to_json_file(_cold)
+
+
+@benchmark('processes.save_to_json', repeat=10)
+def bench_processes_save_to_json():
+    import processes
+    process_list = load_fixture(PROCESSES_FIXTURE)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'processes.json')
+        yield lambda: processes.save_to_json(process_list, path)
+
+
+@benchmark('parse.dpkg_status', repeat=30)
+def bench_parse_dpkg():
+    from package_inventory import iter_dpkg_status
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'status')
+        with open(path, 'w') as f:
+            f.write(render_dpkg_status(fixture_software()))
+        yield lambda: list(iter_dpkg_status(path))
+
+
+@benchmark('parse.rpm_query', repeat=30)
+def bench_parse_rpm():
+    from package_inventory import parse_rpm_query_output
+    output = render_rpm_output(fixture_software())
+    yield lambda: list(parse_rpm_query_output(output))
+
+
+@benchmark('parse.registry', repeat=30)
+def bench_parse_registry():
+    from package_inventory import parse_registry_output
+    output = render_registry_output(fixture_software())
+    yield lambda: parse_registry_output(output)
+
+
+@benchmark('send_device_info[stub]', repeat=20)
+def bench_send_device_info():
+    from device_info_collector import send_device_info
+    from ws_stub_server import StubServer
+    with open(DEVICE_INFO_FIXTURE, 'r') as f:
+        device_info = f.read()
+    server = StubServer()
+    server.start_in_thread()
+    try:
+        yield lambda: asyncio.run(send_device_info(server.url, device_info=device_info))
+    finally:
+        server.stop_thread()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_benchmark(name, repeat, setup):
+    with setup() as func:
+        func, reset = func if isinstance(func, tuple) else (func, None)
+        func()  # warm-up
+        wall, cpu = [], []
+        for _ in range(repeat):
+            if reset is not None:
+                reset()
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            func()
+            cpu.append(time.process_time() - cpu_start)
+            wall.append(time.perf_counter() - wall_start)
+    return {
+        'name': name,
+        'repeat': repeat,
+        'wall_median_us': statistics.median(wall) * 1e6,
+        'wall_p95_us': percentile(wall, 0.95) * 1e6,
+        'wall_min_us': min(wall) * 1e6,
+        'cpu_median_us': statistics.median(cpu) * 1e6,
+    }
+
+
+def compare(results, baseline, metric, threshold):
+    """Return (name, before, after, change %) for benchmarks slower than threshold"""
+    previous = {entry['name']: entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        before = previous.get(entry['name'], {}).get(metric)
+        if not before:
+            continue
+        change = (entry[metric] - before) * 100.0 / before
+        if change > threshold:
+            regressions.append((entry['name'], before, entry[metric], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the collector hot paths')
+    parser.add_argument('--filter', default='', help='Only run benchmarks whose name contains this string')
+    parser.add_argument('--output', help='Write JSON results to this file (default: stdout)')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare against')
+    parser.add_argument('--metric', default='cpu_median_us', help='Result field compared against the baseline')
+    parser.add_argument('--threshold', type=float, default=15.0, help='Allowed regression in percent')
+    args = parser.parse_args()
+
+    results = []
+    for name, repeat, setup in BENCHMARKS:
+        if args.filter not in name:
+            continue
+        result = run_benchmark(name, repeat, setup)
+        results.append(result)
+        print(f"{name:<45} wall {result['wall_median_us']:>12.1f} us  cpu {result['cpu_median_us']:>12.1f} us",
+              file=sys.stderr)
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, load_fixture(args.baseline), args.metric, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {args.metric} {before:.1f} -> {after:.1f} (+{change:.1f}%)", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""
+Command line entry point for the monitoring client.
+
+Heavy modules (psutil, tkinter, requests, websockets, curses) are only
+imported by the subcommand that needs them, so `cli.py --help` stays fast.
+
+Usage:
+    python cli.py snapshot [--output device_info.json]
+    python cli.py processes [--profile light|standard|full] [--fields pid,name,...] [--output processes.json]
+    python cli.py dashboard [--interval SECONDS]
+    python cli.py cgroups [--sort cpu_percent|memory|...] [--top 20] [--interval 1]
+    python cli.py agent [--url ws://host/ws/device-tracker/] [--interval SECONDS] [--dictionary PATH] [--once]
+    python cli.py history METRIC [METRIC ...] [--start 14:02] [--end 14:07] [--summary max]
+    python cli.py train-dict [--output payload.zdict] [SAMPLE ...]
+    python cli.py serve [--host 127.0.0.1] [--port 9100] [--interval 5]
+    python cli.py ui
+"""
+import argparse
+import sys
+
+# Seconds between INFO summaries of the agent's send queue (drops and failures are logged as they happen)
+QUEUE_STATS_INTERVAL = 60
+
+
+def cmd_snapshot(args):
+    from device_info_collector import DeviceInfoCollector
+    from snapshot_shm import read_snapshot
+
+    # A running agent's published snapshot saves collecting everything again
+    published = None if args.standalone else read_snapshot()
+    collector = DeviceInfoCollector.from_snapshot(published, use_proc_sampler=False) if published \
+        else DeviceInfoCollector()
+    collector.print_info()
+    if args.output:
+        collector.to_json_file(args.output)
+    return 0
+
+
+def cmd_processes(args):
+    import processes
+
+    fields = args.fields.split(',') if args.fields else None
+    process_list = processes.get_processes(profile=args.profile, fields=fields)
+    if args.output:
+        processes.save_to_json(process_list, args.output)
+    for proc in process_list:
+        # Only print the fields this profile collected
+        line = f"PID: {proc.pid}"
+        if proc.name is not None:
+            line += f", Name: {proc.name}"
+        if proc.status is not None:
+            line += f", Status: {proc.status}"
+        print(line)
+    return 0
+
+
+def cmd_dashboard(args):
+    from device_info_collector import DeviceInfoCollector
+    from instrumentation import install_profiler_signal
+
+    from snapshot_shm import SnapshotReader
+
+    install_profiler_signal()
+    reader = None if args.standalone else SnapshotReader()
+    published = reader.read_json() if reader is not None else None
+    if published is not None:
+        # Attach to the agent's snapshot; only the process list is sampled here
+        collector = DeviceInfoCollector.from_snapshot(published, use_proc_sampler=False)
+    else:
+        collector = DeviceInfoCollector(use_inventory_worker=True)
+    collector.display_live_dashboard(refresh_interval=args.interval, snapshot_reader=reader)
+    return 0
+
+
+def cmd_cgroups(args):
+    import time
+    from cgroups import CgroupCollector
+
+    collector = CgroupCollector(root=args.root, max_depth=args.depth)
+    if not collector.available:
+        print(f"No cgroup filesystem at {args.root}", file=sys.stderr)
+        return 1
+    # Rates need two samples
+    collector.sample()
+    time.sleep(args.interval)
+    usage = collector.sample()
+    print(f"cgroup {collector.version}, {len(usage)} groups")
+    print(f"{'CPU %':>7} {'Memory MB':>10} {'Read KB/s':>10} {'Write KB/s':>11} {'Pids':>6}  Path")
+    for path, entry in collector.top(usage, args.sort, args.top):
+        print(f"{entry.get('cpu_percent', 0):>7.1f} {entry.get('memory', 0) / (1024 * 1024):>10.1f} "
+              f"{entry.get('io_read_per_second', 0) / 1024:>10.1f} {entry.get('io_write_per_second', 0) / 1024:>11.1f} "
+              f"{entry.get('pids', '-'):>6}  {path}")
+    return 0
+
+
+def cmd_agent(args):
+    import time
+    from adaptive_scheduler import AdaptiveScheduler
+    from device_info_collector import DeviceInfoCollector, ALERT_THRESHOLDS, API_HOST, send_device_info, logger
+    from instrumentation import install_profiler_signal
+    from payload_compression import DEFAULT_DICTIONARY_PATH, load_default_dictionary
+    from send_queue import QueueSender, SendQueue
+    from snapshot_shm import SnapshotPublisher
+
+    # `kill -USR1 <pid>` toggles a sampling profiler without restarting the agent
+    install_profiler_signal()
+    url = args.url or f"ws://{API_HOST}/ws/device-tracker/"
+    dictionary = None if args.no_compression else load_default_dictionary(args.dictionary or DEFAULT_DICTIONARY_PATH)
+    if dictionary is not None:
+        logger.info(f"Offering payload dictionary {dictionary.id}")
+    collector = DeviceInfoCollector(use_inventory_worker=True)
+    # Local viewers (ui, dashboard, snapshot) read each sample from here instead of collecting their own
+    publisher = None if args.no_publish else SnapshotPublisher()
+    scheduler = AdaptiveScheduler(ALERT_THRESHOLDS, min_interval=args.min_interval,
+                                  max_interval=args.max_interval, cpu_budget=args.cpu_budget)
+    # Sending happens on its own thread; a slow server fills this bounded queue instead of stalling sampling
+    queue = SendQueue(args.queue_size, args.queue_policy, block_timeout=args.max_interval)
+    sender = QueueSender(queue, lambda payload: send_device_info(url, device_info=payload, dictionary=dictionary),
+                         send_timeout=args.send_timeout).start()
+    if args.history_file:
+        collector.history.load(args.history_file)
+    sent_hashes = {}
+    saved = time.monotonic()
+    stats_logged, reported_losses = None, (0, 0)
+    try:
+        while True:
+            collector.refresh_performance()
+            logger.debug(f"Sections changed since last report: {', '.join(collector.changed_sections(sent_hashes))}")
+            sent_hashes = collector.section_hashes()
+            device_info = collector.to_json()
+            if publisher is not None:
+                publisher.publish_json(device_info)
+            queue.put(device_info)
+            stats = queue.stats()
+            losses = (stats['dropped'], stats['failed'])
+            if losses != reported_losses or stats_logged is None or \
+                    time.monotonic() - stats_logged >= QUEUE_STATS_INTERVAL:
+                logger.info(f"Send queue: {stats}")
+                stats_logged, reported_losses = time.monotonic(), losses
+            if args.once:
+                sender.flush(args.send_timeout)
+                return 0
+            if args.history_file and time.monotonic() - saved >= args.history_save_interval:
+                collector.history.save(args.history_file)
+                saved = time.monotonic()
+            if args.interval is not None:
+                interval = args.interval
+            else:
+                interval = scheduler.observe(collector.alert_values(collector.system_info['performance_metrics']))
+            logger.debug(f"Next report in {interval:.2f}s")
+            time.sleep(interval)
+    finally:
+        sender.stop(timeout=args.send_timeout)
+        if args.history_file:
+            collector.history.save(args.history_file)
+
+
+def cmd_history(args):
+    import math
+    from datetime import datetime
+    from rollups import RollupStore
+
+    history = RollupStore()
+    if not history.load(args.history_file):
+        print(f"No metric history in {args.history_file}", file=sys.stderr)
+        return 1
+    try:
+        if args.summary:
+            for name, value in history.summarize(args.metrics, args.start, args.end, args.summary,
+                                                 args.resolution).items():
+                print(f"{name:<32} {'-' if value is None else f'{value:.2f}'}")
+            return 0
+        names = history.resolve(args.metrics)
+        rows = history.iter_rows(args.metrics, args.start, args.end, args.resolution, args.aggregate)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(f"{'time':<20}" + ''.join(f" {name:>23}" for name in names))
+    for timestamp, values in rows:
+        print(f"{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S'):<20}"
+              + ''.join(f" {'-' if math.isnan(value) else f'{value:.2f}':>23}" for value in values))
+    return 0
+
+
+def cmd_train_dict(args):
+    from payload_compression import DEFAULT_DICTIONARY_PATH, PayloadDictionary, read_samples
+
+    output = args.output or DEFAULT_DICTIONARY_PATH
+    dictionary = PayloadDictionary.train(read_samples(args.samples), size=args.size)
+    dictionary.save(output)
+    print(f"Wrote {len(dictionary.data)} byte dictionary {dictionary.id} to {output}")
+    return 0
+
+
+def cmd_serve(args):
+    from device_info_collector import DeviceInfoCollector
+    from metrics_server import serve
+
+    serve(DeviceInfoCollector(use_inventory_worker=True), host=args.host, port=args.port, interval=args.interval)
+    return 0
+
+
+def cmd_ui(args):
+    import app
+
+    app.main()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='monitoring_client', description='Device Monitoring Client')
+    parser.add_argument('--log-file', default='device_info_collector.log', help='Log file path')
+    parser.add_argument('--verbose', action='store_true', help='Enable debug logging')
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    snapshot = subparsers.add_parser('snapshot', help='Collect device information once and print it')
+    snapshot.add_argument('--output', default='device_info.json', help='JSON file to write (empty to skip)')
+    snapshot.add_argument('--standalone', action='store_true',
+                          help="Always collect here, even if a running agent has published a snapshot")
+    snapshot.set_defaults(func=cmd_snapshot)
+
+    processes = subparsers.add_parser('processes', help='List running processes in detail')
+    processes.add_argument('--profile', choices=('light', 'standard', 'full'), default='full',
+                           help='How much to collect per process (default: full)')
+    processes.add_argument('--fields', help='Comma-separated record fields to collect; overrides --profile')
+    processes.add_argument('--output', default='processes.json', help='JSON file to write (empty to skip)')
+    processes.set_defaults(func=cmd_processes)
+
+    dashboard = subparsers.add_parser('dashboard', help='Live curses dashboard')
+    dashboard.add_argument('--interval', type=float, help='Fixed refresh interval in seconds (default: adaptive)')
+    dashboard.add_argument('--standalone', action='store_true',
+                           help="Sample here instead of showing a running agent's published snapshot")
+    dashboard.set_defaults(func=cmd_dashboard)
+
+    cgroups = subparsers.add_parser('cgroups', help='Per-service CPU, memory and I/O from cgroup accounting')
+    cgroups.add_argument('--sort', default='cpu_percent',
+                         choices=('cpu_percent', 'memory', 'io_read_per_second', 'io_write_per_second', 'pids'),
+                         help='Column to rank by')
+    cgroups.add_argument('--top', type=int, default=20, help='Number of cgroups to show')
+    cgroups.add_argument('--interval', type=float, default=1.0, help='Seconds between the two samples')
+    cgroups.add_argument('--depth', type=int, help='Only descend this many levels below the root')
+    cgroups.add_argument('--root', default='/sys/fs/cgroup', help='cgroup filesystem mount point')
+    cgroups.set_defaults(func=cmd_cgroups)
+
+    agent = subparsers.add_parser('agent', help='Report device information to the server periodically')
+    agent.add_argument('--url', help='WebSocket URL (defaults to the API_HOST device tracker)')
+    agent.add_argument('--interval', type=float, help='Fixed seconds between reports (default: adaptive)')
+    agent.add_argument('--min-interval', type=float, default=0.5, help='Shortest adaptive interval in seconds')
+    agent.add_argument('--max-interval', type=float, default=60, help='Longest adaptive interval in seconds')
+    agent.add_argument('--cpu-budget', type=float, default=0.02,
+                       help='Maximum fraction of one CPU the agent may use (adaptive mode)')
+    agent.add_argument('--dictionary',
+                       help='Compression dictionary to offer the server, used if the file exists '
+                            '(default: payload.zdict next to the client)')
+    agent.add_argument('--no-compression', action='store_true', help='Never compress payloads')
+    agent.add_argument('--once', action='store_true', help='Send a single report and exit')
+    agent.add_argument('--queue-size', type=int, default=4, help='Reports held while the server is slow or down')
+    agent.add_argument('--queue-policy', choices=('latest_per_section', 'drop_oldest', 'block'),
+                       default='latest_per_section',
+                       help='When the queue is full: replace the queued report, drop the oldest, or wait')
+    agent.add_argument('--send-timeout', type=float, default=30, help='Seconds before a single send is abandoned')
+    agent.add_argument('--no-publish', action='store_true',
+                       help='Do not publish samples to the shared snapshot for local viewers')
+    agent.add_argument('--history-file', default='metrics_history.json.gz',
+                       help='Where metric rollups are kept across restarts (empty to keep them in memory only)')
+    agent.add_argument('--history-save-interval', type=float, default=300,
+                       help='Seconds between metric history saves')
+    agent.set_defaults(func=cmd_agent)
+
+    history = subparsers.add_parser('history', help='Query the metric history saved by the agent')
+    history.add_argument('metrics', nargs='+', help="Metric names or patterns, e.g. cpu.percent 'disk.percent:*'")
+    history.add_argument('--start', help="Range start: HH:MM[:SS] today, ISO time, epoch or relative like --start=-15m "
+                                         "(default: an hour ago)")
+    history.add_argument('--end', help='Range end, same formats (default: now)')
+    history.add_argument('--resolution', choices=('raw', 'minute', 'hour'),
+                         help='Tier to read (default: finest one covering --start)')
+    history.add_argument('--aggregate', choices=('avg', 'min', 'max', 'p95'), default='avg',
+                         help='Value to show from minute/hour rows')
+    history.add_argument('--summary', choices=('min', 'max', 'avg', 'last'), help='One value per metric instead of rows')
+    history.add_argument('--history-file', default='metrics_history.json.gz', help='History file written by the agent')
+    history.set_defaults(func=cmd_history)
+
+    train_dict = subparsers.add_parser('train-dict', help='Train a payload compression dictionary from samples')
+    train_dict.add_argument('samples', nargs='*', default=['device_info.json'],
+                            help='device_info.json / processes.json samples (default: device_info.json)')
+    train_dict.add_argument('--output', help='Dictionary file to write (default: payload.zdict next to the client)')
+    train_dict.add_argument('--size', type=int, default=32 * 1024, help='Dictionary size in bytes (max 32768)')
+    train_dict.set_defaults(func=cmd_train_dict)
+
+    serve = subparsers.add_parser('serve', help='Serve cached metrics over HTTP (Prometheus text and JSON)')
+    serve.add_argument('--host', default='127.0.0.1', help='Address to bind')
+    serve.add_argument('--port', type=int, default=9100, help='Port to listen on')
+    serve.add_argument('--interval', type=float, default=5, help='Seconds between samples')
+    serve.set_defaults(func=cmd_serve)
+
+    ui = subparsers.add_parser('ui', help='Tkinter desktop dashboard')
+    ui.set_defaults(func=cmd_ui)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    import logging
+    from log_config import configure_logging
+
+    configure_logging(args.log_file, logging.DEBUG if args.verbose else logging.INFO)
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+Columnar process snapshot.
+
+Numeric per-process values are stored as typed arrays (NumPy when installed,
+the array module otherwise) and strings are dictionary-encoded against side
+tables, so filtering, sorting and grouping run over flat columns instead of
+a list of dicts.
+"""
+import heapq
+import operator
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Column name -> array typecode; missing values are stored as MISSING
+NUMERIC_COLUMNS = {
+    'pid': 'q',
+    'ppid': 'q',
+    'uid': 'q',
+    'rss': 'q',
+    'vms': 'q',
+    'cpu_user': 'd',
+    'cpu_system': 'd',
+    'cpu_percent': 'd',
+    'memory_percent': 'd',
+    'read_bytes': 'q',
+    'write_bytes': 'q',
+    'num_threads': 'q',
+}
+
+MISSING = -1
+
+# Dictionary-encoded string columns
+CATEGORICAL_COLUMNS = ('name', 'user', 'status')
+
+_COMPARISONS = {
+    '==': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le,
+    '>': operator.gt, '>=': operator.ge,
+}
+
+
+class ProcessColumns:
+    """One process scan held column-wise; rows are addressed by index"""
+
+    def __init__(self):
+        self.timestamp = time.time()
+        self._numeric = {name: array(code) for name, code in NUMERIC_COLUMNS.items()}
+        self._codes = {name: array('i') for name in CATEGORICAL_COLUMNS}
+        self._tables: Dict[str, List[str]] = {name: [] for name in CATEGORICAL_COLUMNS}
+        self._lookup: Dict[str, Dict[str, int]] = {name: {} for name in CATEGORICAL_COLUMNS}
+        self._size = 0
+        self.backend = 'array'
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _encode(self, name: str, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        lookup = self._lookup[name]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self._tables[name])
+            self._tables[name].append(value)
+        return code
+
+    def append(self, **values):
+        """Add one process; unknown numeric values become MISSING, unknown strings None"""
+        if self.backend != 'array':
+            raise RuntimeError("Cannot append to a finalized snapshot")
+        for name, column in self._numeric.items():
+            value = values.get(name)
+            column.append(MISSING if value is None else value)
+        for name, codes in self._codes.items():
+            codes.append(self._encode(name, values.get(name)))
+        self._size += 1
+
+    def finalize(self) -> 'ProcessColumns':
+        """Switch to NumPy arrays when available; the snapshot is read-only afterwards"""
+        if numpy is not None and self.backend == 'array':
+            self._numeric = {name: numpy.frombuffer(column, dtype=column.typecode) if len(column) else
+                             numpy.empty(0, dtype=column.typecode) for name, column in self._numeric.items()}
+            self._codes = {name: numpy.frombuffer(codes, dtype='i') if len(codes) else numpy.empty(0, dtype='i')
+                           for name, codes in self._codes.items()}
+            self.backend = 'numpy'
+        return self
+
+    @classmethod
+    def from_records(cls, records: Iterable) -> 'ProcessColumns':
+        """Build a snapshot from ProcessRecord objects (e.g. processes.get_processes output)"""
+        columns = cls()
+        for record in records:
+            cpu_times = dict(zip(record.cpu_times.fields, record.cpu_times.values)) if record.cpu_times else {}
+            columns.append(
+                pid=record.pid,
+                ppid=record.parent_pid,
+                uid=record.uids.values[0] if record.uids else None,
+                rss=int(record.rss * 1024 * 1024) if record.rss is not None else None,
+                vms=int(record.vms * 1024 * 1024) if record.vms is not None else None,
+                cpu_user=cpu_times.get('user'),
+                cpu_system=cpu_times.get('system'),
+                cpu_percent=record.cpu_percent,
+                memory_percent=record.memory_percent,
+                read_bytes=record.read_bytes,
+                write_bytes=record.write_bytes,
+                num_threads=record.num_threads,
+                name=record.name,
+                user=record.username,
+                status=record.status
+            )
+        return columns.finalize()
+
+    # Column access
+
+    def column(self, name: str) -> Sequence:
+        """Numeric column as an array, or a categorical column decoded to a list of strings"""
+        if name in self._numeric:
+            return self._numeric[name]
+        table = self._tables[name]
+        return [table[code] if code >= 0 else None for code in self._codes[name]]
+
+    def value(self, name: str, index: int):
+        """One cell, with None for a missing value"""
+        if name in self._numeric:
+            value = self._numeric[name][index]
+            if self.backend == 'numpy':
+                value = value.item()
+            return None if value == MISSING else value
+        code = self._codes[name][index]
+        return self._tables[name][code] if code >= 0 else None
+
+    # Vectorized predicates; masks are NumPy bool arrays or lists of bools
+
+    def equals(self, name: str, value) -> Sequence[bool]:
+        """Mask of rows whose column equals value (categorical compare is done on codes)"""
+        if name in self._numeric:
+            return self.where(name, '==', value)
+        code = self._lookup[name].get(value, -2)
+        codes = self._codes[name]
+        if self.backend == 'numpy':
+            return codes == code
+        return [c == code for c in codes]
+
+    def where(self, name: str, op: str, value) -> Sequence[bool]:
+        """Row mask for `column op value`; rows where the value is missing never match"""
+        compare = _COMPARISONS[op]
+        column = self._numeric[name]
+        if self.backend == 'numpy':
+            return compare(column, value) & (column != MISSING)
+        return [v != MISSING and compare(v, value) for v in column]
+
+    def indices(self, mask: Optional[Sequence[bool]] = None) -> List[int]:
+        if mask is None:
+            return list(range(self._size))
+        if self.backend == 'numpy':
+            return numpy.flatnonzero(mask).tolist()
+        return [i for i, keep in enumerate(mask) if keep]
+
+    def argsort(self, name: str, descending: bool = True, limit: Optional[int] = None,
+                mask: Optional[Sequence[bool]] = None) -> List[int]:
+        """Row indices ordered by a numeric column, optionally restricted by mask and truncated"""
+        column = self._numeric[name]
+        if self.backend == 'numpy':
+            candidates = numpy.flatnonzero(mask) if mask is not None else numpy.arange(self._size)
+            values = column[candidates]
+            if descending:
+                values = -values
+            if limit is not None and limit < len(candidates):
+                partition = numpy.argpartition(values, limit)[:limit]
+                order = partition[numpy.argsort(values[partition], kind='stable')]
+            else:
+                order = numpy.argsort(values, kind='stable')
+            return candidates[order].tolist()
+
+        candidates = self.indices(mask)
+        key = column.__getitem__
+        if limit is not None:
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            return pick(limit, candidates, key=key)
+        return sorted(candidates, key=key, reverse=descending)
+
+    def take(self, indices: Sequence[int]) -> 'ProcessColumns':
+        """New snapshot containing only the given rows, in the given order"""
+        subset = ProcessColumns()
+        subset.timestamp = self.timestamp
+        subset._tables = self._tables
+        subset._lookup = self._lookup
+        subset._size = len(indices)
+        subset.backend = self.backend
+        if self.backend == 'numpy':
+            index_array = numpy.asarray(indices, dtype=numpy.intp)
+            subset._numeric = {name: column[index_array] for name, column in self._numeric.items()}
+            subset._codes = {name: codes[index_array] for name, codes in self._codes.items()}
+        else:
+            subset._numeric = {name: array(column.typecode, [column[i] for i in indices])
+                               for name, column in self._numeric.items()}
+            subset._codes = {name: array('i', [codes[i] for i in indices]) for name, codes in self._codes.items()}
+        return subset
+
+    def filter(self, mask: Sequence[bool]) -> 'ProcessColumns':
+        return self.take(self.indices(mask))
+
+    def top(self, name: str, n: int, mask: Optional[Sequence[bool]] = None) -> 'ProcessColumns':
+        """e.g. top('rss', 20, mask=cols.equals('user', 'alice'))"""
+        return self.take(self.argsort(name, descending=True, limit=n, mask=mask))
+
+    def group_by(self, key: str, value: str, agg: str = 'sum') -> Dict:
+        """
+        Aggregate a numeric column per distinct key ('sum', 'max', 'min', 'count'
+        or 'mean'). Missing values are left out, so 'count' counts known values
+        and a key with none at all is omitted.
+        """
+        column = self._numeric[value]
+        if key in self._codes:
+            keys = self._codes[key]
+            decode = self._tables[key]
+        else:
+            keys = self._numeric[key]
+            decode = None
+
+        if self.backend == 'numpy' and decode is not None and agg in ('sum', 'count', 'mean'):
+            valid = (keys >= 0) & (column != MISSING)
+            counts = numpy.bincount(keys[valid], minlength=len(decode))
+            sums = numpy.bincount(keys[valid], weights=column[valid], minlength=len(decode))
+            result = {}
+            for code, label in enumerate(decode):
+                if counts[code]:
+                    result[label] = {'sum': sums[code], 'count': counts[code],
+                                     'mean': sums[code] / counts[code]}[agg].item()
+            return result
+
+        if self.backend == 'numpy':
+            # Plain Python numbers out, not numpy scalars
+            keys, column = keys.tolist(), column.tolist()
+        groups: Dict = {}
+        for k, v in zip(keys, column):
+            if v != MISSING:
+                groups.setdefault(k, []).append(v)
+        result = {}
+        for k, values in groups.items():
+            label = (decode[k] if k >= 0 else None) if decode is not None else k
+            if agg == 'sum':
+                result[label] = sum(values)
+            elif agg == 'max':
+                result[label] = max(values)
+            elif agg == 'min':
+                result[label] = min(values)
+            elif agg == 'count':
+                result[label] = len(values)
+            elif agg == 'mean':
+                result[label] = sum(values) / len(values)
+            else:
+                raise ValueError(f"Unknown aggregation: {agg}")
+        return result
+
+    def rows(self, fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Materialize rows as dicts (None for missing values); meant for the handful of rows a view actually shows"""
+        fields = fields or (list(NUMERIC_COLUMNS) + list(CATEGORICAL_COLUMNS))
+        return [{name: self.value(name, i) for name in fields} for i in range(self._size)]
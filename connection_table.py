@@ -0,0 +1,208 @@
+"""
+System-wide socket table joined to processes by PID.
+
+Per-process net_connections() re-reads every /proc/net table for each PID. The
+table here is read once per cycle instead: on Linux /proc/net/{tcp,tcp6,udp,udp6}
+are parsed directly and socket inodes are resolved to (pid, fd) through a cache
+that survives between cycles, so /proc/*/fd is only rescanned when a socket
+shows up that the cache has not seen. Each cycle re-reads the fd link of every
+cached owner and drops the ones that no longer point at the socket (process
+exited, fd closed, pid reused), and the whole cache is rebuilt at least every
+FULL_RESCAN_INTERVAL seconds to pick up owners a socket gained later (fork,
+fd passing). Other platforms use one psutil.net_connections() call.
+"""
+import os
+import socket
+import sys
+import threading
+import time
+import logging
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import psutil
+
+from instrumentation import registry as instrumentation, timed
+from records import ConnectionRecord
+
+logger = logging.getLogger(__name__)
+
+# /proc/net table -> (family, type)
+PROC_NET_TABLES = {
+    'tcp': (socket.AF_INET, socket.SOCK_STREAM),
+    'tcp6': (socket.AF_INET6, socket.SOCK_STREAM),
+    'udp': (socket.AF_INET, socket.SOCK_DGRAM),
+    'udp6': (socket.AF_INET6, socket.SOCK_DGRAM),
+}
+
+# Kernel TCP state codes, named as psutil reports them
+TCP_STATES = {
+    '01': psutil.CONN_ESTABLISHED,
+    '02': psutil.CONN_SYN_SENT,
+    '03': psutil.CONN_SYN_RECV,
+    '04': psutil.CONN_FIN_WAIT1,
+    '05': psutil.CONN_FIN_WAIT2,
+    '06': psutil.CONN_TIME_WAIT,
+    '07': psutil.CONN_CLOSE,
+    '08': psutil.CONN_CLOSE_WAIT,
+    '09': psutil.CONN_LAST_ACK,
+    '0A': psutil.CONN_LISTEN,
+    '0B': psutil.CONN_CLOSING,
+}
+
+# Longest a cached inode -> (pid, fd) map is trusted before a full /proc/*/fd rescan
+FULL_RESCAN_INTERVAL = 60.0
+
+
+def _decode_address(address: str, family: int) -> Optional[Tuple[str, int]]:
+    """Decode a hex 'ADDR:PORT' field; like psutil, a zero port means no address"""
+    ip, port = address.split(':')
+    port = int(port, 16)
+    if not port:
+        return None
+    packed = bytes.fromhex(ip)
+    if sys.byteorder == 'little':
+        # The kernel prints each 32-bit word in host byte order
+        packed = b''.join(packed[i:i + 4][::-1] for i in range(0, len(packed), 4))
+    return socket.inet_ntop(family, packed), port
+
+
+def parse_proc_net(text: str, family: int, sock_type: int) -> Iterator[Tuple[int, Tuple]]:
+    """Yield (inode, (family, type, laddr, raddr, status)) for each socket in a /proc/net table"""
+    is_tcp = sock_type == socket.SOCK_STREAM
+    family_name, type_name = str(family), str(sock_type)
+    for line in text.splitlines()[1:]:
+        fields = line.split()
+        if len(fields) < 10:
+            continue
+        inode = int(fields[9])
+        if not inode:
+            # TIME_WAIT and similar sockets no longer belong to any process
+            continue
+        status = TCP_STATES.get(fields[3], psutil.CONN_NONE) if is_tcp else psutil.CONN_NONE
+        yield inode, (family_name, type_name, _decode_address(fields[1], family),
+                      _decode_address(fields[2], family), status)
+
+
+class ConnectionTable:
+    """One socket snapshot per cycle, indexed by PID"""
+
+    def __init__(self, proc_root: str = '/proc', rescan_interval: float = FULL_RESCAN_INTERVAL):
+        self.proc_root = proc_root
+        self.rescan_interval = rescan_interval
+        self.use_proc = sys.platform.startswith('linux') and os.path.isdir(os.path.join(proc_root, 'net'))
+        # inode -> [(pid, fd)], kept across cycles
+        self._owners: Dict[int, List[Tuple[int, int]]] = {}
+        # Inodes a rescan could not attribute (other users' processes, kernel sockets)
+        self._unowned: Set[int] = set()
+        self._lock = threading.Lock()
+        self._scanned: Optional[float] = None
+        self.fd_scans = 0
+
+    def _read_tables(self) -> Dict[int, Tuple]:
+        sockets = {}
+        for table, (family, sock_type) in PROC_NET_TABLES.items():
+            try:
+                with open(os.path.join(self.proc_root, 'net', table), 'r') as f:
+                    text = f.read()
+            except OSError:
+                continue
+            sockets.update(parse_proc_net(text, family, sock_type))
+        return sockets
+
+    def _scan_fds(self):
+        """Rebuild inode -> (pid, fd) from /proc/*/fd"""
+        owners: Dict[int, List[Tuple[int, int]]] = {}
+        for entry in os.listdir(self.proc_root):
+            if not entry.isdigit():
+                continue
+            fd_dir = os.path.join(self.proc_root, entry, 'fd')
+            try:
+                fds = os.listdir(fd_dir)
+            except OSError:
+                continue
+            pid = int(entry)
+            for fd in fds:
+                try:
+                    target = os.readlink(os.path.join(fd_dir, fd))
+                except OSError:
+                    continue
+                if target.startswith('socket:['):
+                    owners.setdefault(int(target[8:-1]), []).append((pid, int(fd)))
+        self._owners = owners
+        self._scanned = time.monotonic()
+        self.fd_scans += 1
+        instrumentation.increment('connections.fd_scans')
+
+    def _owns(self, inode: int, pid: int, fd: int) -> bool:
+        """Whether /proc/<pid>/fd/<fd> still refers to the socket"""
+        try:
+            return os.readlink(os.path.join(self.proc_root, str(pid), 'fd', str(fd))) == f'socket:[{inode}]'
+        except OSError:
+            return False
+
+    def _revalidate(self, live: Set[int]):
+        """Drop cached owners whose fd no longer refers to their socket; an inode left with none is unseen again"""
+        for inode in [inode for inode in self._owners if inode in live]:
+            owners = [(pid, fd) for pid, fd in self._owners[inode] if self._owns(inode, pid, fd)]
+            if owners:
+                self._owners[inode] = owners
+            else:
+                del self._owners[inode]
+                instrumentation.increment('connections.stale_owners')
+
+    def _snapshot_proc(self) -> Dict[int, Tuple[ConnectionRecord, ...]]:
+        sockets = self._read_tables()
+        live = set(sockets)
+        self._revalidate(live)
+        unresolved = [inode for inode in sockets if inode not in self._owners and inode not in self._unowned]
+        expired = self._scanned is None or time.monotonic() - self._scanned >= self.rescan_interval
+        if unresolved or (sockets and expired):
+            self._scan_fds()
+        self._unowned = {inode for inode in live if inode not in self._owners}
+        # Forget sockets that have closed so the cache tracks only live inodes
+        for inode in [inode for inode in self._owners if inode not in live]:
+            del self._owners[inode]
+
+        by_pid: Dict[int, List[ConnectionRecord]] = {}
+        for inode, (family, sock_type, laddr, raddr, status) in sockets.items():
+            for pid, fd in self._owners.get(inode, ()):
+                by_pid.setdefault(pid, []).append(ConnectionRecord(fd, family, sock_type, laddr, raddr, status))
+        return {pid: tuple(records) for pid, records in by_pid.items()}
+
+    @staticmethod
+    def _snapshot_psutil() -> Optional[Dict[int, Tuple[ConnectionRecord, ...]]]:
+        try:
+            connections = psutil.net_connections(kind='inet')
+        except psutil.AccessDenied:
+            # e.g. macOS without root; callers fall back to per-process lookups
+            return None
+        by_pid: Dict[int, List[ConnectionRecord]] = {}
+        for conn in connections:
+            if conn.pid is not None:
+                by_pid.setdefault(conn.pid, []).append(ConnectionRecord.from_psutil(conn))
+        return {pid: tuple(records) for pid, records in by_pid.items()}
+
+    @timed('probe.connection_table')
+    def snapshot(self) -> Optional[Dict[int, Tuple[ConnectionRecord, ...]]]:
+        """pid -> connections for every process, or None if the system-wide table is unavailable"""
+        with self._lock:
+            try:
+                if self.use_proc:
+                    return self._snapshot_proc()
+                return self._snapshot_psutil()
+            except Exception as e:
+                logger.error(f"Error reading connection table: {e}")
+                return None
+
+
+_table: Optional[ConnectionTable] = None
+_table_lock = threading.Lock()
+
+
+def get_connection_table() -> ConnectionTable:
+    """Process-wide table, so the inode cache carries over between scans"""
+    global _table
+    with _table_lock:
+        if _table is None:
+            _table = ConnectionTable()
+        return _table
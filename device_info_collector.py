@@ -6,41 +6,186 @@ import json
 import logging
 import platform
 import psutil
-import asyncio
-import websockets
+import threading
 import time
-import curses
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from functools import partial
 from typing import Dict, List, Optional, Union, Tuple
 from datetime import datetime
+
+from anomaly import AnomalyDetector
+from cgroups import CgroupCollector
+from columnar import ProcessColumns
+from hardware_identity import get_hardware_identity
+from instrumentation import registry as instrumentation, timed, format_stats, profiler_running
+from inventory_worker import InventoryWorker
+from package_inventory import get_linux_packages, parse_registry_output
+from process_tree import ProcessTree
+from processes import get_process_columns
+from proc_sampler import create_proc_sampler
+from records import SoftwareRecord, to_serializable
+from rollups import RollupStore
+from section_serializer import SectionSerializer
+
 API_HOST = '127.0.0.1:8000'
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('device_info_collector.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+
+# Per-probe deadlines (seconds) for the concurrent collection in DeviceInfoCollector.__init__
+PROBE_TIMEOUTS = {
+    'hostname': 5,
+    'ip_address': 5,
+    'mac_address': 5,
+    'os_info': 10,
+    'serial_number': 15,
+    'installed_software': 60,
+    'system_manufacturer': 15,
+    'system_model': 15,
+    'performance_metrics': 15
+}
+
+# Usage percentages above which get_active_alerts raises an alert
+ALERT_THRESHOLDS = {
+    'memory': 85,
+    'cpu': 90,
+    'disk': 80
+}
+
 class DeviceInfoCollector:
-    def __init__(self):
+    @classmethod
+    def from_snapshot(cls, system_info: Dict, use_proc_sampler: bool = True,
+                      use_inventory_worker: bool = False) -> 'DeviceInfoCollector':
+        """Build a collector around an existing system_info (e.g. a saved device_info.json) without probing"""
+        return cls(use_proc_sampler, use_inventory_worker, system_info=system_info)
+
+    def __init__(self, use_proc_sampler: bool = True, use_inventory_worker: bool = False,
+                 system_info: Optional[Dict] = None):
+        """Probe the device, unless system_info is given (see from_snapshot)"""
+        # Linux /proc fast path for CPU/memory/network/disk I/O; None means psutil is used
+        self._proc_sampler = create_proc_sampler() if use_proc_sampler else None
+        # Separate process for the subprocess/parser-heavy software inventory, so it never holds our GIL
+        self._inventory_worker = InventoryWorker(timeout=PROBE_TIMEOUTS['installed_software']) \
+            if use_inventory_worker else None
+        # Latest columnar process scan, shared by every view (see get_process_snapshot)
+        self._process_snapshot: Optional[ProcessColumns] = None
+        self._process_lock = threading.Lock()
+        # Parent -> children index over the same scans, updated incrementally on each rescan
+        self.process_tree = ProcessTree()
+        # Probes that missed their deadline; filled in later if they eventually finish
+        self.timed_out_probes: List[str] = []
+        # Memoized per-section JSON; static sections are encoded once, not every cycle
+        self._serializer = SectionSerializer(default=to_serializable)
+        # Raw/minute/hour rollups of every refreshed performance sample, bounded in size
+        self.history = RollupStore()
+        # EWMA baselines per metric and per core; findings join get_active_alerts
+        self.anomalies = AnomalyDetector()
+        # Per-service accounting from cgroupfs, created on first use
+        self._cgroups: Optional[CgroupCollector] = None
+        # Guards replacing system_info against late probe results being stored into it
+        self._info_lock = threading.Lock()
+        if system_info is not None:
+            self.system_info = system_info
+            return
         logger.info("Initializing DeviceInfoCollector")
-        self.system_info = {
-            'hostname': self.get_hostname(),
-            'ip_address': self.get_ip_address(),
-            'mac_address': self.get_mac_address(),
-            'os_info': self.get_os_info(),
-            'serial_number': self.get_serial_number(),
-            'installed_software': self.get_installed_software(),
-            'system_manufacturer': self.get_system_manufacturer(),
-            'system_model': self.get_system_model(),
-            'performance_metrics': self.get_system_performance(),
-            'timestamp': datetime.now().isoformat()
-        }
+        collected = self._collect_system_info()
+        with self._info_lock:
+            self.system_info = collected
         logger.info("Device information collected successfully")
 
+    def _collect_system_info(self) -> Dict:
+        """
+        Run the independent probes concurrently and join them against their
+        deadlines. A probe that times out gets its fallback value and is listed
+        in timed_out_probes; its real result is stored once it arrives.
+        """
+        probes = {
+            'hostname': self.get_hostname,
+            'ip_address': self.get_ip_address,
+            'mac_address': self.get_mac_address,
+            'os_info': self.get_os_info,
+            'serial_number': self.get_serial_number,
+            'installed_software': self.get_installed_software,
+            'system_manufacturer': self.get_system_manufacturer,
+            'system_model': self.get_system_model,
+            'performance_metrics': self.get_system_performance
+        }
+        fallbacks = {
+            'hostname': "unknown",
+            'ip_address': "127.0.0.1",
+            'mac_address': "00:00:00:00:00:00",
+            'os_info': {key: 'unknown' for key in ('system', 'release', 'version', 'machine', 'processor')},
+            'serial_number': None,
+            'installed_software': [],
+            'system_manufacturer': None,
+            'system_model': None,
+            'performance_metrics': {
+                'timestamp': datetime.now().isoformat(),
+                'cpu': {},
+                'memory': {},
+                'disks': [],
+                'network': {},
+                'system': {}
+            }
+        }
+
+        system_info = {}
+        futures = {name: self._start_probe(name, probe) for name, probe in probes.items()}
+        started = time.monotonic()
+
+        for name, future in futures.items():
+            remaining = max(0.0, started + PROBE_TIMEOUTS[name] - time.monotonic())
+            try:
+                system_info[name] = future.result(timeout=remaining)
+            except FuturesTimeoutError:
+                logger.warning(f"Probe '{name}' timed out after {PROBE_TIMEOUTS[name]}s, using fallback value")
+                system_info[name] = fallbacks[name]
+                self.timed_out_probes.append(name)
+                if name != 'performance_metrics':
+                    # A late sample would be older than the next refresh_performance; that refresh replaces it
+                    future.add_done_callback(partial(self._store_late_probe, system_info, name))
+            except Exception as e:
+                logger.error(f"Probe '{name}' failed: {e}")
+                system_info[name] = fallbacks[name]
+
+        # Don't wait for stragglers; their callbacks update system_info when they finish
+        system_info['timestamp'] = datetime.now().isoformat()
+        return system_info
+
+    @staticmethod
+    def _start_probe(name: str, probe) -> Future:
+        """
+        Run a probe on its own daemon thread. Unlike executor workers, a probe
+        stuck past its deadline (e.g. a hung subprocess) never blocks interpreter exit.
+        """
+        future = Future()
+
+        def run():
+            future.set_running_or_notify_cancel()
+            try:
+                result = probe()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        threading.Thread(target=run, name=f'probe-{name}', daemon=True).start()
+        return future
+
+    def _store_late_probe(self, system_info: Dict, name: str, future):
+        """
+        Done-callback for probes that finished after their deadline. Stores into
+        the collector's current system_info (which adopt_snapshot or the
+        dashboard may have replaced), or into the dict still being built.
+        """
+        if future.exception() is not None:
+            logger.error(f"Late probe '{name}' failed: {future.exception()}")
+            return
+        with self._info_lock:
+            self.__dict__.get('system_info', system_info)[name] = future.result()
+            if name in self.timed_out_probes:
+                self.timed_out_probes.remove(name)
+        logger.info(f"Late probe '{name}' completed")
+
     def get_hostname(self) -> str:
         """Get the device hostname (works on all OSes)"""
         try:
@@ -96,84 +241,41 @@ class DeviceInfoCollector:
                 'processor': 'unknown'
             }
 
+    @timed('probe.serial_number')
     def get_serial_number(self) -> Optional[str]:
-        """Get system serial number (OS-specific)"""
-        os_type = platform.system().lower()
-        logger.info(f"Getting serial number for OS: {os_type}")
-
-        try:
-            if os_type == 'windows':
-                result = subprocess.check_output("wmic bios get serialnumber", shell=True)
-                serial = result.decode().split("\n")[1].strip()
-            elif os_type == 'linux':
-                result = subprocess.check_output("sudo dmidecode -s system-serial-number", shell=True)
-                serial = result.decode().strip()
-            elif os_type == 'darwin':  # macOS
-                result = subprocess.check_output("ioreg -l | grep IOPlatformSerialNumber", shell=True)
-                serial = result.decode().split('=')[-1].strip().strip('"')
-            else:
-                logger.warning(f"Unsupported OS type: {os_type}")
-                return None
-
-            return serial if serial else None
-
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Command failed: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Error getting serial number: {e}")
-            return None
-
-    def _get_system_info(self) -> Tuple[Optional[str], Optional[str]]:
-        """Internal method to get both manufacturer and model (OS-specific)"""
-        os_type = platform.system().lower()
-        logger.info(f"Getting system info for OS: {os_type}")
-
-        try:
-            if os_type == 'windows':
-                manufacturer = subprocess.check_output(
-                    "wmic computersystem get manufacturer", shell=True
-                ).decode().split("\n")[1].strip()
-                model = subprocess.check_output(
-                    "wmic computersystem get model", shell=True
-                ).decode().split("\n")[1].strip()
-                return manufacturer, model
-
-            elif os_type == 'linux':
-                with open("/sys/devices/virtual/dmi/id/sys_vendor", "r") as f:
-                    manufacturer = f.read().strip()
-                with open("/sys/devices/virtual/dmi/id/product_name", "r") as f:
-                    model = f.read().strip()
-                return manufacturer, model
-
-            elif os_type == 'darwin':
-                manufacturer = "Apple"
-                model = subprocess.check_output(
-                    ["sysctl", "-n", "hw.model"]
-                ).decode().strip()
-                return manufacturer, model
-
-            else:
-                logger.warning("Unsupported OS")
-                return None, None
-
-        except Exception as e:
-            logger.error(f"Error getting system info: {e}")
-            return None, None
+        """Get system serial number (OS-specific, probed once per process)"""
+        return get_hardware_identity()['serial_number']
 
     def get_system_manufacturer(self) -> Optional[str]:
         """Get system manufacturer"""
-        manufacturer, _ = self._get_system_info()
-        return manufacturer
+        return get_hardware_identity()['manufacturer']
 
     def get_system_model(self) -> Optional[str]:
         """Get system model"""
-        _, model = self._get_system_info()
-        return model
-    def get_installed_software(self) -> List[Dict[str, str]]:
-        """Get installed software (OS-specific)"""
+        return get_hardware_identity()['model']
+
+    @timed('probe.installed_software')
+    def get_installed_software(self) -> List[SoftwareRecord]:
+        """Get installed software, from the inventory worker when enabled"""
+        if self._inventory_worker is not None:
+            software = self._inventory_worker.call('installed_software')
+            if software is None:
+                logger.error("Inventory worker returned no software list")
+                return []
+            return software
+        return self.collect_installed_software()
+
+    def refresh_installed_software(self) -> List[SoftwareRecord]:
+        """Re-read installed software, bypassing the worker's cache"""
+        if self._inventory_worker is not None:
+            self._inventory_worker.invalidate('installed_software')
+        self.system_info['installed_software'] = self.get_installed_software()
+        return self.system_info['installed_software']
+
+    def collect_installed_software(self) -> List[SoftwareRecord]:
+        """Get installed software (OS-specific), in this process"""
         os_type = platform.system().lower()
-        logger.info(f"Getting installed software for OS: {os_type}")
+        logger.debug(f"Getting installed software for OS: {os_type}")
 
         try:
             if os_type == 'windows':
@@ -187,17 +289,22 @@ class DeviceInfoCollector:
             logger.error(f"Error getting installed software: {e}")
             return []
 
+    @timed('probe.system_performance')
     def get_system_performance(self) -> Dict[str, Union[float, List[Dict[str, float]]]]:
         """
         Collect comprehensive system performance metrics including:
         - CPU usage (overall and per-core)
         - Memory usage (total, available, used, percentage)
         - Disk usage (total, used, free, percentage for all partitions)
+        - Disk I/O (read/write counts and bytes)
         - Network I/O (bytes sent/received, packets sent/received)
         - System uptime
         - Temperatures (if available)
         - Battery status (if available)
 
+        On Linux the CPU, memory, disk I/O and network figures come from the
+        /proc fast path (see proc_sampler.py); other platforms use psutil.
+
         Returns:
             dict: Dictionary containing all performance metrics
         """
@@ -211,8 +318,12 @@ class DeviceInfoCollector:
         }
 
         try:
+            if self._proc_sampler is not None:
+                cpu_usage = self._proc_sampler.cpu_percent()
+            else:
+                cpu_usage = psutil.cpu_percent(interval=1, percpu=True)
+
             # CPU Metrics
-            cpu_usage = psutil.cpu_percent(interval=1, percpu=True)
             metrics['cpu'] = {
                 'overall_usage': sum(cpu_usage) / len(cpu_usage),
                 'per_core_usage': cpu_usage,
@@ -222,18 +333,22 @@ class DeviceInfoCollector:
             }
 
             # Memory Metrics
-            mem = psutil.virtual_memory()
-            metrics['memory'] = {
-                'total': mem.total,
-                'available': mem.available,
-                'used': mem.used,
-                'free': mem.free,
-                'percent': mem.percent,
-                'swap_total': psutil.swap_memory().total,
-                'swap_used': psutil.swap_memory().used,
-                'swap_free': psutil.swap_memory().free,
-                'swap_percent': psutil.swap_memory().percent
-            }
+            if self._proc_sampler is not None:
+                metrics['memory'] = self._proc_sampler.memory()
+            else:
+                mem = psutil.virtual_memory()
+                swap = psutil.swap_memory()
+                metrics['memory'] = {
+                    'total': mem.total,
+                    'available': mem.available,
+                    'used': mem.used,
+                    'free': mem.free,
+                    'percent': mem.percent,
+                    'swap_total': swap.total,
+                    'swap_used': swap.used,
+                    'swap_free': swap.free,
+                    'swap_percent': swap.percent
+                }
 
             # Disk Metrics
             for partition in psutil.disk_partitions(all=False):
@@ -251,18 +366,34 @@ class DeviceInfoCollector:
                 except Exception as e:
                     logger.warning(f"Could not get disk usage for {partition.mountpoint}: {e}")
 
+            # Disk I/O Metrics
+            if self._proc_sampler is not None:
+                metrics['disk_io'] = self._proc_sampler.disk_io()
+            else:
+                disk_io = psutil.disk_io_counters()
+                if disk_io:
+                    metrics['disk_io'] = {
+                        'read_count': disk_io.read_count,
+                        'write_count': disk_io.write_count,
+                        'read_bytes': disk_io.read_bytes,
+                        'write_bytes': disk_io.write_bytes
+                    }
+
             # Network Metrics
-            net_io = psutil.net_io_counters()
-            metrics['network'] = {
-                'bytes_sent': net_io.bytes_sent,
-                'bytes_recv': net_io.bytes_recv,
-                'packets_sent': net_io.packets_sent,
-                'packets_recv': net_io.packets_recv,
-                'errin': net_io.errin,
-                'errout': net_io.errout,
-                'dropin': net_io.dropin,
-                'dropout': net_io.dropout
-            }
+            if self._proc_sampler is not None:
+                metrics['network'] = self._proc_sampler.network()
+            else:
+                net_io = psutil.net_io_counters()
+                metrics['network'] = {
+                    'bytes_sent': net_io.bytes_sent,
+                    'bytes_recv': net_io.bytes_recv,
+                    'packets_sent': net_io.packets_sent,
+                    'packets_recv': net_io.packets_recv,
+                    'errin': net_io.errin,
+                    'errout': net_io.errout,
+                    'dropin': net_io.dropin,
+                    'dropout': net_io.dropout
+                }
 
             # System Metrics
             metrics['system']['uptime'] = psutil.boot_time()
@@ -293,29 +424,90 @@ class DeviceInfoCollector:
 
         return metrics
 
+    def refresh_performance(self) -> Dict:
+        """Re-sample performance metrics into system_info, bump its timestamp and record it in history"""
+        perf = self.get_system_performance()
+        with self._info_lock:
+            self.system_info['performance_metrics'] = perf
+            self.system_info['timestamp'] = datetime.now().isoformat()
+            if 'performance_metrics' in self.timed_out_probes:
+                self.timed_out_probes.remove('performance_metrics')
+        self.history.add(perf)
+        self.anomalies.observe(perf)
+        return perf
+
+    def adopt_snapshot(self, system_info: Dict) -> Dict:
+        """Take another process's published system_info as current, recording its sample like refresh_performance"""
+        with self._info_lock:
+            self.system_info = system_info
+        perf = system_info['performance_metrics']
+        self.history.add(perf)
+        self.anomalies.observe(perf)
+        return perf
+
+    def query(self, metrics: List[str], start=None, end=None, resolution: Optional[str] = None,
+              aggregate: str = 'avg') -> Dict:
+        """Time-range columns from the metric history, e.g. query(['cpu.percent'], '14:02', '14:07')"""
+        return self.history.query(metrics, start, end, resolution, aggregate)
+
+    def summarize(self, metrics: List[str], start=None, end=None, how: str = 'max') -> Dict[str, Optional[float]]:
+        """One value per metric over a time range, e.g. summarize(['disk.percent:*'], '00:00', how='max')"""
+        return self.history.summarize(metrics, start, end, how)
+
+    def get_process_snapshot(self, max_age: float = 1.0) -> ProcessColumns:
+        """
+        Columnar snapshot of all processes, shared by the UI, dashboard and
+        exporters; rescanned only when older than max_age seconds.
+        """
+        with self._process_lock:
+            snapshot = self._process_snapshot
+            if snapshot is None or time.time() - snapshot.timestamp > max_age:
+                snapshot = self._process_snapshot = get_process_columns()
+                self.process_tree.sync(snapshot)
+            return snapshot
+
+    def get_process_tree(self, max_age: float = 1.0) -> ProcessTree:
+        """Process tree with subtree CPU/RSS/IO/thread rollups, synced to the latest snapshot"""
+        self.get_process_snapshot(max_age)
+        return self.process_tree
+
+    def get_cgroup_usage(self) -> Dict[str, Dict]:
+        """
+        CPU, memory, I/O and pid usage per cgroup (service or container) from
+        the kernel's accounting files; rates appear from the second call on.
+        Empty where there is no cgroup filesystem.
+        """
+        if self._cgroups is None:
+            self._cgroups = CgroupCollector()
+        try:
+            return self._cgroups.sample()
+        except Exception as e:
+            logger.error(f"Error reading cgroup accounting: {e}")
+            return {}
+
+    @timed('probe.running_processes')
     def get_running_processes(self, top_n: int = 10) -> List[Dict[str, Union[str, float]]]:
         """Get top running processes by CPU usage"""
-        processes = []
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status']):
-                try:
-                    processes.append({
-                        'pid': proc.info['pid'],
-                        'name': proc.info['name'],
-                        'cpu': proc.info['cpu_percent'],
-                        'memory': proc.info['memory_percent'],
-                        'status': proc.info['status']
-                    })
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
-
-            # Sort by CPU usage and get top N
-            processes.sort(key=lambda p: p['cpu'], reverse=True)
-            return processes[:top_n]
+            top = self.get_process_snapshot().top('cpu_percent', top_n)
+            return [{
+                'pid': row['pid'],
+                'name': row['name'],
+                'cpu': row['cpu_percent'],
+                'memory': row['memory_percent'],
+                'status': row['status']
+            } for row in top.rows(('pid', 'name', 'cpu_percent', 'memory_percent', 'status'))]
         except Exception as e:
             logger.error(f"Error getting running processes: {e}")
             return []
 
+    def stats(self) -> Dict:
+        """Self-instrumentation: per-probe timing histograms, counters and profiler state"""
+        stats = instrumentation.stats()
+        stats['timed_out_probes'] = list(self.timed_out_probes)
+        stats['profiler_running'] = profiler_running()
+        return stats
+
     def kill_process(self, pid: int) -> bool:
         """Attempt to kill a process by PID"""
         try:
@@ -326,30 +518,47 @@ class DeviceInfoCollector:
             logger.error(f"Error killing process {pid}: {e}")
             return False
 
-    def get_active_alerts(self) -> List[Dict[str, str]]:
-        """Generate system alerts based on current performance"""
+    @staticmethod
+    def alert_values(perf: Dict) -> Dict[str, float]:
+        """
+        Current value of each ALERT_THRESHOLDS metric (fullest disk for 'disk'),
+        None for any the sample lacks (fallback or partial metrics)
+        """
+        return {
+            'memory': (perf.get('memory') or {}).get('percent'),
+            'cpu': (perf.get('cpu') or {}).get('overall_usage'),
+            'disk': max((disk['percent'] for disk in perf.get('disks') or [] if disk.get('percent') is not None),
+                        default=None)
+        }
+
+    def get_active_alerts(self, perf: Optional[Dict] = None) -> List[Dict[str, str]]:
+        """Generate system alerts from `perf`, by default the latest refreshed performance metrics"""
         alerts = []
-        perf = self.get_system_performance()
+        if perf is None:
+            perf = self.system_info['performance_metrics']
+
+        # Readings a fallback or partial sample lacks are None and raise no alert
+        values = self.alert_values(perf)
 
         # Memory alert
-        if perf['memory']['percent'] > 85:
+        if values['memory'] is not None and values['memory'] > ALERT_THRESHOLDS['memory']:
             alerts.append({
                 'type': 'Elevated Memory Usage',
-                'message': f"Memory usage is at {perf['memory']['percent']:.1f}%",
+                'message': f"Memory usage is at {values['memory']:.1f}%",
                 'timestamp': datetime.now().strftime("%I:%M:%S %p")
             })
 
         # CPU alert
-        if perf['cpu']['overall_usage'] > 90:
+        if values['cpu'] is not None and values['cpu'] > ALERT_THRESHOLDS['cpu']:
             alerts.append({
                 'type': 'High CPU Usage',
-                'message': f"CPU usage is at {perf['cpu']['overall_usage']:.1f}%",
+                'message': f"CPU usage is at {values['cpu']:.1f}%",
                 'timestamp': datetime.now().strftime("%I:%M:%S %p")
             })
 
         # Disk alert
-        for disk in perf['disks']:
-            if disk['percent'] > 80:
+        for disk in perf.get('disks') or []:
+            if disk.get('percent') is not None and disk['percent'] > ALERT_THRESHOLDS['disk']:
                 alerts.append({
                     'type': 'Disk Space Warning',
                     'message': f"Disk usage ({disk['mountpoint']}) is at {disk['percent']:.1f}%",
@@ -357,6 +566,10 @@ class DeviceInfoCollector:
                 })
                 break
 
+        # Outliers, level shifts and core imbalance from the latest refresh_performance sample
+        alerts.extend({key: finding[key] for key in ('type', 'message', 'timestamp')}
+                      for finding in self.anomalies.findings())
+
         return alerts
 
     def get_network_speed(self) -> Tuple[float, float]:
@@ -373,8 +586,18 @@ class DeviceInfoCollector:
             logger.error(f"Error getting network speed: {e}")
             return 0.0, 0.0
 
-    def display_live_dashboard(self, refresh_interval: int = 2):
-        """Display a live updating system dashboard"""
+    def display_live_dashboard(self, refresh_interval: Optional[float] = None, snapshot_reader=None):
+        """
+        Display a live updating system dashboard (adaptive refresh unless
+        refresh_interval is given). With a snapshot_reader, frames show the
+        agent's published snapshot while it is fresh instead of sampling here.
+        """
+        import curses
+        from adaptive_scheduler import AdaptiveScheduler
+
+        scheduler = AdaptiveScheduler(ALERT_THRESHOLDS, min_interval=0.5, max_interval=10.0)
+        last_network = None
+
         try:
             # Initialize curses
             stdscr = curses.initscr()
@@ -396,13 +619,33 @@ class DeviceInfoCollector:
                     now = datetime.now()
 
                     # Get current system info
-                    perf = self.get_system_performance()
-                    alerts = self.get_active_alerts()
+                    published = snapshot_reader.read_json() if snapshot_reader is not None else None
+                    if published is not None:
+                        with self._info_lock:
+                            self.system_info = published
+                        perf = published['performance_metrics']
+                    else:
+                        perf = self.refresh_performance()
+                    alerts = self.get_active_alerts(perf)
                     processes = self.get_running_processes(10)
-                    download, upload = self.get_network_speed()
+
+                    # Network speed from the counters of consecutive frames rather than a blocking 1s probe
+                    network = perf['network']
+                    sample_time = time.monotonic()
+                    download = upload = 0.0
+                    if last_network is not None and sample_time > last_network[0]:
+                        elapsed = sample_time - last_network[0]
+                        download = (network['bytes_recv'] - last_network[1]['bytes_recv']) / (1024 * 1024) / elapsed
+                        upload = (network['bytes_sent'] - last_network[1]['bytes_sent']) / (1024 * 1024) / elapsed
+                    last_network = (sample_time, network)
 
                     # Header
-                    stdscr.addstr(0, 0, f"Connected - Last updated: {now.strftime('%I:%M:%S %p')}", curses.A_BOLD)
+                    if refresh_interval is None:
+                        interval = scheduler.observe(self.alert_values(perf))
+                        status = f" | next in {interval:.1f}s ({scheduler.reason})"
+                    else:
+                        interval, status = refresh_interval, ''
+                    stdscr.addstr(0, 0, f"Connected - Last updated: {now.strftime('%I:%M:%S %p')}{status}", curses.A_BOLD)
 
                     # System Info
                     stdscr.addstr(2, 0, "System Information:", curses.A_BOLD)
@@ -420,6 +663,9 @@ class DeviceInfoCollector:
                     if cpu_usage > 90:
                         cpu_color = curses.color_pair(1)  # Red
                     stdscr.addstr(8, 2, f"{cpu_usage:.1f}%", cpu_color)
+                    cpu_hour = self.history.summarize(['cpu.percent'], '-1h', how='avg')['cpu.percent']
+                    if cpu_hour is not None:
+                        stdscr.addstr(8, 10, f"1h avg {cpu_hour:.1f}%")
                     stdscr.addstr(9, 2, f"{perf['cpu']['core_count']} cores | {self.system_info['os_info']['processor']}")
 
                     # Memory Usage
@@ -468,10 +714,21 @@ class DeviceInfoCollector:
                     stdscr.addstr(28, 0, "Running Processes", curses.A_BOLD)
                     stdscr.addstr(29, 0, "PID  Name                 CPU    Memory  Status")
                     for i, proc in enumerate(processes[:10], 30):
-                        stdscr.addstr(i, 0, f"{proc['pid']:<5} {proc['name'][:20]:<20} {proc['cpu']:>5.1f}% {proc['memory']:>7.1f}% {proc['status']}")
+                        cpu = f"{proc['cpu']:>5.1f}%" if proc['cpu'] is not None else f"{'-':>6}"
+                        memory = f"{proc['memory']:>7.1f}%" if proc['memory'] is not None else f"{'-':>8}"
+                        stdscr.addstr(i, 0, f"{proc['pid']:<5} {(proc['name'] or '')[:20]:<20} {cpu} {memory} {proc['status']}")
+
+                    # Agent self-timing (drawn only when the terminal is wide/tall enough)
+                    max_y, max_x = stdscr.getmaxyx()
+                    stats_lines = format_stats(self.stats(), limit=8)
+                    if max_x >= 130 and max_y >= 4 + len(stats_lines):
+                        stdscr.addstr(2, 72, "Agent Self-Timing (ms)", curses.A_BOLD)
+                        stdscr.addstr(3, 72, f"{'probe':<28} {'calls':>6} {'mean':>8} {'p95':>8} {'max':>8}")
+                        for i, line in enumerate(stats_lines, 4):
+                            stdscr.addstr(i, 72, line)
 
                     stdscr.refresh()
-                    time.sleep(refresh_interval)
+                    time.sleep(interval)
 
             except KeyboardInterrupt:
                 pass
@@ -494,62 +751,11 @@ class DeviceInfoCollector:
                 pass
 
     # Windows-specific functions
-    def _get_windows_serial(self) -> Optional[str]:
-        """Get serial number on Windows"""
-        try:
-            output = subprocess.check_output(
-                'wmic bios get serialnumber',
-                shell=True,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            serial = output.strip().split('\n')[1]
-            result = serial if serial else "Unknown"
-            logger.debug(f"Windows serial number: {result}")
-            return result
-        except Exception as e:
-            logger.error(f"Error getting Windows serial number: {e}")
-            return None
-
-    def _get_windows_manufacturer(self) -> Optional[str]:
-        """Get manufacturer on Windows"""
-        try:
-            output = subprocess.check_output(
-                'wmic computersystem get manufacturer',
-                shell=True,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            manufacturer = output.strip().split('\n')[1]
-            result = manufacturer if manufacturer else "Unknown"
-            logger.debug(f"Windows manufacturer: {result}")
-            return result
-        except Exception as e:
-            logger.error(f"Error getting Windows manufacturer: {e}")
-            return None
-
-    def _get_windows_model(self) -> Optional[str]:
-        """Get model on Windows"""
-        try:
-            output = subprocess.check_output(
-                'wmic computersystem get model',
-                shell=True,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            model = output.strip().split('\n')[1]
-            result = model if model else "Unknown"
-            logger.debug(f"Windows model: {result}")
-            return result
-        except Exception as e:
-            logger.error(f"Error getting Windows model: {e}")
-            return None
-
-    def _get_windows_software(self) -> List[Dict[str, str]]:
+    def _get_windows_software(self) -> List[SoftwareRecord]:
         """Get installed software on Windows"""
         software_list = []
         try:
-            logger.info("Getting Windows installed software")
+            logger.debug("Getting Windows installed software")
 
             # Get 64-bit programs
             command = [
@@ -577,30 +783,7 @@ class DeviceInfoCollector:
                 universal_newlines=True
             )
 
-            current_software = {}
-            for line in output.split('\n'):
-                if 'REG_SZ' in line:
-                    name = line.split('REG_SZ')[0].strip()
-                    value = line.split('REG_SZ')[1].strip()
-                    if name == 'DisplayName':
-                        current_software['name'] = value
-                    elif name == 'DisplayVersion':
-                        current_software['version'] = value
-                    elif name == 'Publisher':
-                        current_software['publisher'] = value
-                    elif name == 'InstallDate':
-                        try:
-                            # Try to parse the install date (format is often YYYYMMDD)
-                            install_date = datetime.strptime(value, '%Y%m%d').strftime('%Y-%m-%d')
-                            current_software['install_date'] = install_date
-                        except ValueError:
-                            current_software['install_date'] = value
-                elif line.startswith('HKEY_') and current_software:
-                    software_list.append(current_software)
-                    current_software = {}
-
-            if current_software:
-                software_list.append(current_software)
+            software_list = parse_registry_output(output)
 
             logger.info(f"Found {len(software_list)} installed Windows applications")
         except Exception as e:
@@ -609,120 +792,13 @@ class DeviceInfoCollector:
         return software_list
 
     # Linux-specific functions
-    def _get_linux_serial(self) -> Optional[str]:
-        """Get serial number on Linux"""
-        try:
-            commands = [
-                'sudo dmidecode -s system-serial-number',
-                'cat /sys/class/dmi/id/product_serial',
-                'cat /proc/cpuinfo | grep Serial | cut -d " " -f 2'
-            ]
-
-            for cmd in commands:
-                try:
-                    output = subprocess.check_output(
-                        cmd,
-                        shell=True,
-                        stderr=subprocess.PIPE,
-                        universal_newlines=True
-                    ).strip()
-                    if output and output != "None":
-                        logger.debug(f"Linux serial number: {output} (from command: {cmd})")
-                        return output
-                except Exception as e:
-                    logger.debug(f"Command failed: {cmd} - {e}")
-                    continue
-            logger.warning("Could not determine Linux serial number")
-            return "Unknown"
-        except Exception as e:
-            logger.error(f"Error getting Linux serial number: {e}")
-            return None
-
-    def _get_linux_manufacturer(self) -> Optional[str]:
-        """Get manufacturer on Linux"""
-        try:
-            output = subprocess.check_output(
-                'cat /sys/class/dmi/id/sys_vendor',
-                shell=True,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            ).strip()
-            result = output if output else "Unknown"
-            logger.debug(f"Linux manufacturer: {result}")
-            return result
-        except Exception as e:
-            logger.error(f"Error getting Linux manufacturer: {e}")
-            return None
-
-    def _get_linux_model(self) -> Optional[str]:
-        """Get model on Linux"""
-        try:
-            output = subprocess.check_output(
-                'cat /sys/class/dmi/id/product_name',
-                shell=True,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            ).strip()
-            result = output if output else "Unknown"
-            logger.debug(f"Linux model: {result}")
-            return result
-        except Exception as e:
-            logger.error(f"Error getting Linux model: {e}")
-            return None
-
-    def _get_linux_software(self) -> List[Dict[str, str]]:
-        """Get installed software on Linux"""
+    def _get_linux_software(self) -> List[SoftwareRecord]:
+        """Get installed software on Linux from the dpkg or rpm database (cached on file mtime)"""
         software_list = []
 
         try:
-            logger.info("Getting Linux installed software")
-
-            # Debian/Ubuntu systems (dpkg)
-            try:
-                output = subprocess.check_output(
-                    'dpkg-query -W -f=\'${Package}\t${Version}\t${Maintainer}\t${install-date:date}\n\'',
-                    shell=True,
-                    stderr=subprocess.PIPE,
-                    universal_newlines=True
-                )
-                for line in output.split('\n'):
-                    if line.strip():
-                        parts = line.split('\t')
-                        software = {
-                            'name': parts[0],
-                            'version': parts[1] if len(parts) > 1 else 'Unknown',
-                            'publisher': parts[2] if len(parts) > 2 else 'Unknown'
-                        }
-                        if len(parts) > 3 and parts[3]:
-                            software['install_date'] = parts[3]
-                        software_list.append(software)
-                logger.debug(f"Found {len(software_list)} packages via dpkg")
-            except Exception as e:
-                logger.debug(f"dpkg query failed: {e}")
-
-            # RedHat/CentOS systems (rpm)
-            try:
-                output = subprocess.check_output(
-                    'rpm -qa --queryformat "%{NAME}\t%{VERSION}\t%{VENDOR}\t%{INSTALLTIME:date}\n"',
-                    shell=True,
-                    stderr=subprocess.PIPE,
-                    universal_newlines=True
-                )
-                for line in output.split('\n'):
-                    if line.strip():
-                        parts = line.split('\t')
-                        software = {
-                            'name': parts[0],
-                            'version': parts[1] if len(parts) > 1 else 'Unknown',
-                            'publisher': parts[2] if len(parts) > 2 else 'Unknown'
-                        }
-                        if len(parts) > 3 and parts[3]:
-                            software['install_date'] = parts[3]
-                        software_list.append(software)
-                logger.debug(f"Found {len(software_list)} packages via rpm")
-            except Exception as e:
-                logger.debug(f"rpm query failed: {e}")
-
+            logger.debug("Getting Linux installed software")
+            software_list = get_linux_packages()
             logger.info(f"Total found {len(software_list)} Linux packages")
         except Exception as e:
             logger.error(f"Error getting Linux software: {e}")
@@ -730,27 +806,11 @@ class DeviceInfoCollector:
         return software_list
 
     # macOS-specific functions
-    def _get_macos_serial(self) -> Optional[str]:
-        """Get serial number on macOS"""
-        try:
-            output = subprocess.check_output(
-                'system_profiler SPHardwareDataType | grep Serial',
-                shell=True,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            serial = output.split(':')[-1].strip()
-            logger.debug(f"macOS serial number: {serial}")
-            return serial
-        except Exception as e:
-            logger.error(f"Error getting macOS serial number: {e}")
-            return None
-
-    def _get_macos_software(self) -> List[Dict[str, str]]:
+    def _get_macos_software(self) -> List[SoftwareRecord]:
         """Get installed software on macOS"""
         software_list = []
         try:
-            logger.info("Getting macOS installed software")
+            logger.debug("Getting macOS installed software")
 
             # Get applications from /Applications
             try:
@@ -764,12 +824,12 @@ class DeviceInfoCollector:
 
                 for app_info in apps_data.get('SPApplicationsDataType', []):
                     if isinstance(app_info, dict):
-                        software = {
-                            'name': app_info.get('_name', 'Unknown'),
-                            'version': app_info.get('version', 'Unknown'),
-                            'publisher': app_info.get('obtained_from', 'Unknown'),
-                            'install_date': app_info.get('lastModified', 'Unknown')
-                        }
+                        software = SoftwareRecord(
+                            app_info.get('_name', 'Unknown'),
+                            app_info.get('version', 'Unknown'),
+                            app_info.get('obtained_from', 'Unknown'),
+                            app_info.get('lastModified', 'Unknown')
+                        )
                         software_list.append(software)
             except Exception as e:
                 logger.error(f"Error getting macOS applications: {e}")
@@ -786,12 +846,7 @@ class DeviceInfoCollector:
                     if line.strip():
                         parts = line.split()
                         if len(parts) >= 2:
-                            software = {
-                                'name': parts[0],
-                                'version': parts[1],
-                                'publisher': 'Homebrew',
-                                'install_date': 'Unknown'
-                            }
+                            software = SoftwareRecord(parts[0], parts[1], 'Homebrew', 'Unknown')
                             software_list.append(software)
             except Exception as e:
                 logger.debug(f"Homebrew not available or failed: {e}")
@@ -802,27 +857,38 @@ class DeviceInfoCollector:
 
         return software_list
 
+    @timed('json.to_json')
     def to_json(self, indent: int = 2) -> str:
         """Return collected data as JSON"""
         try:
-            json_data = json.dumps(self.system_info, indent=indent)
-            logger.info("Successfully converted device info to JSON")
+            json_data = self._serializer.encode(self.system_info, indent=indent)
+            logger.debug("Successfully converted device info to JSON")
             return json_data
         except Exception as e:
             logger.error(f"Error converting device info to JSON: {e}")
             return json.dumps({"error": "Could not serialize device info"})
 
+    @timed('json.to_json_file')
     def to_json_file(self, filename: str, indent: int = 2) -> bool:
         """Save collected data to a JSON file"""
         try:
+            json_data = self._serializer.encode(self.system_info, indent=indent)
             with open(filename, 'w') as f:
-                json.dump(self.system_info, f, indent=indent)
-            logger.info(f"Successfully saved device info to {filename}")
+                f.write(json_data)
+            logger.debug(f"Successfully saved device info to {filename}")
             return True
         except Exception as e:
             logger.error(f"Error saving device info to {filename}: {e}")
             return False
 
+    def section_hashes(self, indent: int = 2) -> Dict[str, str]:
+        """Hash of each top-level section as to_json encodes it"""
+        return self._serializer.section_hashes(self.system_info, indent=indent)
+
+    def changed_sections(self, previous: Dict[str, str], indent: int = 2) -> List[str]:
+        """Sections that changed since `previous` (an earlier section_hashes() result)"""
+        return self._serializer.changed_sections(self.system_info, previous, indent=indent)
+
     def print_info(self):
         """Print collected information in readable format"""
         try:
@@ -840,11 +906,18 @@ class DeviceInfoCollector:
             # Print performance metrics
             print("\nPerformance Metrics:")
             perf = self.system_info['performance_metrics']
-            print(f"  CPU Usage: {perf['cpu']['overall_usage']:.1f}%")
-            print(f"  Memory Usage: {perf['memory']['percent']}%")
-            print(f"  Disk Usage (main): {perf['disks'][0]['percent'] if perf['disks'] else 'N/A'}%")
-            print(f"  Network Sent: {perf['network']['bytes_sent'] / (1024*1024):.2f} MB")
-            print(f"  Network Received: {perf['network']['bytes_recv'] / (1024*1024):.2f} MB")
+            values = self.alert_values(perf)
+            network = perf.get('network') or {}
+            print(f"  CPU Usage: {values['cpu']:.1f}%" if values['cpu'] is not None else "  CPU Usage: N/A")
+            print(f"  Memory Usage: {values['memory']}%" if values['memory'] is not None else "  Memory Usage: N/A")
+            disks = perf.get('disks') or []
+            disk = disks[0].get('percent') if disks else None
+            print(f"  Disk Usage (main): {disk}%" if disk is not None else "  Disk Usage (main): N/A")
+            for label, counter in (('Sent', 'bytes_sent'), ('Received', 'bytes_recv')):
+                if network.get(counter) is not None:
+                    print(f"  Network {label}: {network[counter] / (1024*1024):.2f} MB")
+                else:
+                    print(f"  Network {label}: N/A")
 
             print("\nInstalled Software (first 10):")
             for i, software in enumerate(self.system_info['installed_software'][:10], 1):
@@ -856,25 +929,50 @@ class DeviceInfoCollector:
         except Exception as e:
             logger.error(f"Error printing device info: {e}")
 
-async def send_device_info(uri, device_info):
+def _handshake_headers(websockets, headers: Dict[str, str]) -> Dict:
+    """connect() keyword for extra handshake headers (renamed in websockets 14)"""
+    if not headers:
+        return {}
+    major = int(websockets.__version__.split('.')[0])
+    return {'additional_headers' if major >= 14 else 'extra_headers': headers}
+
+
+@timed('ws.send_device_info')
+async def send_device_info(uri, device_info, dictionary=None) -> bool:
+    """
+    Send one device_info report; True once the server acknowledged it. With a
+    payload_compression.PayloadDictionary, its id is offered in the handshake
+    and the message goes out as a dictionary-compressed binary frame if the
+    server accepts it.
+    """
+    import websockets
+    from payload_compression import DICTIONARY_HEADER, build_message
+
     try:
-        logger.info(f"Attempting to connect to WebSocket at {uri}")
-        async with websockets.connect(uri) as websocket:
+        logger.debug(f"Attempting to connect to WebSocket at {uri}")
+        headers = {DICTIONARY_HEADER: dictionary.id} if dictionary is not None else {}
+        async with websockets.connect(uri, **_handshake_headers(websockets, headers)) as websocket:
             # Wait for connection established message
             response = await websocket.recv()
-            logger.info(f"Received: {response}")
+            logger.debug(f"Received: {response}")
             response_data = json.loads(response)
             device_id = response_data.get("device_id")
 
             # Send device_info
-            await websocket.send(json.dumps({
-                "type": "device_info",
-                "data": device_info
-            }))
-            logger.info("Device info sent successfully")
+            message = build_message(device_info)
+            if dictionary is not None and response_data.get('payload_dictionary') == dictionary.id:
+                payload = dictionary.compress(message)
+                instrumentation.increment('ws.bytes_saved', len(message) - len(payload))
+                await websocket.send(payload)
+            else:
+                await websocket.send(message)
+            logger.debug("Device info sent successfully")
 
             # Wait for acknowledgement
             ack = await websocket.recv()
-            logger.info(f"Received acknowledgement: {ack}")
+            logger.debug(f"Received acknowledgement: {ack}")
+            return True
     except Exception as e:
+        instrumentation.increment('ws.send_errors')
         logger.error(f"Error in WebSocket communication: {e}")
+        return False
@@ -0,0 +1,158 @@
+import os
+import platform
+import subprocess
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DMI_ID_DIR = '/sys/class/dmi/id'
+SUBPROCESS_TIMEOUT = 5
+
+_identity: Optional[Dict[str, Optional[str]]] = None
+_timings: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def _timed_step(name: str, func, *args) -> Optional[str]:
+    """Run one probe step, recording how long it took"""
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        _timings[name] = time.perf_counter() - start
+
+
+def _run(command: List[str]) -> Optional[str]:
+    """Run a command once without a shell, with a hard timeout and no stdin to block on"""
+    try:
+        result = subprocess.run(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            timeout=SUBPROCESS_TIMEOUT,
+            check=True
+        )
+        return result.stdout
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Command timed out after {SUBPROCESS_TIMEOUT}s: {' '.join(command)}")
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.debug(f"Command failed: {' '.join(command)} - {e}")
+    return None
+
+
+def _read_dmi(field: str) -> Optional[str]:
+    try:
+        with open(os.path.join(DMI_ID_DIR, field), 'r') as f:
+            value = f.read().strip()
+        return value or None
+    except OSError:
+        return None
+
+
+def _parse_wmic_list(output: Optional[str]) -> Dict[str, str]:
+    """Parse `wmic ... /format:list` output (Key=Value lines)"""
+    values = {}
+    for line in (output or '').splitlines():
+        key, sep, value = line.partition('=')
+        if sep:
+            values[key.strip().lower()] = value.strip()
+    return values
+
+
+def _linux_serial_fallback() -> Optional[str]:
+    """product_serial is root-only; try dmidecode when root, then the ARM /proc/cpuinfo serial"""
+    if hasattr(os, 'geteuid') and os.geteuid() == 0:
+        output = _run(['dmidecode', '-s', 'system-serial-number'])
+        if output and output.strip():
+            return output.strip()
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.startswith('Serial'):
+                    return line.split(':', 1)[1].strip() or None
+    except OSError:
+        pass
+    return None
+
+
+def _probe_linux() -> Dict[str, Optional[str]]:
+    identity = {
+        'manufacturer': _timed_step('dmi_sys_vendor', _read_dmi, 'sys_vendor'),
+        'model': _timed_step('dmi_product_name', _read_dmi, 'product_name'),
+        'serial_number': _timed_step('dmi_product_serial', _read_dmi, 'product_serial')
+    }
+    if identity['serial_number'] is None:
+        identity['serial_number'] = _timed_step('serial_fallback', _linux_serial_fallback)
+    return identity
+
+
+def _probe_windows() -> Dict[str, Optional[str]]:
+    system = _parse_wmic_list(_timed_step(
+        'wmic_computersystem', _run, ['wmic', 'computersystem', 'get', 'manufacturer,model', '/format:list']
+    ))
+    bios = _parse_wmic_list(_timed_step(
+        'wmic_bios', _run, ['wmic', 'bios', 'get', 'serialnumber', '/format:list']
+    ))
+    return {
+        'manufacturer': system.get('manufacturer') or None,
+        'model': system.get('model') or None,
+        'serial_number': bios.get('serialnumber') or None
+    }
+
+
+def _probe_darwin() -> Dict[str, Optional[str]]:
+    serial = None
+    output = _timed_step('ioreg', _run, ['ioreg', '-rd1', '-c', 'IOPlatformExpertDevice'])
+    for line in (output or '').splitlines():
+        if 'IOPlatformSerialNumber' in line:
+            serial = line.split('=')[-1].strip().strip('"') or None
+            break
+    model = _timed_step('sysctl_hw_model', _run, ['sysctl', '-n', 'hw.model'])
+    return {
+        'manufacturer': 'Apple',
+        'model': model.strip() if model and model.strip() else None,
+        'serial_number': serial
+    }
+
+
+def get_hardware_identity() -> Dict[str, Optional[str]]:
+    """
+    Serial number, manufacturer and model probed once per process.
+    Every subprocess runs at most once and is bounded by SUBPROCESS_TIMEOUT.
+    """
+    global _identity
+    with _lock:
+        if _identity is not None:
+            return dict(_identity)
+
+        os_type = platform.system().lower()
+        logger.info(f"Probing hardware identity for OS: {os_type}")
+        start = time.perf_counter()
+        try:
+            if os_type == 'linux':
+                identity = _probe_linux()
+            elif os_type == 'windows':
+                identity = _probe_windows()
+            elif os_type == 'darwin':
+                identity = _probe_darwin()
+            else:
+                logger.warning(f"Unsupported OS type: {os_type}")
+                identity = {'manufacturer': None, 'model': None, 'serial_number': None}
+        except Exception as e:
+            logger.error(f"Error probing hardware identity: {e}")
+            identity = {'manufacturer': None, 'model': None, 'serial_number': None}
+        _timings['total'] = time.perf_counter() - start
+
+        logger.debug(f"Hardware identity probe timings: {get_probe_timings()}")
+        _identity = identity
+        return dict(_identity)
+
+
+def get_probe_timings() -> Dict[str, float]:
+    """Per-step durations (seconds) of the hardware identity probe"""
+    return dict(_timings)
@@ -0,0 +1,263 @@
+import bisect
+import cProfile
+import functools
+import inspect
+import io
+import pstats
+import signal
+import sys
+import threading
+import time
+import logging
+from collections import Counter as FrameCounter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds; the last bucket catches everything slower
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; observe() is O(log buckets) and allocation free"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'min', 'max', '_lock')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, fraction: float) -> float:
+        """Upper bound of the bucket containing the given quantile (max for the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            count = self.count
+            return {
+                'count': count,
+                'sum': self.total,
+                'mean': self.total / count if count else 0.0,
+                'min': self.min if count else 0.0,
+                'max': self.max,
+                'p50': self.quantile(0.5),
+                'p95': self.quantile(0.95),
+                'p99': self.quantile(0.99),
+                'buckets': dict(zip([str(b) for b in self.bounds] + ['+Inf'], self.counts))
+            }
+
+
+class Instrumentation:
+    """Registry of per-probe timing histograms, counters and gauges"""
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.enabled = True
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float):
+        """Record the current value of a level (queue depth, bytes held, ...)"""
+        with self._lock:
+            self._gauges[name] = value
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time a block into the histogram `name`; exceptions also bump `name.errors`"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.increment(f"{name}.errors")
+            raise
+        finally:
+            self.histogram(name).observe(time.perf_counter() - start)
+
+    def timed(self, name: Optional[str] = None):
+        """Decorator form of timer(); works for plain and async functions"""
+        def decorator(func):
+            metric = name or func.__name__
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(metric):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(metric):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, Dict]:
+        """Snapshot of all timers, counters and gauges"""
+        with self._lock:
+            histograms = dict(self._histograms)
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        return {
+            'timers': {name: histogram.snapshot() for name, histogram in sorted(histograms.items())},
+            'counters': counters,
+            'gauges': gauges
+        }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+
+class SamplingProfiler:
+    """Low-overhead statistical profiler sampling every thread's stack from a background thread"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = FrameCounter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                self.samples[f"{code.co_filename}:{frame.f_lineno} {code.co_name}"] += 1
+
+    def report(self, limit: int = 25) -> str:
+        total = sum(self.samples.values()) or 1
+        lines = [f"{count * 100.0 / total:6.2f}%  {count:>6}  {location}" for location, count in self.samples.most_common(limit)]
+        return '\n'.join(lines)
+
+
+registry = Instrumentation()
+timed = registry.timed
+timer = registry.timer
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def enable_profiler(mode: str = 'sampling', interval: float = 0.01):
+    """
+    Start profiling at runtime. 'cprofile' profiles the calling thread with
+    cProfile; 'sampling' samples all threads' stacks every `interval` seconds.
+    """
+    global _profiler
+    with _profiler_lock:
+        if _profiler is not None:
+            return
+        if mode == 'cprofile':
+            _profiler = cProfile.Profile()
+            _profiler.enable()
+        elif mode == 'sampling':
+            _profiler = SamplingProfiler(interval)
+            _profiler.start()
+        else:
+            raise ValueError(f"Unknown profiler mode: {mode}")
+        logger.info(f"Profiler enabled ({mode})")
+
+
+def disable_profiler(limit: int = 25) -> Optional[str]:
+    """Stop the running profiler and return its report"""
+    global _profiler
+    with _profiler_lock:
+        profiler, _profiler = _profiler, None
+    if profiler is None:
+        return None
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        report = output.getvalue()
+    else:
+        profiler.stop()
+        report = profiler.report(limit)
+    logger.info("Profiler disabled")
+    return report
+
+
+def profiler_running() -> bool:
+    return _profiler is not None
+
+
+def install_profiler_signal(report_path: str = 'agent_profile.txt', mode: str = 'sampling'):
+    """On POSIX, toggle the profiler with SIGUSR1; each stop writes the report to report_path"""
+    if not hasattr(signal, 'SIGUSR1'):
+        return
+
+    def toggle(signum, frame):
+        if profiler_running():
+            report = disable_profiler()
+            with open(report_path, 'w') as f:
+                f.write(report or '')
+        else:
+            enable_profiler(mode)
+
+    signal.signal(signal.SIGUSR1, toggle)
+
+
+def format_stats(stats: Dict, limit: Optional[int] = None) -> List[str]:
+    """One line per timer: name, count, mean/p95/max in milliseconds"""
+    lines = []
+    timers = sorted(stats['timers'].items(), key=lambda item: item[1]['sum'], reverse=True)
+    for name, timing in timers[:limit]:
+        lines.append(
+            f"{name[:28]:<28} {timing['count']:>6} "
+            f"{timing['mean'] * 1000:>8.2f} {timing['p95'] * 1000:>8.2f} {timing['max'] * 1000:>8.2f}"
+        )
+    return lines
@@ -0,0 +1,153 @@
+"""
+Long-lived worker process for slow inventory probes.
+
+Software inventory shells out to reg/dpkg/rpm/system_profiler and parses
+thousands of lines; in-process that holds the GIL and stalls the sampler and
+the Tk loop. The worker runs those jobs in a separate interpreter behind a
+request/response pipe. Results are cached for a TTL, and a job that overruns
+its timeout gets the worker killed (and respawned on the next call) while the
+caller falls back to the last cached result.
+"""
+import atexit
+import itertools
+import multiprocessing
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from instrumentation import registry as instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+def _installed_software():
+    from device_info_collector import DeviceInfoCollector
+    return DeviceInfoCollector.from_snapshot({}, use_proc_sampler=False).collect_installed_software()
+
+
+# Jobs the worker can run, by name
+JOBS: Dict[str, Callable[[], Any]] = {
+    'installed_software': _installed_software,
+}
+
+
+def _worker_main(conn):
+    """Worker loop: (request_id, job) in, (request_id, ok, result or error) out; None stops it"""
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        request_id, job = request
+        try:
+            conn.send((request_id, True, JOBS[job]()))
+        except Exception as e:
+            conn.send((request_id, False, f"{type(e).__name__}: {e}"))
+
+
+class InventoryWorker:
+    """Client side of the worker; safe to share between threads (one request in flight at a time)"""
+
+    def __init__(self, ttl: float = 3600.0, timeout: float = 60.0):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._context = multiprocessing.get_context('spawn')  # never fork the UI/sampler threads
+        self._process = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        parent, child = self._context.Pipe()
+        self._process = self._context.Process(target=_worker_main, args=(child,), name='inventory-worker', daemon=True)
+        self._process.start()
+        child.close()
+        self._conn = parent
+        instrumentation.increment('inventory.worker_starts')
+
+    def _kill(self):
+        process, self._process = self._process, None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if process is not None:
+            process.kill()
+            process.join(timeout=5)
+
+    def cached(self, job: str) -> Optional[Any]:
+        entry = self._cache.get(job)
+        return entry[1] if entry else None
+
+    def call(self, job: str, max_age: Optional[float] = None, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Result of `job`, from the cache if younger than max_age (default ttl).
+        Returns the last cached result (or None) if the job fails or times out.
+        """
+        if job not in JOBS:
+            raise ValueError(f"Unknown inventory job: {job}")
+        max_age = self.ttl if max_age is None else max_age
+        timeout = self.timeout if timeout is None else timeout
+        entry = self._cache.get(job)
+        if entry and time.monotonic() - entry[0] < max_age:
+            return entry[1]
+
+        deadline = time.monotonic() + timeout
+        if not self._lock.acquire(timeout=timeout):
+            return self.cached(job)
+        try:
+            # Another caller may have refreshed the entry while we waited
+            entry = self._cache.get(job)
+            if entry and time.monotonic() - entry[0] < max_age:
+                return entry[1]
+
+            with instrumentation.timer(f'inventory.{job}'):
+                self._ensure_started()
+                request_id = next(self._request_ids)
+                self._conn.send((request_id, job))
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._conn.poll(remaining):
+                        logger.error(f"Inventory job {job} timed out after {timeout}s; restarting worker")
+                        instrumentation.increment('inventory.worker_kills')
+                        self._kill()
+                        return self.cached(job)
+                    response_id, ok, result = self._conn.recv()
+                    if response_id == request_id:
+                        break
+
+            if not ok:
+                logger.error(f"Inventory job {job} failed: {result}")
+                return self.cached(job)
+            self._cache[job] = (time.monotonic(), result)
+            return result
+        except (EOFError, OSError) as e:
+            # Worker died mid-request
+            logger.error(f"Inventory worker failed during {job}: {e}")
+            self._kill()
+            return self.cached(job)
+        finally:
+            self._lock.release()
+
+    def invalidate(self, job: Optional[str] = None):
+        if job is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(job, None)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.send(None)
+                except OSError:
+                    pass
+            if self._process is not None:
+                self._process.join(timeout=2)
+            self._kill()
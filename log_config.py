@@ -0,0 +1,116 @@
+"""
+Logging setup for the entry points (never run at import).
+
+Records go through a QueueHandler, so callers on hot paths only enqueue. A
+QueueListener thread does the formatting and disk I/O into a size-rotated
+file plus the console. Before a record is queued, a rate-limit filter drops
+repeats of the same message (numbers ignored when matching) beyond a small
+burst per window, such as a dead WebSocket failing every 5s. The next record
+that gets through says how many were suppressed.
+"""
+import atexit
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional, Tuple
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Numbers (counts, percentages, ports, timings) don't make a message distinct
+_NUMBERS = re.compile(r'\d+(\.\d+)?')
+
+
+class RateLimitFilter(logging.Filter):
+    """Let `burst` records per message key through every `interval` seconds"""
+
+    def __init__(self, interval: float = 60.0, burst: int = 1, min_level: int = logging.INFO, max_keys: int = 1024):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.min_level = min_level
+        self.max_keys = max_keys
+        # key -> [window start, records passed in window, records suppressed]
+        self._windows: 'OrderedDict[Tuple, list]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.min_level:
+            return True
+        key = (record.name, record.levelno, _NUMBERS.sub('#', record.getMessage()))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                self._windows.move_to_end(key)
+                while len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+                if suppressed:
+                    record.msg = f"{record.getMessage()} (suppressed {suppressed} similar messages)"
+                    record.args = None
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_lock = threading.Lock()
+
+
+def configure_logging(log_file: Optional[str] = 'device_info_collector.log', level: int = logging.INFO,
+                      max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3, console: bool = True,
+                      rate_limit_interval: float = 60.0, rate_limit_burst: int = 1) -> QueueListener:
+    """
+    Route the root logger through a queue to a rotating file (log_file=None to
+    skip) and the console. Calling it again replaces the previous setup.
+    """
+    global _listener, _queue_handler
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    if log_file:
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                           encoding='utf-8', delay=True)
+        handlers.append(file_handler)
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(rate_limit_interval, rate_limit_burst))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    with _lock:
+        shutdown_logging()
+        root = logging.getLogger()
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+        listener.start()
+        _listener, _queue_handler = listener, queue_handler
+    return listener
+
+
+def shutdown_logging():
+    """Flush queued records and detach the pipeline"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
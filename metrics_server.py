@@ -0,0 +1,305 @@
+"""
+Optional pull endpoint serving the latest cached snapshot.
+
+A background sampler refreshes the snapshot at a fixed interval and renders
+the Prometheus/OpenMetrics text and compact JSON once per sample; scrapes only
+return those precomputed bytes (or 304 when the ETag matches), so any number of
+concurrent scrapers costs the same as none. /query answers time-range requests
+from the collector's metric history.
+
+Requires Flask (listed in requirements.txt).
+"""
+import hashlib
+import math
+import threading
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from instrumentation import registry as instrumentation
+from records import to_serializable
+from section_serializer import SectionSerializer
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+JSON_CONTENT_TYPE = 'application/json'
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, object]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels.items()) + '}'
+
+
+class _MetricWriter:
+    def __init__(self, openmetrics: bool):
+        self.openmetrics = openmetrics
+        self.lines: List[str] = []
+
+    def family(self, name: str, metric_type: str, help_text: str, samples: List[Tuple[Dict, object]], suffix: str = ''):
+        samples = [(labels, value) for labels, value in samples if value is not None]
+        if not samples:
+            return
+        if not self.openmetrics:
+            # Prometheus text names the family after its samples and has no info type
+            name, suffix = name + suffix, ''
+            if metric_type == 'info':
+                metric_type = 'gauge'
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{suffix}{_labels(labels)} {float(value)!r}")
+
+
+def render_metrics(system_info: Dict, openmetrics: bool = False, processes=None, top_processes: int = 10,
+                   agent_stats: Optional[Dict] = None) -> str:
+    """
+    Render a system_info snapshot as Prometheus text, or OpenMetrics text when
+    openmetrics is set. With a columnar process snapshot, the top processes by
+    CPU and by RSS are exported as well; with agent_stats (instrumentation
+    stats()), the agent's own counters and gauges (send_queue.*, ...).
+    """
+    perf = system_info.get('performance_metrics', {})
+    cpu = perf.get('cpu', {})
+    memory = perf.get('memory', {})
+    network = perf.get('network', {})
+    disk_io = perf.get('disk_io', {})
+    os_info = system_info.get('os_info', {})
+    writer = _MetricWriter(openmetrics)
+
+    writer.family('device', 'info', 'Static device identity', [({
+        'hostname': system_info.get('hostname', ''),
+        'ip_address': system_info.get('ip_address', ''),
+        'mac_address': system_info.get('mac_address', ''),
+        'os': f"{os_info.get('system', '')} {os_info.get('release', '')}".strip(),
+        'manufacturer': system_info.get('system_manufacturer') or '',
+        'model': system_info.get('system_model') or '',
+        'serial_number': system_info.get('serial_number') or ''
+    }, 1)], suffix='_info')
+
+    writer.family('device_cpu_usage_percent', 'gauge', 'Overall CPU usage', [({}, cpu.get('overall_usage'))])
+    writer.family('device_cpu_core_usage_percent', 'gauge', 'Per-core CPU usage',
+                  [({'core': i}, usage) for i, usage in enumerate(cpu.get('per_core_usage', []))])
+    writer.family('device_cpu_frequency_mhz', 'gauge', 'Current CPU frequency', [({}, cpu.get('frequency'))])
+
+    writer.family('device_memory_bytes', 'gauge', 'Memory by state',
+                  [({'state': key}, memory.get(key)) for key in ('total', 'available', 'used', 'free')])
+    writer.family('device_memory_usage_percent', 'gauge', 'Memory usage', [({}, memory.get('percent'))])
+    writer.family('device_swap_bytes', 'gauge', 'Swap by state',
+                  [({'state': key}, memory.get(f'swap_{key}')) for key in ('total', 'used', 'free')])
+    writer.family('device_swap_usage_percent', 'gauge', 'Swap usage', [({}, memory.get('swap_percent'))])
+
+    disks = perf.get('disks', [])
+    writer.family('device_disk_bytes', 'gauge', 'Disk space by state', [
+        ({'device': d['device'], 'mountpoint': d['mountpoint'], 'state': key}, d.get(key))
+        for d in disks for key in ('total', 'used', 'free')
+    ])
+    writer.family('device_disk_usage_percent', 'gauge', 'Disk usage',
+                  [({'device': d['device'], 'mountpoint': d['mountpoint']}, d.get('percent')) for d in disks])
+
+    writer.family('device_disk_io_bytes', 'counter', 'Disk bytes transferred',
+                  [({'direction': 'read'}, disk_io.get('read_bytes')), ({'direction': 'write'}, disk_io.get('write_bytes'))],
+                  suffix='_total')
+    writer.family('device_disk_io_operations', 'counter', 'Disk operations',
+                  [({'direction': 'read'}, disk_io.get('read_count')), ({'direction': 'write'}, disk_io.get('write_count'))],
+                  suffix='_total')
+
+    writer.family('device_network_bytes', 'counter', 'Network bytes transferred',
+                  [({'direction': 'sent'}, network.get('bytes_sent')), ({'direction': 'recv'}, network.get('bytes_recv'))],
+                  suffix='_total')
+    writer.family('device_network_packets', 'counter', 'Network packets transferred',
+                  [({'direction': 'sent'}, network.get('packets_sent')), ({'direction': 'recv'}, network.get('packets_recv'))],
+                  suffix='_total')
+    writer.family('device_network_errors', 'counter', 'Network errors',
+                  [({'direction': 'in'}, network.get('errin')), ({'direction': 'out'}, network.get('errout'))],
+                  suffix='_total')
+    writer.family('device_network_drops', 'counter', 'Network drops',
+                  [({'direction': 'in'}, network.get('dropin')), ({'direction': 'out'}, network.get('dropout'))],
+                  suffix='_total')
+
+    system = perf.get('system', {})
+    writer.family('device_boot_time_seconds', 'gauge', 'System boot time (unix time)', [({}, system.get('uptime'))])
+    battery = system.get('battery')
+    if battery:
+        writer.family('device_battery_percent', 'gauge', 'Battery charge', [({}, battery.get('percent'))])
+        writer.family('device_battery_power_plugged', 'gauge', 'Whether AC power is connected',
+                      [({}, 1 if battery.get('power_plugged') else 0)])
+
+    if processes is not None and len(processes):
+        fields = ('pid', 'name', 'cpu_percent', 'rss')
+        top_cpu = processes.top('cpu_percent', top_processes).rows(fields)
+        top_rss = processes.top('rss', top_processes).rows(fields)
+        writer.family('device_process_cpu_percent', 'gauge', 'CPU usage of the busiest processes',
+                      [({'pid': row['pid'], 'name': row['name']}, row['cpu_percent']) for row in top_cpu])
+        writer.family('device_process_rss_bytes', 'gauge', 'Resident memory of the largest processes',
+                      [({'pid': row['pid'], 'name': row['name']}, row['rss']) for row in top_rss])
+
+    if agent_stats is not None:
+        writer.family('device_agent_events', 'counter', 'Agent self-instrumentation counters',
+                      [({'name': name}, value) for name, value in sorted(agent_stats.get('counters', {}).items())],
+                      suffix='_total')
+        writer.family('device_agent_gauge', 'gauge', 'Agent self-instrumentation levels',
+                      [({'name': name}, value) for name, value in sorted(agent_stats.get('gauges', {}).items())])
+
+    if openmetrics:
+        writer.lines.append('# EOF')
+    return '\n'.join(writer.lines) + '\n'
+
+
+class SnapshotCache:
+    """Holds the latest snapshot with its precomputed renderings and ETags"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rendered: Optional[Dict[str, Tuple[bytes, str]]] = None
+        # Static sections of the snapshot are JSON-encoded once and reused across samples
+        self._serializer = SectionSerializer(default=to_serializable)
+        self.version = 0
+        self.updated_at: Optional[float] = None
+
+    def update(self, system_info: Dict, processes=None):
+        """Render every output format once; scrapes then serve these bytes as-is"""
+        agent_stats = instrumentation.stats()
+        outputs = {
+            'prometheus': render_metrics(system_info, processes=processes, agent_stats=agent_stats).encode('utf-8'),
+            'openmetrics': render_metrics(system_info, openmetrics=True, processes=processes,
+                                          agent_stats=agent_stats).encode('utf-8'),
+            'json': self._serializer.encode(system_info, separators=(',', ':')).encode('utf-8')
+        }
+        rendered = {name: (body, f'"{hashlib.sha1(body).hexdigest()}"') for name, body in outputs.items()}
+        with self._lock:
+            self._rendered = rendered
+            self.version += 1
+            self.updated_at = time.time()
+
+    def get(self, output: str) -> Optional[Tuple[bytes, str]]:
+        """(body, etag) for the given output format, or None before the first sample"""
+        with self._lock:
+            rendered = self._rendered
+        return rendered[output] if rendered else None
+
+
+class SnapshotSampler:
+    """Refreshes the collector's performance metrics on a fixed interval and publishes them to the cache"""
+
+    def __init__(self, collector, cache: SnapshotCache, interval: float = 5.0):
+        self.collector = collector
+        self.cache = cache
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.cache.update(self.collector.system_info)
+        self._thread = threading.Thread(target=self._run, name='snapshot-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.collector.refresh_performance()
+                self.cache.update(self.collector.system_info, self.collector.get_process_snapshot())
+            except Exception as e:
+                logger.error(f"Error refreshing metrics snapshot: {e}")
+
+
+def _json_column(column) -> List[Optional[float]]:
+    return [None if math.isnan(value) else value for value in column]
+
+
+def create_app(cache: SnapshotCache, max_age: int = 5, history=None):
+    """
+    Flask app serving /metrics and /snapshot.json from the cache (never
+    sampling on request), plus /query over `history` (a RollupStore) if given.
+    """
+    from flask import Flask, Response, request
+
+    app = Flask(__name__)
+
+    def cached_response(output: str, content_type: str):
+        entry = cache.get(output)
+        if entry is None:
+            return Response('no snapshot yet\n', status=503, mimetype='text/plain')
+        body, etag = entry
+        headers = {'ETag': etag, 'Cache-Control': f'max-age={max_age}'}
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=304, headers=headers)
+        return Response(body, status=200, headers=headers, content_type=content_type)
+
+    @app.route('/metrics')
+    def metrics():
+        if 'application/openmetrics-text' in request.headers.get('Accept', ''):
+            return cached_response('openmetrics', OPENMETRICS_CONTENT_TYPE)
+        return cached_response('prometheus', PROMETHEUS_CONTENT_TYPE)
+
+    @app.route('/snapshot.json')
+    def snapshot():
+        return cached_response('json', JSON_CONTENT_TYPE)
+
+    @app.route('/query')
+    def query():
+        """
+        ?metrics=cpu.percent,disk.percent:*&start=14:02&end=14:07
+        [&resolution=raw|minute|hour][&aggregate=avg|min|max|p95]
+        [&summary=min|max|avg|last][&format=json|csv]
+        """
+        if history is None:
+            return Response('metric history not available\n', status=404, mimetype='text/plain')
+        args = request.args
+        metrics = [name for name in args.get('metrics', '').split(',') if name]
+        if not metrics:
+            return Response('metrics parameter is required\n', status=400, mimetype='text/plain')
+        start, end, resolution = args.get('start'), args.get('end'), args.get('resolution')
+        aggregate = args.get('aggregate', 'avg')
+        try:
+            if 'summary' in args:
+                return history.summarize(metrics, start, end, args['summary'], resolution)
+            if args.get('format') == 'csv':
+                rows = history.iter_rows(metrics, start, end, resolution, aggregate)
+                header = 'time,' + ','.join(history.resolve(metrics)) + '\n'
+
+                def lines():
+                    yield header
+                    for timestamp, values in rows:
+                        yield f"{timestamp:.0f}," + ','.join('' if math.isnan(v) else repr(v) for v in values) + '\n'
+
+                return Response(lines(), mimetype='text/csv')
+            result = history.query(metrics, start, end, resolution, aggregate)
+        except ValueError as e:
+            return Response(f'{e}\n', status=400, mimetype='text/plain')
+        return {
+            'resolution': result['resolution'],
+            'time': result['time'].tolist(),
+            'columns': {name: _json_column(column) for name, column in result['columns'].items()}
+        }
+
+    @app.route('/healthz')
+    def healthz():
+        age = time.time() - cache.updated_at if cache.updated_at else None
+        return {'version': cache.version, 'age_seconds': age}
+
+    return app
+
+
+def serve(collector, host: str = '127.0.0.1', port: int = 9100, interval: float = 5.0):
+    """Start the background sampler and serve the endpoint until interrupted"""
+    cache = SnapshotCache()
+    sampler = SnapshotSampler(collector, cache, interval)
+    sampler.start()
+    app = create_app(cache, max_age=int(interval), history=collector.history)
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    try:
+        app.run(host=host, port=port, threaded=True, use_reloader=False)
+    finally:
+        sampler.stop()
@@ -1,6 +1,17 @@
 from device_info_collector import DeviceInfoCollector
+from log_config import configure_logging
+from snapshot_shm import read_snapshot
 
-collector = DeviceInfoCollector()
-collector.print_info()
-device_info = collector.to_json()
-collector.to_json_file('device_info.json')
+
+def main():
+    configure_logging()
+    # Reuse a running agent's published snapshot rather than collecting everything again
+    published = read_snapshot()
+    collector = DeviceInfoCollector.from_snapshot(published, use_proc_sampler=False) if published \
+        else DeviceInfoCollector()
+    collector.print_info()
+    collector.to_json_file('device_info.json')
+
+
+if __name__ == "__main__":
+    main()
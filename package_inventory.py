@@ -0,0 +1,237 @@
+import os
+import shutil
+import sqlite3
+import struct
+import subprocess
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from records import SoftwareRecord
+
+logger = logging.getLogger(__name__)
+
+DPKG_STATUS_PATH = '/var/lib/dpkg/status'
+DPKG_INFO_DIR = '/var/lib/dpkg/info'
+RPM_DB_DIRS = ('/var/lib/rpm', '/usr/lib/sysimage/rpm')
+RPM_QUERY_TIMEOUT = 60
+
+# rpm header tags and data types used by the sqlite backend reader
+RPMTAG_NAME = 1000
+RPMTAG_VERSION = 1001
+RPMTAG_INSTALLTIME = 1008
+RPMTAG_VENDOR = 1011
+RPM_INT32_TYPE = 4
+RPM_STRING_TYPES = (6, 8, 9)  # STRING, STRING_ARRAY, I18NSTRING
+
+# Parsed inventories keyed on source path -> ((mtime_ns, size), software list)
+_inventory_cache: Dict[str, Tuple[Tuple[int, int], List[SoftwareRecord]]] = {}
+_cache_lock = threading.Lock()
+
+
+def detect_package_manager() -> Optional[str]:
+    """Return 'dpkg' or 'rpm' depending on which package database exists"""
+    if os.path.isfile(DPKG_STATUS_PATH) and os.path.getsize(DPKG_STATUS_PATH) > 0:
+        return 'dpkg'
+    if _find_rpm_database() is not None:
+        return 'rpm'
+    return None
+
+
+def _find_rpm_database() -> Optional[str]:
+    """Locate the rpm database file, preferring the sqlite backend"""
+    for directory in RPM_DB_DIRS:
+        for name in ('rpmdb.sqlite', 'Packages.db', 'Packages'):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                return path
+    return None
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _cached(path: str, loader) -> List[SoftwareRecord]:
+    """Return the inventory for path, re-parsing only when its mtime or size changed"""
+    signature = _file_signature(path)
+    with _cache_lock:
+        entry = _inventory_cache.get(path)
+        if entry is not None and entry[0] == signature:
+            logger.debug(f"Using cached package inventory for {path}")
+            return list(entry[1])
+
+    software_list = list(loader(path))
+    with _cache_lock:
+        _inventory_cache[path] = (signature, software_list)
+    return list(software_list)
+
+
+def clear_cache():
+    """Drop all cached inventories"""
+    with _cache_lock:
+        _inventory_cache.clear()
+
+
+def _dpkg_install_date(package: str, architecture: Optional[str]) -> Optional[str]:
+    """dpkg keeps no install date; the mtime of the package's file list is the closest thing"""
+    candidates = [f"{package}.list"]
+    if architecture:
+        candidates.insert(0, f"{package}:{architecture}.list")
+    for name in candidates:
+        try:
+            mtime = os.stat(os.path.join(DPKG_INFO_DIR, name)).st_mtime
+            return datetime.fromtimestamp(mtime).strftime('%Y-%m-%d')
+        except OSError:
+            continue
+    return None
+
+
+def _dpkg_record(fields: Dict[str, str]) -> Optional[SoftwareRecord]:
+    """Turn a dpkg status stanza into a software entry, skipping packages that are not installed"""
+    if 'Package' not in fields or not fields.get('Status', '').endswith(' installed'):
+        return None
+    return SoftwareRecord(
+        fields['Package'],
+        fields.get('Version', 'Unknown'),
+        fields.get('Maintainer', 'Unknown'),
+        _dpkg_install_date(fields['Package'], fields.get('Architecture'))
+    )
+
+
+def iter_dpkg_status(path: str = DPKG_STATUS_PATH) -> Iterator[SoftwareRecord]:
+    """Stream installed packages out of a dpkg status file one stanza at a time"""
+    wanted = ('Package', 'Status', 'Version', 'Maintainer', 'Architecture')
+    fields = {}
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line == '\n':
+                record = _dpkg_record(fields)
+                if record:
+                    yield record
+                fields = {}
+            elif line[0] not in ' \t':
+                key, _, value = line.partition(':')
+                if key in wanted:
+                    fields[key] = value.strip()
+    record = _dpkg_record(fields)
+    if record:
+        yield record
+
+
+def _parse_rpm_header(blob: bytes) -> Dict[int, object]:
+    """Decode the tags we need from an on-disk rpm header blob"""
+    index_count, data_length = struct.unpack_from('>II', blob, 0)
+    data_start = 8 + index_count * 16
+    values = {}
+    for i in range(index_count):
+        tag, data_type, offset, count = struct.unpack_from('>IIII', blob, 8 + i * 16)
+        if tag not in (RPMTAG_NAME, RPMTAG_VERSION, RPMTAG_INSTALLTIME, RPMTAG_VENDOR):
+            continue
+        position = data_start + offset
+        if data_type in RPM_STRING_TYPES:
+            end = blob.index(b'\0', position)
+            values[tag] = blob[position:end].decode('utf-8', errors='replace')
+        elif data_type == RPM_INT32_TYPE:
+            values[tag] = struct.unpack_from('>I', blob, position)[0]
+    return values
+
+
+def iter_rpm_sqlite(path: str) -> Iterator[SoftwareRecord]:
+    """Stream installed packages directly out of an rpmdb.sqlite database"""
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        for (blob,) in connection.execute('SELECT blob FROM Packages'):
+            try:
+                header = _parse_rpm_header(bytes(blob))
+            except (struct.error, ValueError) as e:
+                logger.debug(f"Skipping unreadable rpm header: {e}")
+                continue
+            if RPMTAG_NAME not in header:
+                continue
+            install_time = header.get(RPMTAG_INSTALLTIME)
+            yield SoftwareRecord(
+                header[RPMTAG_NAME],
+                header.get(RPMTAG_VERSION, 'Unknown'),
+                header.get(RPMTAG_VENDOR, 'Unknown'),
+                datetime.fromtimestamp(install_time).strftime('%Y-%m-%d') if install_time else None
+            )
+    finally:
+        connection.close()
+
+
+def parse_rpm_query_output(output: str) -> Iterator[SoftwareRecord]:
+    """Parse `rpm -qa` output produced with the NAME/VERSION/VENDOR/INSTALLTIME query format"""
+    for line in output.split('\n'):
+        if line.strip():
+            parts = line.split('\t')
+            yield SoftwareRecord(
+                parts[0],
+                parts[1] if len(parts) > 1 else 'Unknown',
+                parts[2] if len(parts) > 2 else 'Unknown',
+                datetime.fromtimestamp(int(parts[3])).strftime('%Y-%m-%d') if len(parts) > 3 and parts[3] else None
+            )
+
+
+def iter_rpm_query(path: str) -> Iterator[SoftwareRecord]:
+    """Fallback for Berkeley DB / ndb rpm databases: one `rpm -qa` call without a shell"""
+    if shutil.which('rpm') is None:
+        logger.warning(f"rpm database {path} found but the rpm binary is missing")
+        return iter(())
+    output = subprocess.run(
+        ['rpm', '-qa', '--queryformat', '%{NAME}\t%{VERSION}\t%{VENDOR}\t%{INSTALLTIME}\n'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True,
+        timeout=RPM_QUERY_TIMEOUT,
+        check=True
+    ).stdout
+    return parse_rpm_query_output(output)
+
+
+def parse_registry_output(output: str) -> List[SoftwareRecord]:
+    """Parse `reg query ...\\Uninstall /s` output into software entries"""
+    software_list = []
+    current_software = {}
+    for line in output.split('\n'):
+        if 'REG_SZ' in line:
+            name, _, value = line.partition('REG_SZ')
+            name = name.strip()
+            value = value.strip()
+            if name == 'DisplayName':
+                current_software['name'] = value
+            elif name == 'DisplayVersion':
+                current_software['version'] = value
+            elif name == 'Publisher':
+                current_software['publisher'] = value
+            elif name == 'InstallDate':
+                try:
+                    # Try to parse the install date (format is often YYYYMMDD)
+                    current_software['install_date'] = datetime.strptime(value, '%Y%m%d').strftime('%Y-%m-%d')
+                except ValueError:
+                    current_software['install_date'] = value
+        elif line.startswith('HKEY_') and current_software:
+            software_list.append(SoftwareRecord.from_dict(current_software))
+            current_software = {}
+
+    if current_software:
+        software_list.append(SoftwareRecord.from_dict(current_software))
+    return software_list
+
+
+def get_linux_packages() -> List[SoftwareRecord]:
+    """Installed packages from whichever package database this host uses, cached on file mtime/size"""
+    manager = detect_package_manager()
+    if manager == 'dpkg':
+        software_list = _cached(DPKG_STATUS_PATH, iter_dpkg_status)
+    elif manager == 'rpm':
+        path = _find_rpm_database()
+        loader = iter_rpm_sqlite if path.endswith('.sqlite') else iter_rpm_query
+        software_list = _cached(path, loader)
+    else:
+        logger.warning("No dpkg or rpm package database found")
+        return []
+    logger.debug(f"Found {len(software_list)} packages via {manager}")
+    return software_list
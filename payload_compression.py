@@ -0,0 +1,154 @@
+"""
+Preset-dictionary (zdict) compression for device_info payloads.
+
+Most payload bytes are repeated keys and values (`per_core_usage`,
+`swap_percent`, publisher strings, software names), so a deflate stream primed
+with a dictionary of those fragments is small even for a single message, where
+plain deflate has no history to refer back to.
+
+A dictionary is trained from sample payloads, identified by a versioned id
+derived from its content, and advertised in the WebSocket handshake; the
+agent only sends compressed (binary) frames once the server echoes the id.
+
+    python cli.py train-dict [--output payload.zdict] [SAMPLE ...]
+"""
+import hashlib
+import json
+import os
+import re
+import zlib
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Handshake header carrying the dictionary id; the server echoes it as
+# 'payload_dictionary' in its connection_established message when it accepts
+DICTIONARY_HEADER = 'X-Payload-Dictionary'
+
+# Bumped whenever the training or framing scheme changes
+DICTIONARY_FORMAT = 'zd1'
+
+# Deflate can only reach back 32 KiB, so a larger dictionary is wasted
+MAX_DICTIONARY_SIZE = 32 * 1024
+
+DEFAULT_DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'payload.zdict')
+
+# Real newlines in files, escaped ones inside a message's JSON string
+_LINE_SPLIT = re.compile(r'\n|\\n')
+
+
+def build_message(device_info: str) -> str:
+    """The text frame send_device_info sends; compressed frames carry exactly these bytes"""
+    return json.dumps({
+        "type": "device_info",
+        "data": device_info
+    })
+
+
+def _fragments(text: str) -> Iterable[str]:
+    """Lines (with their separator) and their key prefixes, the units repeated across payloads"""
+    separator = '\\n' if '\\n' in text else '\n'
+    for line in _LINE_SPLIT.split(text):
+        if len(line.strip()) < 3:
+            continue
+        yield separator + line
+        colon = line.find('": ')
+        if colon > 0:
+            yield separator + line[:colon + 3]
+
+
+def train_dictionary(samples: Iterable[str], size: int = MAX_DICTIONARY_SIZE) -> bytes:
+    """
+    Pick the fragments that save the most bytes (frequency x length) and
+    concatenate them, most valuable last: deflate encodes nearer matches with
+    shorter distances. Frequencies are taken relative to each sample's size so
+    one large sample (e.g. processes.json) can't crowd out the others.
+    """
+    scores = Counter()
+    for sample in samples:
+        if not sample:
+            continue
+        weight = 1.0 / len(sample)
+        for fragment in _fragments(sample):
+            scores[fragment] += weight * len(fragment)
+
+    chosen: List[bytes] = []
+    used = 0
+    for fragment, _ in scores.most_common():
+        encoded = fragment.encode('utf-8')
+        if used + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        used += len(encoded)
+    return b''.join(reversed(chosen))
+
+
+class PayloadDictionary:
+    """A trained zdict plus its id; compresses to raw deflate (no zlib header)"""
+
+    def __init__(self, data: bytes):
+        if not data:
+            raise ValueError("Empty compression dictionary")
+        self.data = data[-MAX_DICTIONARY_SIZE:]
+        self.id = f"{DICTIONARY_FORMAT}-{hashlib.sha256(self.data).hexdigest()[:16]}"
+        # Compressors already primed with the dictionary, per level; copying one
+        # skips re-hashing the dictionary for every message
+        self._primed: Dict[int, object] = {}
+
+    @classmethod
+    def train(cls, samples: Iterable[str], size: int = MAX_DICTIONARY_SIZE) -> 'PayloadDictionary':
+        return cls(train_dictionary(samples, size))
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_DICTIONARY_PATH) -> 'PayloadDictionary':
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def save(self, path: str = DEFAULT_DICTIONARY_PATH):
+        with open(path, 'wb') as f:
+            f.write(self.data)
+
+    def compress(self, text: str, level: int = 6) -> bytes:
+        primed = self._primed.get(level)
+        if primed is None:
+            primed = self._primed[level] = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=self.data)
+        compressor = primed.copy()
+        return compressor.compress(text.encode('utf-8')) + compressor.flush()
+
+    def decompress(self, payload: bytes) -> str:
+        decompressor = zlib.decompressobj(-15, zdict=self.data)
+        return (decompressor.decompress(payload) + decompressor.flush()).decode('utf-8')
+
+
+def load_default_dictionary(path: str = DEFAULT_DICTIONARY_PATH) -> Optional[PayloadDictionary]:
+    """The trained dictionary if one exists, else None (payloads go uncompressed)"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return PayloadDictionary.load(path)
+    except Exception as e:
+        logger.error(f"Error loading compression dictionary {path}: {e}")
+        return None
+
+
+def read_samples(paths: Iterable[str]) -> List[str]:
+    """
+    Load training samples. device_info documents are wrapped in the message
+    envelope so the dictionary learns the escaped form that goes on the wire.
+    """
+    samples = []
+    for path in paths:
+        with open(path, 'r') as f:
+            text = f.read()
+        try:
+            document = json.loads(text)
+        except ValueError:
+            document = None
+        if isinstance(document, dict) and 'hostname' in document:
+            # Re-serialized the way DeviceInfoCollector.to_json does
+            samples.append(build_message(json.dumps(document, indent=2)))
+        else:
+            samples.append(text)
+    return samples
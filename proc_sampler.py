@@ -0,0 +1,232 @@
+import os
+import sys
+import time
+import threading
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bytes per sector as reported by /proc/diskstats (always 512 regardless of device)
+DISKSTATS_SECTOR_SIZE = 512
+
+
+class ProcSampler:
+    """
+    Fast-path sampler for Linux that keeps the /proc files used by
+    get_system_performance open and re-reads them with preadv into a single
+    reusable buffer, parsing only the fields the collector reports.
+
+    One sampler is shared by the UI, agent and dashboard threads, so every
+    public reader holds the lock from the read until its parse is done.
+    """
+
+    PROC_FILES = {
+        'stat': 'stat',
+        'meminfo': 'meminfo',
+        'net_dev': 'net/dev',
+        'diskstats': 'diskstats',
+    }
+
+    MEMINFO_FIELDS = (
+        b'MemTotal', b'MemFree', b'MemAvailable', b'Buffers', b'Cached',
+        b'SReclaimable', b'SwapTotal', b'SwapFree'
+    )
+
+    def __init__(self, proc_root: str = '/proc', sys_block: str = '/sys/block', buffer_size: int = 64 * 1024):
+        self._fds: Dict[str, int] = {}
+        self._buffer = bytearray(buffer_size)
+        # Guards _buffer and the CPU baseline; the shared buffer is only valid until the next _read
+        self._lock = threading.Lock()
+        self._whole_disks = set(os.listdir(sys_block)) if os.path.isdir(sys_block) else None
+        try:
+            for name, path in self.PROC_FILES.items():
+                self._fds[name] = os.open(os.path.join(proc_root, path), os.O_RDONLY)
+        except OSError:
+            self.close()
+            raise
+
+        # Prime CPU counters so the first cpu_percent() call has a baseline
+        self._last_cpu_times = self._read_cpu_times()
+        self._last_cpu_sample = time.monotonic()
+
+    @staticmethod
+    def is_supported() -> bool:
+        """Return True when the /proc fast path can be used on this platform"""
+        return sys.platform.startswith('linux') and hasattr(os, 'preadv') and os.path.exists('/proc/stat')
+
+    def close(self):
+        """Close all held /proc file descriptors"""
+        for fd in self._fds.values():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._fds = {}
+
+    def __del__(self):
+        self.close()
+
+    def _read(self, name: str) -> int:
+        """Re-read a /proc file into the shared buffer and return its length; caller holds _lock"""
+        fd = self._fds[name]
+        while True:
+            length = os.preadv(fd, [self._buffer], 0)
+            if length < len(self._buffer):
+                return length
+            # File outgrew the buffer (e.g. many cores or interfaces); grow and retry
+            self._buffer = bytearray(len(self._buffer) * 2)
+
+    def _lines(self, name: str):
+        """Yield the lines of a /proc file straight out of the shared buffer"""
+        length = self._read(name)
+        buffer = self._buffer
+        start = 0
+        while start < length:
+            end = buffer.find(b'\n', start, length)
+            if end == -1:
+                end = length
+            yield buffer[start:end]
+            start = end + 1
+
+    def _read_cpu_times(self) -> List[tuple]:
+        """Return (busy, total) jiffies for every core listed in /proc/stat"""
+        cpu_times = []
+        for line in self._lines('stat'):
+            if not line.startswith(b'cpu'):
+                break
+            if line[3:4] == b' ':
+                continue  # aggregate "cpu" line, only per-core lines are kept
+            # user nice system idle iowait irq softirq steal (guest time is already in user)
+            fields = [int(v) for v in line.split()[1:9]]
+            total = sum(fields)
+            busy = total - fields[3] - fields[4]
+            cpu_times.append((busy, total))
+        return cpu_times
+
+    def cpu_percent(self, min_interval: float = 0.1) -> List[float]:
+        """
+        Per-core CPU usage since the previous call. Blocks for the remainder of
+        min_interval if called again too soon, so readings are never empty.
+        Unlike psutil.cpu_percent(interval=1) this covers the time since the
+        last call, at least min_interval, rather than a fixed 1s window.
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self._last_cpu_sample
+            if elapsed < min_interval:
+                time.sleep(min_interval - elapsed)
+
+            current = self._read_cpu_times()
+            previous = self._last_cpu_times
+            self._last_cpu_times = current
+            self._last_cpu_sample = time.monotonic()
+
+        usage = []
+        for (busy, total), (prev_busy, prev_total) in zip(current, previous):
+            delta_total = total - prev_total
+            if delta_total <= 0:
+                usage.append(0.0)
+            else:
+                usage.append(round(min(100.0, max(0.0, (busy - prev_busy) * 100.0 / delta_total)), 1))
+        return usage
+
+    def memory(self) -> Dict[str, float]:
+        """Memory and swap figures computed the same way psutil does on Linux"""
+        values = {}
+        wanted = self.MEMINFO_FIELDS
+        with self._lock:
+            for line in self._lines('meminfo'):
+                key, _, rest = line.partition(b':')
+                key = bytes(key)
+                if key in wanted:
+                    values[key] = int(rest.split()[0]) * 1024
+                    if len(values) == len(wanted):
+                        break
+
+        total = values.get(b'MemTotal', 0)
+        free = values.get(b'MemFree', 0)
+        if b'MemAvailable' in values:
+            available = values[b'MemAvailable']
+        else:
+            # Kernels older than 3.14 lack MemAvailable
+            available = free + values.get(b'Buffers', 0) + values.get(b'Cached', 0) + values.get(b'SReclaimable', 0)
+        used = total - available
+        swap_total = values.get(b'SwapTotal', 0)
+        swap_free = values.get(b'SwapFree', 0)
+        swap_used = swap_total - swap_free
+
+        return {
+            'total': total,
+            'available': available,
+            'used': used,
+            'free': free,
+            'percent': round((total - available) * 100.0 / total, 1) if total else 0.0,
+            'swap_total': swap_total,
+            'swap_used': swap_used,
+            'swap_free': swap_free,
+            'swap_percent': round(swap_used * 100.0 / swap_total, 1) if swap_total else 0.0
+        }
+
+    def network(self) -> Dict[str, int]:
+        """Network counters summed over all interfaces (as psutil.net_io_counters does)"""
+        totals = [0] * 8
+        with self._lock:
+            for line in self._lines('net_dev'):
+                _, sep, rest = line.partition(b':')
+                if not sep or b'|' in rest:
+                    continue  # header lines
+                fields = rest.split()
+                # rx: bytes packets errs drop ... tx: bytes packets errs drop
+                totals[0] += int(fields[8])
+                totals[1] += int(fields[0])
+                totals[2] += int(fields[9])
+                totals[3] += int(fields[1])
+                totals[4] += int(fields[2])
+                totals[5] += int(fields[10])
+                totals[6] += int(fields[3])
+                totals[7] += int(fields[11])
+
+        return {
+            'bytes_sent': totals[0],
+            'bytes_recv': totals[1],
+            'packets_sent': totals[2],
+            'packets_recv': totals[3],
+            'errin': totals[4],
+            'errout': totals[5],
+            'dropin': totals[6],
+            'dropout': totals[7]
+        }
+
+    def disk_io(self) -> Dict[str, int]:
+        """Disk I/O counters summed over whole disks, skipping partitions"""
+        read_count = write_count = read_sectors = write_sectors = 0
+        whole_disks = self._whole_disks
+        with self._lock:
+            for line in self._lines('diskstats'):
+                fields = line.split()
+                if len(fields) < 10:
+                    continue
+                if whole_disks is not None and fields[2].decode() not in whole_disks:
+                    continue
+                read_count += int(fields[3])
+                read_sectors += int(fields[5])
+                write_count += int(fields[7])
+                write_sectors += int(fields[9])
+
+        return {
+            'read_count': read_count,
+            'write_count': write_count,
+            'read_bytes': read_sectors * DISKSTATS_SECTOR_SIZE,
+            'write_bytes': write_sectors * DISKSTATS_SECTOR_SIZE
+        }
+
+
+def create_proc_sampler() -> Optional[ProcSampler]:
+    """Return a ProcSampler when the platform supports it, otherwise None"""
+    if not ProcSampler.is_supported():
+        return None
+    try:
+        return ProcSampler()
+    except OSError as e:
+        logger.warning(f"/proc fast path unavailable, falling back to psutil: {e}")
+        return None
@@ -0,0 +1,175 @@
+"""
+Parent -> children process index with incrementally maintained subtree rollups.
+
+Every node keeps its own metrics and the totals of its whole subtree. Adding,
+removing or updating a process only walks its ancestor chain (O(depth)), so
+subtree totals are O(1) to read and listing a subtree costs O(subtree size)
+rather than a scan of every process.
+"""
+from typing import Dict, Iterator, List, Optional, Set
+
+# Metrics rolled up over subtrees
+TREE_METRICS = ('cpu_percent', 'memory_percent', 'rss', 'read_bytes', 'write_bytes', 'num_threads')
+
+# Stored per node: the metrics above plus a process count of 1, so subtree sizes roll up too
+_FIELDS = TREE_METRICS + ('process_count',)
+
+
+class ProcessTree:
+    def __init__(self):
+        self._parent: Dict[int, Optional[int]] = {}
+        self._children: Dict[int, Set[int]] = {}
+        self._own: Dict[int, List[float]] = {}
+        self._subtree: Dict[int, List[float]] = {}
+        self.names: Dict[int, str] = {}
+        self.status: Dict[int, str] = {}
+
+    def __contains__(self, pid: int) -> bool:
+        return pid in self._own
+
+    def __len__(self) -> int:
+        return len(self._own)
+
+    @staticmethod
+    def _metrics(values: Dict) -> List[float]:
+        # Missing values are stored as -1 by the columnar scan; count them as zero
+        return [max(values.get(name) or 0, 0) for name in TREE_METRICS] + [1]
+
+    def _ancestors(self, pid: int) -> Iterator[int]:
+        """Present ancestors of pid, nearest first"""
+        parent = self._parent.get(pid)
+        while parent is not None and parent in self._own:
+            yield parent
+            parent = self._parent.get(parent)
+
+    def _propagate(self, pid: int, delta: List[float]):
+        for ancestor in self._ancestors(pid):
+            totals = self._subtree[ancestor]
+            for i, value in enumerate(delta):
+                totals[i] += value
+
+    def _valid_parent(self, pid: int, ppid: Optional[int]) -> Optional[int]:
+        """Reject self-parenting and links that would create a cycle"""
+        if ppid is None or ppid < 0 or ppid == pid:
+            return None
+        # Walk the recorded parent links (present or not) so a parent that adopts
+        # its waiting children can't also be one of their descendants
+        ancestor = ppid
+        while ancestor is not None:
+            if ancestor == pid:
+                return None
+            ancestor = self._parent.get(ancestor)
+        return ppid
+
+    def add(self, pid: int, ppid: Optional[int], name: Optional[str] = None, status: Optional[str] = None, **metrics):
+        """Insert a process; children that arrived before it are adopted with their subtrees"""
+        if pid in self._own:
+            self.update(pid, ppid, name, status, **metrics)
+            return
+        own = self._metrics(metrics)
+        subtree = list(own)
+        for child in self._children.get(pid, ()):
+            for i, value in enumerate(self._subtree[child]):
+                subtree[i] += value
+
+        ppid = self._valid_parent(pid, ppid)
+        self._own[pid] = own
+        self._subtree[pid] = subtree
+        self._parent[pid] = ppid
+        self._children.setdefault(pid, set())
+        if ppid is not None:
+            self._children.setdefault(ppid, set()).add(pid)
+        self.names[pid] = name
+        self.status[pid] = status
+        self._propagate(pid, subtree)
+
+    def remove(self, pid: int):
+        """Drop a process; its children stay in the tree as roots until they report a new parent"""
+        if pid not in self._own:
+            return
+        self._propagate(pid, [-value for value in self._subtree[pid]])
+        ppid = self._parent.pop(pid)
+        if ppid is not None and ppid in self._children:
+            self._children[ppid].discard(pid)
+            if not self._children[ppid] and ppid not in self._own:
+                del self._children[ppid]
+        for child in self._children.pop(pid, set()):
+            self._parent[child] = None
+        del self._own[pid]
+        del self._subtree[pid]
+        self.names.pop(pid, None)
+        self.status.pop(pid, None)
+
+    def update(self, pid: int, ppid: Optional[int] = None, name: Optional[str] = None,
+               status: Optional[str] = None, **metrics):
+        """Apply new metrics (and a changed parent, if any) to an existing process"""
+        if pid not in self._own:
+            self.add(pid, ppid, name, status, **metrics)
+            return
+        ppid = self._valid_parent(pid, ppid)
+        if ppid != self._parent[pid]:
+            self._reparent(pid, ppid)
+
+        own = self._metrics(metrics)
+        delta = [new - old for new, old in zip(own, self._own[pid])]
+        if any(delta):
+            self._own[pid] = own
+            subtree = self._subtree[pid]
+            for i, value in enumerate(delta):
+                subtree[i] += value
+            self._propagate(pid, delta)
+        if name is not None:
+            self.names[pid] = name
+        if status is not None:
+            self.status[pid] = status
+
+    def _reparent(self, pid: int, ppid: Optional[int]):
+        subtree = self._subtree[pid]
+        self._propagate(pid, [-value for value in subtree])
+        old_parent = self._parent[pid]
+        if old_parent is not None and old_parent in self._children:
+            self._children[old_parent].discard(pid)
+        self._parent[pid] = ppid
+        if ppid is not None:
+            self._children.setdefault(ppid, set()).add(pid)
+        self._propagate(pid, subtree)
+
+    def sync(self, columns):
+        """Bring the tree in line with a ProcessColumns scan, touching only what changed"""
+        fields = ('pid', 'ppid', 'name', 'status') + TREE_METRICS
+        column_data = {name: columns.column(name) for name in fields}
+        seen = set()
+        for i in range(len(columns)):
+            pid = int(column_data['pid'][i])
+            seen.add(pid)
+            metrics = {name: column_data[name][i] for name in TREE_METRICS}
+            self.update(pid, int(column_data['ppid'][i]), column_data['name'][i], column_data['status'][i], **metrics)
+        for pid in [pid for pid in self._own if pid not in seen]:
+            self.remove(pid)
+
+    # Queries
+
+    def parent(self, pid: int) -> Optional[int]:
+        parent = self._parent.get(pid)
+        return parent if parent in self._own else None
+
+    def children(self, pid: int) -> List[int]:
+        return [child for child in self._children.get(pid, ()) if child in self._own]
+
+    def roots(self) -> List[int]:
+        return [pid for pid in self._own if self.parent(pid) is None]
+
+    def descendants(self, pid: int) -> Iterator[int]:
+        """All processes below pid (depth-first), O(subtree size)"""
+        stack = list(self.children(pid))
+        while stack:
+            child = stack.pop()
+            yield child
+            stack.extend(self.children(child))
+
+    def own_totals(self, pid: int) -> Dict[str, float]:
+        return dict(zip(TREE_METRICS, self._own[pid]))
+
+    def subtree_totals(self, pid: int) -> Dict[str, float]:
+        """Rolled-up metrics of pid and all of its descendants, O(1)"""
+        return dict(zip(_FIELDS, self._subtree[pid]))
@@ -1,164 +1,237 @@
 import psutil
 import json
 
+from columnar import ProcessColumns
+from connection_table import get_connection_table
+from instrumentation import timed
+from records import ConnectionRecord, FieldTuple, ProcessRecord, ThreadRecord, to_serializable
+
+
+MB = 1024 * 1024
+
+
+def _memory(process):
+    mem_info = process.memory_info()
+    return {
+        'rss': mem_info.rss / MB,
+        'vms': mem_info.vms / MB,
+        # Only some platforms report shared/data/stack
+        'memory_shared': mem_info.shared / MB if hasattr(mem_info, 'shared') else None,
+        'memory_data': mem_info.data / MB if hasattr(mem_info, 'data') else None,
+        'memory_stack': mem_info.stack / MB if hasattr(mem_info, 'stack') else None
+    }
+
+
+def _io(process):
+    io_counters = process.io_counters()
+    return {
+        'read_bytes': io_counters.read_bytes,
+        'write_bytes': io_counters.write_bytes,
+        'read_chars': getattr(io_counters, 'read_chars', None),
+        'write_chars': getattr(io_counters, 'write_chars', None)
+    }
+
+
+def _optional(method, convert=None):
+    """Probe for a psutil method that not every platform has"""
+    def probe(process):
+        if not hasattr(process, method):
+            return None
+        value = getattr(process, method)()
+        return convert(value) if convert else value
+    return probe
+
+
+# Record fields -> the psutil call that fills them. Several fields can share one
+# call; a scan makes each call at most once and only if one of its fields is wanted.
+PROCESS_PROBES = (
+    (('rss', 'vms', 'memory_shared', 'memory_data', 'memory_stack'), _memory),
+    (('read_bytes', 'write_bytes', 'read_chars', 'write_chars'), _io),
+    (('memory_percent',), lambda p: p.memory_percent()),
+    (('cpu_percent',), lambda p: p.cpu_percent()),
+    (('num_threads',), lambda p: p.num_threads()),
+    (('cpu_times',), lambda p: FieldTuple.from_namedtuple(p.cpu_times())),
+    (('create_time',), lambda p: p.create_time()),
+    (('exe',), lambda p: p.exe()),
+    (('cmdline',), lambda p: p.cmdline()),
+    (('parent_pid',), _optional('ppid')),
+    (('nice',), _optional('nice')),
+    (('username',), _optional('username')),
+    (('ctx_switches',), _optional('num_ctx_switches', FieldTuple.from_namedtuple)),
+    (('num_fds',), _optional('num_fds')),
+    (('cwd',), _optional('cwd')),
+    (('affinity',), _optional('cpu_affinity')),
+    (('uids',), _optional('uids', FieldTuple.from_namedtuple)),
+    (('gids',), _optional('gids', FieldTuple.from_namedtuple)),
+    (('open_files',), lambda p: [f.path for f in p.open_files()] if hasattr(p, 'open_files') else []),
+    (('connections',), lambda p: tuple(
+        ConnectionRecord.from_psutil(c) for c in p.net_connections()
+    ) if hasattr(p, 'net_connections') else ()),
+    (('threads',), lambda p: tuple(
+        ThreadRecord(t.id, t.user_time, t.system_time) for t in p.threads()
+    ) if hasattr(p, 'threads') else ()),
+)
+
+# Fields process_iter fetches itself
+_ITER_FIELDS = ('pid', 'name', 'status')
+
+# Named collection profiles. `light` is cheap enough to run every few seconds;
+# `full` adds open files, threads, connections, affinity, cwd and ids, which are
+# by far the most expensive calls and are meant for occasional runs.
+PROFILES = {
+    'light': ('pid', 'name', 'cpu_percent', 'memory_percent', 'rss'),
+    'standard': ('pid', 'name', 'status', 'cpu_percent', 'memory_percent', 'rss', 'vms', 'num_threads',
+                 'cpu_times', 'create_time', 'exe', 'cmdline', 'parent_pid', 'nice', 'username',
+                 'read_bytes', 'write_bytes'),
+    'full': ProcessRecord.__slots__,
+}
+
+
+def _plan(fields):
+    """Split requested fields into process_iter attributes and the probes to call"""
+    unknown = set(fields) - set(ProcessRecord.__slots__)
+    if unknown:
+        raise ValueError(f"Unknown process fields: {', '.join(sorted(unknown))}")
+    iter_attrs = [field for field in _ITER_FIELDS if field in fields or field == 'pid']
+    probes = [(outputs, probe) for outputs, probe in PROCESS_PROBES if any(field in fields for field in outputs)]
+    return iter_attrs, probes
+
+
+@timed('probe.process_scan')
+def get_processes(profile: str = 'full', fields=None):
+    """
+    Scan all processes into ProcessRecords. `profile` picks one of PROFILES;
+    an explicit `fields` list (ProcessRecord attribute names) overrides it.
+    Only the psutil calls behind the requested fields are made; other fields
+    are left as None.
+    """
+    if fields is None:
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown process profile: {profile}")
+        fields = PROFILES[profile]
+    iter_attrs, probes = _plan(fields)
+    if 'connections' in fields:
+        # One system-wide socket table per scan instead of re-reading it for every PID
+        connections = get_connection_table().snapshot()
+        if connections is not None:
+            probes = [(outputs, (lambda p: connections.get(p.pid, ())) if outputs == ('connections',) else probe)
+                      for outputs, probe in probes]
 
-def get_processes():
     processes = []
-    for proc in psutil.process_iter(['pid', 'name', 'status']):
+    for proc in psutil.process_iter(iter_attrs):
         try:
-            process = psutil.Process(proc.info['pid'])
-
-            # Initialize memory attributes with None
-            memory_shared = None
-            memory_data = None
-            memory_stack = None
-
-            # Get memory info and check for attributes
-            mem_info = process.memory_info()
-            if hasattr(mem_info, 'shared'):
-                memory_shared = mem_info.shared / (1024 * 1024)
-            if hasattr(mem_info, 'data'):
-                memory_data = mem_info.data / (1024 * 1024)
-            if hasattr(mem_info, 'stack'):
-                memory_stack = mem_info.stack / (1024 * 1024)
-
-            # Initialize IO counters with None for optional fields
-            io_read_chars = None
-            io_write_chars = None
-            io_counters = process.io_counters()
-            if hasattr(io_counters, 'read_chars'):
-                io_read_chars = io_counters.read_chars
-            if hasattr(io_counters, 'write_chars'):
-                io_write_chars = io_counters.write_chars
-
-            process_info = {
-                'pid': proc.info['pid'],
-                'name': proc.info['name'],
-                'status': proc.info['status'],
-                'create_time': process.create_time(),
-                'exe': process.exe(),
-                'cmdline': process.cmdline(),
-                'num_ctx_switches': process.num_ctx_switches()._asdict() if hasattr(process,
-                                                                                    'num_ctx_switches') else None,
-                'num_fds': process.num_fds() if hasattr(process, 'num_fds') else None,  # Number of file descriptors
-                'cwd': process.cwd() if hasattr(process, 'cwd') else None,  # Current working directory
-                'memory': {
-                    'rss': mem_info.rss / (1024 * 1024),
-                    'vms': mem_info.vms / (1024 * 1024),
-                    'percent': process.memory_percent(),
-                    'shared': memory_shared,
-                    'data': memory_data,
-                    'stack': memory_stack
-                },
-                'cpu': {
-                    'percent': process.cpu_percent(),
-                    'num_threads': process.num_threads(),
-                    'cpu_times': process.cpu_times()._asdict(),
-                    'affinity': process.cpu_affinity() if hasattr(process, 'cpu_affinity') else None,  # CPU affinity
-                },
-                'io': {
-                    'read_bytes': io_counters.read_bytes,
-                    'write_bytes': io_counters.write_bytes,
-                    'read_chars': io_read_chars,
-                    'write_chars': io_write_chars,
-                },
-                'open_files': [f.path for f in process.open_files()] if hasattr(process, 'open_files') else [],
-                # List of open files
-                'connections': [{
-                    'fd': c.fd,
-                    'family': str(c.family),
-                    'type': str(c.type),
-                    'laddr': c.laddr._asdict() if c.laddr else None,
-                    'raddr': c.raddr._asdict() if c.raddr else None,
-                    'status': str(c.status)
-                } for c in process.net_connections()] if hasattr(process, 'net_connections') else [],
-                'num_connections': len(process.net_connections()) if hasattr(process, 'net_connections') else 0,
-                'threads': [{
-                    'id': t.id,
-                    'user_time': t.user_time,
-                    'system_time': t.system_time
-                } for t in process.threads()] if hasattr(process, 'threads') else [],
-                'num_ctx_switches': process.num_ctx_switches()._asdict() if hasattr(process,
-                                                                                    'num_ctx_switches') else None,
-                'parent_pid': process.ppid() if hasattr(process, 'ppid') else None,
-                'nice': process.nice() if hasattr(process, 'nice') else None,  # Process nice value (priority)
-            }
-
-            # Get username for Windows
-            if hasattr(process, 'username'):
-                process_info['username'] = process.username()
-
-            # Get uids and gids for Unix-based systems
-            if hasattr(process, 'uids'):
-                process_info['uids'] = process.uids()._asdict()
-            if hasattr(process, 'gids'):
-                process_info['gids'] = process.gids()._asdict()
-
-            processes.append(process_info)
+            values = dict(proc.info)
+            with proc.oneshot():
+                for outputs, probe in probes:
+                    result = probe(proc)
+                    if len(outputs) == 1:
+                        values[outputs[0]] = result
+                    else:
+                        values.update(result)
+            processes.append(ProcessRecord(**values))
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
             pass
     return processes
 
 
+# process_iter attributes needed for the columnar snapshot (filtered to what this platform supports)
+COLUMN_ATTRS = [
+    attr for attr in ('pid', 'ppid', 'name', 'username', 'uids', 'status', 'memory_info', 'memory_percent',
+                      'cpu_times', 'cpu_percent', 'io_counters', 'num_threads')
+    if hasattr(psutil.Process, attr)
+]
+
+
+@timed('probe.process_columns')
+def get_process_columns():
+    """Light process scan straight into a columnar snapshot (no per-process dicts kept)"""
+    columns = ProcessColumns()
+    for proc in psutil.process_iter(COLUMN_ATTRS, ad_value=None):
+        info = proc.info
+        mem_info = info.get('memory_info')
+        cpu_times = info.get('cpu_times')
+        io_counters = info.get('io_counters')
+        uids = info.get('uids')
+        columns.append(
+            pid=info['pid'],
+            ppid=info.get('ppid'),
+            uid=uids.real if uids else None,
+            rss=mem_info.rss if mem_info else None,
+            vms=mem_info.vms if mem_info else None,
+            cpu_user=cpu_times.user if cpu_times else None,
+            cpu_system=cpu_times.system if cpu_times else None,
+            cpu_percent=info.get('cpu_percent'),
+            memory_percent=info.get('memory_percent'),
+            read_bytes=io_counters.read_bytes if io_counters else None,
+            write_bytes=io_counters.write_bytes if io_counters else None,
+            num_threads=info.get('num_threads'),
+            name=info.get('name'),
+            user=info.get('username'),
+            status=info.get('status')
+        )
+    return columns.finalize()
+
+
 def save_to_json(processes, filename):
+    # Records are expanded to dicts only here, at serialization time
     with open(filename, 'w') as f:
-        json.dump(processes, f, indent=4)
+        json.dump(processes, f, indent=4, default=to_serializable)
 
 
 def main():
     processes = get_processes()
     save_to_json(processes, 'processes.json')
     for proc in processes:
-        print(f"PID: {proc['pid']}, Name: {proc['name']}, Status: {proc['status']}")
-        print(f"  Create Time: {proc['create_time']}")
-        print(f"  Executable: {proc['exe']}")
-        print(f"  Command Line: {proc['cmdline']}")
-        print(f"  Current Working Directory (CWD): {proc['cwd']}")
-        print(f"  Parent PID: {proc['parent_pid']}")
-        print(f"  Nice Value: {proc['nice']}")
-        print(f"  Context Switches: {proc['num_ctx_switches']}")
-        print(f"  Number of File Descriptors: {proc['num_fds']}")
+        print(f"PID: {proc.pid}, Name: {proc.name}, Status: {proc.status}")
+        print(f"  Create Time: {proc.create_time}")
+        print(f"  Executable: {proc.exe}")
+        print(f"  Command Line: {proc.cmdline}")
+        print(f"  Current Working Directory (CWD): {proc.cwd}")
+        print(f"  Parent PID: {proc.parent_pid}")
+        print(f"  Nice Value: {proc.nice}")
+        print(f"  Context Switches: {proc.ctx_switches.to_dict() if proc.ctx_switches else None}")
+        print(f"  Number of File Descriptors: {proc.num_fds}")
 
         print(
-            f"  Memory: {proc['memory']['rss']:.2f} MB RSS, {proc['memory']['vms']:.2f} MB VMS, {proc['memory']['percent']:.2f}%")
+            f"  Memory: {proc.rss:.2f} MB RSS, {proc.vms:.2f} MB VMS, {proc.memory_percent:.2f}%")
 
         # Only print if the attributes exist
-        if proc['memory']['shared'] is not None:
-            print(f"    Shared Memory: {proc['memory']['shared']:.2f} MB")
-        if proc['memory']['data'] is not None:
-            print(f"    Data Memory: {proc['memory']['data']:.2f} MB")
-        if proc['memory']['stack'] is not None:
-            print(f"    Stack Memory: {proc['memory']['stack']:.2f} MB")
-
-        print(f"  CPU: {proc['cpu']['percent']:.2f}%, {proc['cpu']['num_threads']} threads")
-        print(f"  CPU Times: {proc['cpu']['cpu_times']}")
-        print(f"  CPU Affinity: {proc['cpu']['affinity']}")
-        print(f"  IO: {proc['io']['read_bytes']} bytes read, {proc['io']['write_bytes']} bytes written")
-        if proc['io']['read_chars'] is not None:
-            print(f"  IO (Chars): {proc['io']['read_chars']} chars read, {proc['io']['write_chars']} chars written")
-
-        print(f"  Open Files ({len(proc['open_files'])}): {proc['open_files']}")
-        print(f"  Connections ({proc['num_connections']}):")
-        for conn in proc['connections']:
-            print(f"    FD: {conn['fd']}, Family: {conn['family']}, Type: {conn['type']}, "
-                  f"Laddr: {conn['laddr']}, Raddr: {conn['raddr']}, Status: {conn['status']}")
-        print(f"  Threads ({len(proc['threads'])}):")
-        for thread in proc['threads']:
+        if proc.memory_shared is not None:
+            print(f"    Shared Memory: {proc.memory_shared:.2f} MB")
+        if proc.memory_data is not None:
+            print(f"    Data Memory: {proc.memory_data:.2f} MB")
+        if proc.memory_stack is not None:
+            print(f"    Stack Memory: {proc.memory_stack:.2f} MB")
+
+        print(f"  CPU: {proc.cpu_percent:.2f}%, {proc.num_threads} threads")
+        print(f"  CPU Times: {proc.cpu_times.to_dict()}")
+        print(f"  CPU Affinity: {proc.affinity}")
+        print(f"  IO: {proc.read_bytes} bytes read, {proc.write_bytes} bytes written")
+        if proc.read_chars is not None:
+            print(f"  IO (Chars): {proc.read_chars} chars read, {proc.write_chars} chars written")
+
+        print(f"  Open Files ({len(proc.open_files)}): {proc.open_files}")
+        print(f"  Connections ({len(proc.connections)}):")
+        for conn in proc.connections:
+            print(f"    FD: {conn.fd}, Family: {conn.family}, Type: {conn.type}, "
+                  f"Laddr: {conn.laddr}, Raddr: {conn.raddr}, Status: {conn.status}")
+        print(f"  Threads ({len(proc.threads)}):")
+        for thread in proc.threads:
             print(
-                f"    ID: {thread['id']}, User Time: {thread['user_time']:.2f}, System Time: {thread['system_time']:.2f}")
+                f"    ID: {thread.id}, User Time: {thread.user_time:.2f}, System Time: {thread.system_time:.2f}")
 
         # Print username if available
-        if 'username' in proc:
-            print(f"  Username: {proc['username']}")
+        if proc.username is not None:
+            print(f"  Username: {proc.username}")
 
         # Print uids and gids if available
-        if 'uids' in proc:
-            print(f"  UIDs: {proc['uids']}")
-        if 'gids' in proc:
-            print(f"  GIDs: {proc['gids']}")
+        if proc.uids is not None:
+            print(f"  UIDs: {proc.uids.to_dict()}")
+        if proc.gids is not None:
+            print(f"  GIDs: {proc.gids.to_dict()}")
 
         print("-" * 40)  # Separator for better readability
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,224 @@
+"""
+Compact record types for process and software inventories.
+
+Records use __slots__ instead of per-instance dicts, intern strings that repeat
+across records (status, publisher, socket family/type, process names), and are
+only expanded into the legacy nested-dict shape by to_dict() when serialized.
+"""
+import sys
+from typing import Dict, Iterable, Optional, Tuple
+
+_intern = sys.intern
+
+# Shared field-name tuples for namedtuple-like values (cpu_times, uids, ...)
+_FIELD_SHAPES: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _shape(fields: Iterable[str]) -> Tuple[str, ...]:
+    fields = tuple(fields)
+    return _FIELD_SHAPES.setdefault(fields, fields)
+
+
+def _intern_or_none(value: Optional[str]) -> Optional[str]:
+    return _intern(value) if isinstance(value, str) else value
+
+
+class FieldTuple:
+    """Values of a psutil namedtuple (cpu_times, uids, ...) with the field names shared between records"""
+
+    __slots__ = ('fields', 'values')
+
+    def __init__(self, fields: Tuple[str, ...], values: Tuple):
+        self.fields = _shape(fields)
+        self.values = tuple(values)
+
+    @classmethod
+    def from_namedtuple(cls, value) -> 'FieldTuple':
+        return cls(value._fields, value)
+
+    @classmethod
+    def from_dict(cls, value: Optional[Dict]) -> Optional['FieldTuple']:
+        return cls(tuple(value.keys()), tuple(value.values())) if value is not None else None
+
+    def to_dict(self) -> Dict:
+        return dict(zip(self.fields, self.values))
+
+
+class ThreadRecord:
+    __slots__ = ('id', 'user_time', 'system_time')
+
+    def __init__(self, id: int, user_time: float, system_time: float):
+        self.id = id
+        self.user_time = user_time
+        self.system_time = system_time
+
+    def to_dict(self) -> Dict:
+        return {'id': self.id, 'user_time': self.user_time, 'system_time': self.system_time}
+
+
+class ConnectionRecord:
+    __slots__ = ('fd', 'family', 'type', 'laddr', 'raddr', 'status')
+
+    def __init__(self, fd: int, family: str, type: str, laddr: Optional[Tuple[str, int]],
+                 raddr: Optional[Tuple[str, int]], status: str):
+        self.fd = fd
+        self.family = _intern(family)
+        self.type = _intern(type)
+        self.laddr = laddr
+        self.raddr = raddr
+        self.status = _intern(status)
+
+    @classmethod
+    def from_psutil(cls, conn) -> 'ConnectionRecord':
+        return cls(
+            conn.fd,
+            str(conn.family),
+            str(conn.type),
+            (conn.laddr.ip, conn.laddr.port) if conn.laddr else None,
+            (conn.raddr.ip, conn.raddr.port) if conn.raddr else None,
+            str(conn.status)
+        )
+
+    @classmethod
+    def from_dict(cls, value: Dict) -> 'ConnectionRecord':
+        laddr, raddr = value.get('laddr'), value.get('raddr')
+        return cls(
+            value['fd'], value['family'], value['type'],
+            (laddr['ip'], laddr['port']) if laddr else None,
+            (raddr['ip'], raddr['port']) if raddr else None,
+            value['status']
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            'fd': self.fd,
+            'family': self.family,
+            'type': self.type,
+            'laddr': {'ip': self.laddr[0], 'port': self.laddr[1]} if self.laddr else None,
+            'raddr': {'ip': self.raddr[0], 'port': self.raddr[1]} if self.raddr else None,
+            'status': self.status
+        }
+
+
+class SoftwareRecord:
+    """Installed software entry; fields left as None are omitted from to_dict()"""
+
+    __slots__ = ('name', 'version', 'publisher', 'install_date')
+
+    def __init__(self, name: Optional[str] = None, version: Optional[str] = None,
+                 publisher: Optional[str] = None, install_date: Optional[str] = None):
+        self.name = name
+        self.version = version
+        self.publisher = _intern_or_none(publisher)
+        self.install_date = _intern_or_none(install_date)
+
+    @classmethod
+    def from_dict(cls, value: Dict) -> 'SoftwareRecord':
+        return cls(value.get('name'), value.get('version'), value.get('publisher'), value.get('install_date'))
+
+    def get(self, key: str, default=None):
+        """dict-style access so display code can treat records and dicts alike"""
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self.__slots__ if getattr(self, key) is not None}
+
+
+class ProcessRecord:
+    """One process from processes.get_processes, stored flat"""
+
+    __slots__ = (
+        'pid', 'name', 'status', 'create_time', 'exe', 'cmdline', 'ctx_switches', 'num_fds', 'cwd',
+        'rss', 'vms', 'memory_percent', 'memory_shared', 'memory_data', 'memory_stack',
+        'cpu_percent', 'num_threads', 'cpu_times', 'affinity',
+        'read_bytes', 'write_bytes', 'read_chars', 'write_chars',
+        'open_files', 'connections', 'threads', 'parent_pid', 'nice', 'username', 'uids', 'gids'
+    )
+
+    def __init__(self, **fields):
+        for key in self.__slots__:
+            setattr(self, key, fields.get(key))
+        self.name = _intern_or_none(self.name)
+        self.status = _intern_or_none(self.status)
+        self.exe = _intern_or_none(self.exe)
+        self.username = _intern_or_none(self.username)
+
+    @classmethod
+    def from_dict(cls, value: Dict) -> 'ProcessRecord':
+        """Build a record from the legacy nested-dict shape (e.g. processes.json)"""
+        memory, cpu, io = value.get('memory', {}), value.get('cpu', {}), value.get('io', {})
+        return cls(
+            pid=value['pid'], name=value['name'], status=value['status'],
+            create_time=value.get('create_time'), exe=value.get('exe'), cmdline=value.get('cmdline'),
+            ctx_switches=FieldTuple.from_dict(value.get('num_ctx_switches')),
+            num_fds=value.get('num_fds'), cwd=value.get('cwd'),
+            rss=memory.get('rss'), vms=memory.get('vms'), memory_percent=memory.get('percent'),
+            memory_shared=memory.get('shared'), memory_data=memory.get('data'), memory_stack=memory.get('stack'),
+            cpu_percent=cpu.get('percent'), num_threads=cpu.get('num_threads'),
+            cpu_times=FieldTuple.from_dict(cpu.get('cpu_times')), affinity=cpu.get('affinity'),
+            read_bytes=io.get('read_bytes'), write_bytes=io.get('write_bytes'),
+            read_chars=io.get('read_chars'), write_chars=io.get('write_chars'),
+            open_files=value.get('open_files'),
+            connections=None if value.get('connections') is None else tuple(
+                ConnectionRecord.from_dict(c) for c in value['connections']),
+            threads=None if value.get('threads') is None else tuple(
+                ThreadRecord(t['id'], t['user_time'], t['system_time']) for t in value['threads']),
+            parent_pid=value.get('parent_pid'), nice=value.get('nice'), username=value.get('username'),
+            uids=FieldTuple.from_dict(value.get('uids')), gids=FieldTuple.from_dict(value.get('gids'))
+        )
+
+    def to_dict(self) -> Dict:
+        """Expand into the nested dict shape written to processes.json"""
+        process_info = {
+            'pid': self.pid,
+            'name': self.name,
+            'status': self.status,
+            'create_time': self.create_time,
+            'exe': self.exe,
+            'cmdline': self.cmdline,
+            'num_ctx_switches': self.ctx_switches.to_dict() if self.ctx_switches else None,
+            'num_fds': self.num_fds,
+            'cwd': self.cwd,
+            'memory': {
+                'rss': self.rss,
+                'vms': self.vms,
+                'percent': self.memory_percent,
+                'shared': self.memory_shared,
+                'data': self.memory_data,
+                'stack': self.memory_stack
+            },
+            'cpu': {
+                'percent': self.cpu_percent,
+                'num_threads': self.num_threads,
+                'cpu_times': self.cpu_times.to_dict() if self.cpu_times else None,
+                'affinity': self.affinity
+            },
+            'io': {
+                'read_bytes': self.read_bytes,
+                'write_bytes': self.write_bytes,
+                'read_chars': self.read_chars,
+                'write_chars': self.write_chars
+            },
+            # None means the profile did not collect the field, not that it is empty
+            'open_files': self.open_files,
+            'connections': None if self.connections is None else [c.to_dict() for c in self.connections],
+            'num_connections': None if self.connections is None else len(self.connections),
+            'threads': None if self.threads is None else [t.to_dict() for t in self.threads],
+            'parent_pid': self.parent_pid,
+            'nice': self.nice
+        }
+        if self.username is not None:
+            process_info['username'] = self.username
+        if self.uids is not None:
+            process_info['uids'] = self.uids.to_dict()
+        if self.gids is not None:
+            process_info['gids'] = self.gids.to_dict()
+        return process_info
+
+
+def to_serializable(value):
+    """json `default` hook: expand records into dicts at serialization time"""
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
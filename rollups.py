@@ -0,0 +1,529 @@
+"""
+Multi-resolution retention for performance_metrics.
+
+Every sample is flattened into named metrics (cpu.percent, memory.percent,
+disk.percent:<mount>, network.recv_per_second, ...) and kept in three tiers:
+
+    raw     1s points                        for the last hour
+    minute  min/max/avg/p95 per minute       for the last day
+    hour    min/max/avg/p95 per hour         for the last 30 days
+
+Rollups are incremental. Each tier keeps an open bucket that is folded into a
+row when the first sample of the next bucket arrives, and a closed minute
+feeds the hour bucket. Hourly p95 is the weighted p95 of the minute p95s, an
+approximation that keeps the hour bucket at 60 rows. Rows are stored in
+fixed-size columnar blocks (array('d'), NaN for a missing metric). Whole
+blocks expire once they fall out of the retention window, so each tier holds
+at most retention / resolution + BLOCK_SIZE rows and at most MAX_METRICS
+metrics, of which at most MAX_INSTANCE_METRICS are per-instance series
+(disk.percent:<mount>), so many mounts can't crowd out the core gauges. A
+per-instance name is released once no tier holds a row for it any more, so
+mounts that come and go don't use up the cap for good. That caps both memory
+and the saved file: with the default tiers and 64 metrics the raw tier holds
+at most 3856 rows x 65 columns, and the minute and hour tiers 1696 and 976 rows
+x 258 columns (four aggregates per metric, the sample count and the time), at
+8 bytes a value about 2.0 + 3.5 + 2.0 = 7.5MB in all.
+
+Range queries bisect the sorted block start times to find the first block
+they touch, then bisect inside it. They either slice the matching columns
+(query) or stream rows (iter_rows), so a request only reads the blocks
+covering its range, never the whole history. Aggregated rows appear once
+their bucket closes.
+"""
+import fnmatch
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# (name, resolution seconds, retention seconds)
+TIERS = (
+    ('raw', 1, 3600),
+    ('minute', 60, 24 * 3600),
+    ('hour', 3600, 30 * 24 * 3600),
+)
+AGGREGATES = ('min', 'max', 'avg', 'p95')
+BLOCK_SIZE = 256
+MAX_METRICS = 64
+# Share of MAX_METRICS per-instance series ('name:instance') may take
+MAX_INSTANCE_METRICS = 32
+NAN = float('nan')
+FORMAT_VERSION = 1
+SUMMARIES = ('min', 'max', 'avg', 'last')
+
+_RELATIVE = re.compile(r'^-(\d+(?:\.\d+)?)([smhd])$')
+_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def _put(row: Dict[str, float], name: str, value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        row[name] = float(value)
+
+
+def flatten(perf: Dict) -> Dict[str, float]:
+    """Numeric gauges of one performance_metrics sample (network counters are left to RollupStore)"""
+    row: Dict[str, float] = {}
+    cpu = perf.get('cpu') or {}
+    _put(row, 'cpu.percent', cpu.get('overall_usage'))
+    _put(row, 'cpu.frequency', cpu.get('frequency'))
+    memory = perf.get('memory') or {}
+    _put(row, 'memory.percent', memory.get('percent'))
+    _put(row, 'memory.used', memory.get('used'))
+    _put(row, 'swap.percent', memory.get('swap_percent'))
+    for disk in perf.get('disks') or []:
+        _put(row, f"disk.percent:{disk.get('mountpoint')}", disk.get('percent'))
+    battery = (perf.get('system') or {}).get('battery') or {}
+    _put(row, 'battery.percent', battery.get('percent'))
+    return row
+
+
+def sample_time(perf: Dict) -> float:
+    """Epoch seconds of a sample, from its ISO timestamp when it has one"""
+    try:
+        return datetime.fromisoformat(perf['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+
+
+def to_epoch(value: Union[None, float, str, datetime], now: Optional[float] = None) -> Optional[float]:
+    """
+    Epoch seconds from a number, datetime, ISO string, 'HH:MM[:SS]' (today,
+    local time) or relative '-15m' / '-2h' / '-1d'. None stays None.
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.timestamp()
+    now = time.time() if now is None else now
+    text = value.strip()
+    relative = _RELATIVE.match(text)
+    if relative:
+        return now - float(relative.group(1)) * _UNITS[relative.group(2)]
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    if re.match(r'^\d{1,2}:\d{2}(:\d{2})?$', text):
+        clock = datetime.strptime(text, '%H:%M:%S' if text.count(':') == 2 else '%H:%M').time()
+        return datetime.combine(datetime.fromtimestamp(now).date(), clock).timestamp()
+    return datetime.fromisoformat(text).timestamp()
+
+
+def weighted_percentile(points: List[Tuple[float, float]], fraction: float) -> float:
+    """Nearest-rank percentile of (value, weight) pairs"""
+    points = sorted(points)
+    target = fraction * sum(weight for _, weight in points)
+    total = 0.0
+    for value, weight in points:
+        total += weight
+        if total >= target:
+            return value
+    return points[-1][0]
+
+
+class Block:
+    """Up to BLOCK_SIZE consecutive rows of one tier, stored column by column"""
+    __slots__ = ('start', 'times', 'columns')
+
+    def __init__(self, start: float):
+        self.start = start
+        self.times = array('d')
+        self.columns: Dict[str, array] = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, timestamp: float, row: Dict[str, float]):
+        size = len(self.times)
+        self.times.append(timestamp)
+        for name, column in self.columns.items():
+            column.append(row.get(name, NAN))
+        for name in row.keys() - self.columns.keys():
+            column = array('d', [NAN]) * size
+            column.append(row[name])
+            self.columns[name] = column
+
+    def set_last(self, row: Dict[str, float]):
+        for name, value in row.items():
+            if name not in self.columns:
+                self.columns[name] = array('d', [NAN]) * len(self.times)
+            self.columns[name][-1] = value
+
+    def nbytes(self) -> int:
+        return self.times.itemsize * len(self.times) * (1 + len(self.columns))
+
+    def to_dict(self) -> Dict:
+        return {'start': self.start, 'times': self.times.tolist(),
+                'columns': {name: column.tolist() for name, column in self.columns.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Block':
+        block = cls(data['start'])
+        block.times = array('d', data['times'])
+        block.columns = {name: array('d', values) for name, values in data['columns'].items()}
+        return block
+
+
+class Tier:
+    def __init__(self, name: str, resolution: float, retention: float, block_size: int = BLOCK_SIZE):
+        self.name = name
+        self.resolution = resolution
+        self.retention = retention
+        self.block_size = block_size
+        self.blocks: List[Block] = []
+        # Start time of each block, kept alongside for bisect
+        self.starts: List[float] = []
+
+    @property
+    def capacity(self) -> int:
+        """Most rows this tier can hold"""
+        return int(self.retention // self.resolution) + self.block_size
+
+    def __len__(self):
+        return sum(len(block) for block in self.blocks)
+
+    def last_time(self) -> Optional[float]:
+        return self.blocks[-1].times[-1] if self.blocks else None
+
+    def append(self, timestamp: float, row: Dict[str, float]) -> bool:
+        """
+        Add a row at the start of its bucket; a second row for the same bucket
+        overwrites the first. True if old blocks expired to make room.
+        """
+        timestamp -= timestamp % self.resolution
+        last = self.last_time()
+        if last is not None and timestamp <= last:
+            if timestamp == last:
+                self.blocks[-1].set_last(row)
+            return False  # older than what we have (clock stepped back)
+        if not self.blocks or len(self.blocks[-1]) >= self.block_size:
+            self.blocks.append(Block(timestamp))
+            self.starts.append(timestamp)
+        self.blocks[-1].append(timestamp, row)
+        return self._expire(timestamp)
+
+    def set_blocks(self, blocks: List[Block]):
+        self.blocks = blocks
+        self.starts = [block.start for block in blocks]
+
+    def _expire(self, now: float) -> bool:
+        horizon = now - self.retention
+        expired = False
+        while len(self.blocks) > 1 and (self.blocks[0].times[-1] < horizon or len(self) > self.capacity):
+            self.blocks.pop(0)
+            self.starts.pop(0)
+            expired = True
+        return expired
+
+    def blocks_from(self, start: Optional[float]) -> List[Block]:
+        """The blocks that can hold rows at or after start (binary search over block starts)"""
+        if start is None:
+            return list(self.blocks)
+        return self.blocks[max(0, bisect_right(self.starts, start) - 1):]
+
+    def nbytes(self) -> int:
+        return sum(block.nbytes() for block in self.blocks)
+
+
+class _Bucket:
+    """Open aggregation bucket: per metric (min, max, avg, p95, weight) points folded on close"""
+
+    def __init__(self, resolution: float):
+        self.resolution = resolution
+        self.start: Optional[float] = None
+        self.points: Dict[str, List[Tuple[float, float, float, float, float]]] = {}
+        self.weight = 0.0
+
+    def add(self, timestamp: float, stats: Dict[str, Tuple[float, float, float, float]], weight: float = 1.0) -> Optional[Tuple[float, Dict[str, float]]]:
+        """Add a point; returns (bucket start, row) for the bucket this one closed, if any"""
+        start = timestamp - timestamp % self.resolution
+        closed = None
+        if self.start is not None and start > self.start:
+            closed = self.close()
+        if self.start is None or start >= self.start:
+            self.start = start
+            for name, (low, high, mean, p95) in stats.items():
+                self.points.setdefault(name, []).append((low, high, mean, p95, weight))
+            self.weight += weight
+        return closed
+
+    def close(self) -> Optional[Tuple[float, Dict[str, float]]]:
+        if self.start is None:
+            return None
+        row = {'samples': self.weight}
+        for name, points in self.points.items():
+            weight = sum(point[4] for point in points)
+            row[f'{name}.min'] = min(point[0] for point in points)
+            row[f'{name}.max'] = max(point[1] for point in points)
+            row[f'{name}.avg'] = sum(point[2] * point[4] for point in points) / weight
+            row[f'{name}.p95'] = weighted_percentile([(point[3], point[4]) for point in points], 0.95)
+        closed = (self.start, row)
+        self.start, self.points, self.weight = None, {}, 0.0
+        return closed
+
+
+def _aggregate_stats(row: Dict[str, float]) -> Dict[str, Tuple[float, float, float, float]]:
+    """Regroup a closed bucket row into per-metric (min, max, avg, p95)"""
+    stats = {}
+    for key, value in row.items():
+        name, _, aggregate = key.rpartition('.')
+        if aggregate == 'min':
+            stats[name] = tuple(row[f'{name}.{part}'] for part in AGGREGATES)
+    return stats
+
+
+class RollupStore:
+    """Raw, minute and hour tiers fed one performance_metrics sample at a time"""
+
+    def __init__(self, tiers: Iterable[Tuple[str, float, float]] = TIERS, max_metrics: int = MAX_METRICS,
+                 max_instance_metrics: int = MAX_INSTANCE_METRICS):
+        self.tiers: Dict[str, Tier] = {name: Tier(name, resolution, retention) for name, resolution, retention in tiers}
+        self.max_metrics = max_metrics
+        self.max_instance_metrics = min(max_instance_metrics, max_metrics)
+        self._buckets = {name: _Bucket(tier.resolution) for name, tier in self.tiers.items() if name != 'raw'}
+        self._metrics = set()
+        # Names turned away by the caps, so each is only logged once
+        self._refused = set()
+        self._last_network: Optional[Tuple[float, Dict]] = None
+        self._lock = threading.Lock()
+
+    def add(self, perf: Dict, timestamp: Optional[float] = None):
+        """Record one performance_metrics sample"""
+        timestamp = sample_time(perf) if timestamp is None else timestamp
+        row = flatten(perf)
+        network = perf.get('network') or {}
+        with self._lock:
+            if self._last_network is not None and timestamp > self._last_network[0]:
+                elapsed = timestamp - self._last_network[0]
+                for counter, name in (('bytes_sent', 'network.sent_per_second'), ('bytes_recv', 'network.recv_per_second')):
+                    if counter in network and counter in self._last_network[1]:
+                        _put(row, name, max(0, network[counter] - self._last_network[1][counter]) / elapsed)
+            if network:
+                self._last_network = (timestamp, dict(network))
+            self._add_row(timestamp, row)
+
+    def _admit(self, name: str) -> bool:
+        """Start keeping a new metric if the caps allow it; caller holds _lock"""
+        if ':' in name:
+            instances = sum(1 for metric in self._metrics if ':' in metric)
+            full = instances >= self.max_instance_metrics
+            limit = f"{self.max_instance_metrics} per-instance metrics"
+        else:
+            full = len(self._metrics) >= self.max_metrics
+            limit = f"{self.max_metrics} metrics"
+        if not full and len(self._metrics) < self.max_metrics:
+            self._metrics.add(name)
+            self._refused.discard(name)
+            return True
+        if name not in self._refused:
+            self._refused.add(name)
+            if len(self._refused) == 1:
+                logger.warning(f"Metric history is full ({limit}); not keeping {name} (further refusals are not logged)")
+        return False
+
+    def _release(self):
+        """Forget per-instance metrics no tier or open bucket holds anything for; caller holds _lock"""
+        retained = set()
+        for name, tier in self.tiers.items():
+            for block in tier.blocks:
+                retained.update(block.columns if name == 'raw' else (key.rpartition('.')[0] for key in block.columns))
+        for bucket in self._buckets.values():
+            retained.update(bucket.points)
+        released = {metric for metric in self._metrics if ':' in metric and metric not in retained}
+        if released:
+            self._metrics -= released
+            self._refused -= released
+            logger.debug(f"Released {len(released)} expired per-instance metrics")
+
+    def add_row(self, timestamp: float, row: Dict[str, float]):
+        with self._lock:
+            self._add_row(timestamp, row)
+
+    def _add_row(self, timestamp: float, row: Dict[str, float]):
+        for name in [name for name in row if name not in self._metrics]:
+            if not self._admit(name):
+                del row[name]
+        expired = self.tiers['raw'].append(timestamp, row)
+        # A closed minute feeds the hour bucket, weighted by its sample count
+        stats, weight = {name: (value, value, value, value) for name, value in row.items()}, 1.0
+        for name, bucket in self._buckets.items():
+            closed = bucket.add(timestamp, stats, weight)
+            if closed is None:
+                break
+            start, aggregated = closed
+            expired = self.tiers[name].append(start, aggregated) or expired
+            timestamp, stats, weight = start, _aggregate_stats(aggregated), aggregated['samples']
+        if expired:
+            self._release()
+
+    def metrics(self) -> List[str]:
+        return sorted(self._metrics)
+
+    def pick_tier(self, start: Optional[float], resolution: Optional[str] = None, now: Optional[float] = None) -> Tier:
+        """The named tier, or the finest one whose retention reaches back to start"""
+        if resolution is not None:
+            if resolution not in self.tiers:
+                raise ValueError(f"Unknown resolution: {resolution} (expected one of {', '.join(self.tiers)})")
+            return self.tiers[resolution]
+        now = time.time() if now is None else now
+        tiers = sorted(self.tiers.values(), key=lambda tier: tier.resolution)
+        if start is not None:
+            for tier in tiers:
+                if now - start <= tier.retention:
+                    return tier
+        return tiers[-1]
+
+    def resolve(self, patterns: Iterable[str]) -> List[str]:
+        """Metric names a query for `patterns` returns, in column order"""
+        with self._lock:
+            return self._resolve(patterns)
+
+    def _resolve(self, patterns: Iterable[str]) -> List[str]:
+        """Expand glob patterns ('disk.percent:*') against the recorded metrics, keeping order"""
+        names = []
+        for pattern in patterns:
+            matches = sorted(fnmatch.filter(self._metrics, pattern)) if any(c in pattern for c in '*?[') else [pattern]
+            names.extend(name for name in matches if name not in names)
+        return names
+
+    def _plan(self, metrics, start, end, resolution, aggregate):
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {aggregate} (expected one of {', '.join(AGGREGATES)})")
+        now = time.time()
+        start, end = to_epoch(start, now), to_epoch(end, now)
+        start = now - 3600 if start is None else start
+        end = now if end is None else end
+        with self._lock:
+            names = self._resolve(metrics)
+            tier = self.pick_tier(start, resolution, now)
+            blocks = tier.blocks_from(start)
+            # Blocks only ever grow at the end; pin each one's length so readers see a stable range
+            pinned = [(block, len(block.times)) for block in blocks if block.start <= end]
+        columns = names if tier.name == 'raw' else [f'{name}.{aggregate}' for name in names]
+        return tier, names, columns, start, end, pinned
+
+    def query(self, metrics: Iterable[str], start=None, end=None, resolution: Optional[str] = None,
+              aggregate: str = 'avg') -> Dict:
+        """
+        Columns of `metrics` (glob patterns allowed) between start and end
+        (anything to_epoch accepts; default the last hour). Returns
+        {'resolution', 'time', 'columns': {metric: array('d')}} with NaN where
+        a metric was not recorded; aggregated tiers return `aggregate` values.
+        """
+        tier, names, columns, start, end, pinned = self._plan(metrics, start, end, resolution, aggregate)
+        times = array('d')
+        values = {name: array('d') for name in names}
+        for block, size in pinned:
+            first = bisect_left(block.times, start, 0, size)
+            last = bisect_right(block.times, end, 0, size)
+            if first >= last:
+                continue
+            times.extend(block.times[first:last])
+            for name, column in zip(names, columns):
+                data = block.columns.get(column)
+                values[name].extend(data[first:last] if data is not None else array('d', [NAN]) * (last - first))
+        return {'resolution': tier.name, 'time': times, 'columns': values}
+
+    def iter_rows(self, metrics: Iterable[str], start=None, end=None, resolution: Optional[str] = None,
+                  aggregate: str = 'avg') -> Iterator[Tuple[float, List[float]]]:
+        """Stream (timestamp, [value per metric]) rows; same arguments as query, validated up front"""
+        tier, names, columns, start, end, pinned = self._plan(metrics, start, end, resolution, aggregate)
+        return self._rows(columns, start, end, pinned)
+
+    @staticmethod
+    def _rows(columns, start, end, pinned):
+        for block, size in pinned:
+            data = [block.columns.get(column) for column in columns]
+            for index in range(bisect_left(block.times, start, 0, size), bisect_right(block.times, end, 0, size)):
+                yield block.times[index], [NAN if column is None else column[index] for column in data]
+
+    def summarize(self, metrics: Iterable[str], start=None, end=None, how: str = 'max',
+                  resolution: Optional[str] = None) -> Dict[str, Optional[float]]:
+        """One value per metric over the range: 'min', 'max', 'avg' or 'last' (None if never recorded)"""
+        if how not in SUMMARIES:
+            raise ValueError(f"Unknown summary: {how} (expected one of {', '.join(SUMMARIES)})")
+        # Aggregated rows answer min/max from their own min/max columns, the rest from their averages
+        result = self.query(metrics, start, end, resolution, how if how in ('min', 'max') else 'avg')
+        summary = {}
+        for name, column in result['columns'].items():
+            values = [value for value in column if not math.isnan(value)]
+            if not values:
+                summary[name] = None
+            elif how == 'min':
+                summary[name] = min(values)
+            elif how == 'max':
+                summary[name] = max(values)
+            elif how == 'avg':
+                summary[name] = sum(values) / len(values)
+            else:
+                summary[name] = values[-1]
+        return summary
+
+    def nbytes(self) -> int:
+        return sum(tier.nbytes() for tier in self.tiers.values())
+
+    def stats(self) -> Dict:
+        return {
+            'metrics': len(self._metrics),
+            'bytes': self.nbytes(),
+            'tiers': {name: {'rows': len(tier), 'capacity': tier.capacity, 'blocks': len(tier.blocks)}
+                      for name, tier in self.tiers.items()}
+        }
+
+    def save(self, path: str) -> bool:
+        """Write all tiers (gzip JSON) atomically; open buckets are not saved. False if it couldn't be written"""
+        with self._lock:
+            data = {
+                'version': FORMAT_VERSION,
+                'saved': time.time(),
+                'tiers': {name: [block.to_dict() for block in tier.blocks] for name, tier in self.tiers.items()}
+            }
+        tmp = f"{path}.tmp"
+        try:
+            with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp, path)
+            return True
+        except OSError as e:
+            logger.error(f"Error saving metric history to {path}: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+
+    def load(self, path: str) -> bool:
+        """Restore tiers saved by save(); returns False if there is nothing usable at path"""
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != FORMAT_VERSION:
+                logger.warning(f"Ignoring metric history {path} with format version {data.get('version')}")
+                return False
+            with self._lock:
+                for name, blocks in data['tiers'].items():
+                    tier = self.tiers.get(name)
+                    if tier is None:
+                        continue
+                    tier.set_blocks([Block.from_dict(block) for block in blocks if block['times']])
+                    if tier.blocks:
+                        tier._expire(max(tier.last_time(), time.time()))
+                    for block in tier.blocks:
+                        self._metrics.update(key.rpartition('.')[0] if name != 'raw' else key
+                                             for key in block.columns if key != 'samples')
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.error(f"Error loading metric history from {path}: {e}")
+            return False
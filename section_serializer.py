@@ -0,0 +1,95 @@
+"""
+Per-section memoized JSON encoding of system_info.
+
+Each top-level section is encoded on its own and the fragments are joined
+into the same text json.dumps would produce for the whole dict. A section is
+only re-encoded when its value is a different object than last time (every
+collector update assigns a fresh object, e.g. refresh_performance) or its
+version was bumped with invalidate() after an in-place change. So a refresh
+cycle re-encodes performance_metrics and timestamp, not the hardware, OS and
+software sections.
+
+Every fragment also carries a hash of its bytes, so a sender can tell which
+sections actually changed since the last report (changed_sections).
+"""
+import hashlib
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from instrumentation import registry as instrumentation
+
+
+class _Fragment:
+    __slots__ = ('value', 'version', 'text', 'digest')
+
+    def __init__(self, value, version: int, text: str, digest: str):
+        # Holding the value keeps its id from being reused by a different object
+        self.value = value
+        self.version = version
+        self.text = text
+        self.digest = digest
+
+
+class SectionSerializer:
+    def __init__(self, default=None):
+        self.default = default
+        self._fragments: Dict[Tuple, _Fragment] = {}
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, section: Optional[str] = None):
+        """Force re-encoding of a section (or all) after mutating it in place"""
+        with self._lock:
+            names = [section] if section is not None else {key[0] for key in self._fragments} | set(self._versions)
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def _fragment(self, name: str, value, indent, separators) -> _Fragment:
+        key = (name, indent, separators)
+        version = self._versions.get(name, 0)
+        fragment = self._fragments.get(key)
+        if fragment is not None and fragment.value is value and fragment.version == version:
+            instrumentation.increment('json.section_hits')
+            return fragment
+
+        text = json.dumps(value, indent=indent, separators=separators, default=self.default)
+        if indent is not None:
+            # Nested lines sit one level deeper inside the document
+            text = text.replace('\n', '\n' + self._pad(indent))
+        fragment = _Fragment(value, version, text, hashlib.sha1(text.encode('utf-8')).hexdigest())
+        self._fragments[key] = fragment
+        instrumentation.increment('json.section_misses')
+        return fragment
+
+    @staticmethod
+    def _pad(indent) -> str:
+        return indent if isinstance(indent, str) else ' ' * indent
+
+    def encode(self, document: Dict, indent=None, separators: Optional[Tuple[str, str]] = None) -> str:
+        """Same text as json.dumps(document, indent=indent, separators=separators, default=default)"""
+        if not document:
+            return '{}'
+        if separators is None:
+            separators = (',', ': ') if indent is not None else (', ', ': ')
+        item_separator, key_separator = separators
+
+        with self._lock:
+            items = [json.dumps(name) + key_separator + self._fragment(name, value, indent, separators).text
+                     for name, value in document.items()]
+
+        if indent is None:
+            return '{' + item_separator.join(items) + '}'
+        pad = self._pad(indent)
+        return '{\n' + pad + (item_separator + '\n' + pad).join(items) + '\n}'
+
+    def section_hashes(self, document: Dict, indent=None) -> Dict[str, str]:
+        """Hash of each section's encoded bytes (encoding whatever is not cached yet)"""
+        separators = (',', ': ') if indent is not None else (', ', ': ')
+        with self._lock:
+            return {name: self._fragment(name, value, indent, separators).digest for name, value in document.items()}
+
+    def changed_sections(self, document: Dict, previous: Dict[str, str], indent=None) -> List[str]:
+        """Sections whose content differs from the `previous` section_hashes (new sections included)"""
+        hashes = self.section_hashes(document, indent)
+        return [name for name, digest in hashes.items() if previous.get(name) != digest]
@@ -0,0 +1,189 @@
+"""
+Bounded hand-off between collection and transmission.
+
+Collectors put serialized reports on a SendQueue and a single QueueSender
+thread sends them one at a time, so a slow or dead backend holds at most
+`maxsize` queued payloads plus the one in flight, however long it stays down.
+What happens when the queue is full depends on the policy:
+
+    drop_oldest          evict the oldest report to make room
+    latest_per_section   a report replaces the queued one for the same section
+                         (device_info, ...); evict the oldest if still full
+    block                the producer waits (up to block_timeout) for room
+
+Each queue counts its own enqueued / replaced / dropped / sent / failed
+reports (stats()); the same events, plus depth and time-in-queue / send
+latency, are also exported through the instrumentation registry under
+send_queue.*.
+"""
+import asyncio
+import threading
+import time
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, NamedTuple, Optional
+
+from instrumentation import registry as instrumentation
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ('drop_oldest', 'latest_per_section', 'block')
+
+
+class Outgoing(NamedTuple):
+    section: str
+    payload: str
+    enqueued: float
+
+
+class SendQueue:
+    def __init__(self, maxsize: int = 4, policy: str = 'latest_per_section', block_timeout: Optional[float] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown send queue policy: {policy} (expected one of {', '.join(POLICIES)})")
+        if maxsize < 1:
+            raise ValueError("Send queue needs room for at least one report")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._items: Deque[Outgoing] = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        # Queued plus taken-but-not-done reports, for join()
+        self._unfinished = 0
+        # This queue's own counts; the registry totals are shared by every queue in the process
+        self._counts = dict.fromkeys(('enqueued', 'replaced', 'dropped', 'sent', 'failed'), 0)
+
+    def __len__(self):
+        return len(self._items)
+
+    def _count(self, event: str):
+        with self._condition:
+            self._counts[event] += 1
+        instrumentation.increment(f'send_queue.{event}')
+
+    def record_result(self, ok: bool):
+        """Count a report the sender finished with, as sent or failed"""
+        self._count('sent' if ok else 'failed')
+
+    def _publish_depth(self):
+        instrumentation.set_gauge('send_queue.depth', len(self._items))
+
+    def _drop_oldest(self):
+        self._items.popleft()
+        self._unfinished -= 1
+        self._count('dropped')
+
+    def put(self, payload: str, section: str = 'device_info') -> bool:
+        """Queue a report; False if it was refused (closed queue, or block policy timed out)"""
+        item = Outgoing(section, payload, time.monotonic())
+        with self._condition:
+            if self._closed:
+                return False
+            if self.policy == 'latest_per_section':
+                for index, queued in enumerate(self._items):
+                    if queued.section == section:
+                        # Keep its place in line and its enqueue time; only the newest content is worth sending
+                        self._items[index] = item._replace(enqueued=queued.enqueued)
+                        self._count('replaced')
+                        return True
+            if len(self._items) >= self.maxsize:
+                if self.policy == 'block':
+                    if not self._condition.wait_for(lambda: len(self._items) < self.maxsize or self._closed,
+                                                    self.block_timeout) or self._closed:
+                        self._count('dropped')
+                        return False
+                else:
+                    self._drop_oldest()
+            self._items.append(item)
+            self._unfinished += 1
+            self._count('enqueued')
+            self._publish_depth()
+            self._condition.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Outgoing]:
+        """Next report, or None on timeout or once the queue is closed and empty"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self._closed, timeout) or not self._items:
+                return None
+            item = self._items.popleft()
+            self._publish_depth()
+            self._condition.notify_all()
+        instrumentation.histogram('send_queue.wait').observe(time.monotonic() - item.enqueued)
+        return item
+
+    def task_done(self):
+        """Mark a report taken with get() as sent (or given up on)"""
+        with self._condition:
+            self._unfinished -= 1
+            self._condition.notify_all()
+
+    def close(self):
+        """Refuse new reports; queued ones can still be taken"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued report has been taken and marked done"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._unfinished <= 0, timeout)
+
+    def stats(self) -> Dict:
+        with self._condition:
+            return {
+                'depth': len(self._items),
+                'maxsize': self.maxsize,
+                'policy': self.policy,
+                **self._counts
+            }
+
+
+class QueueSender:
+    """Background thread draining a SendQueue through `send(payload)` one report at a time"""
+
+    def __init__(self, queue: SendQueue, send: Callable[[str], Awaitable[Optional[bool]]], send_timeout: float = 30.0):
+        self.queue = queue
+        self.send = send
+        self.send_timeout = send_timeout
+        self._thread = threading.Thread(target=self._run, name='send-queue', daemon=True)
+
+    def start(self) -> 'QueueSender':
+        self._thread.start()
+        return self
+
+    async def _send(self, item: Outgoing):
+        start = time.monotonic()
+        try:
+            ok = await asyncio.wait_for(self.send(item.payload), self.send_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Sending {item.section} timed out after {self.send_timeout}s")
+            ok = False
+        except Exception as e:
+            logger.error(f"Error sending {item.section}: {e}")
+            ok = False
+        instrumentation.histogram('send_queue.send_latency').observe(time.monotonic() - start)
+        self.queue.record_result(ok is not False)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    return
+                try:
+                    loop.run_until_complete(self._send(item))
+                finally:
+                    self.queue.task_done()
+        finally:
+            loop.close()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the queue is empty and nothing is in flight"""
+        return self.queue.join(timeout)
+
+    def stop(self, timeout: Optional[float] = None):
+        """Send what is queued, then stop the thread"""
+        self.queue.close()
+        self._thread.join(timeout)
@@ -0,0 +1,274 @@
+"""
+Latest snapshot shared between local processes through a memory-mapped file.
+
+The agent (one writer) publishes every sample it collects, as the same JSON
+bytes it sends to the server, into a per-user mapped file (in /dev/shm where
+it exists, so the pages never touch disk). The UI, dashboard and CLI tools map
+the same file and read the current sample instead of running their own psutil
+probes, so N viewers cost one sampler. A new writer takes over from the old
+one (carrying on its sequence); a publisher created with takeover=False (the
+UI) only publishes while no other live writer is attached (see active_writer).
+Every write holds an exclusive flock on the file, so writers in different
+processes never interleave inside the seqlock.
+
+Layout: a 64-byte header (magic, sequence, payload length, capacity, publish
+time, writer pid) followed by the payload. Writes follow a seqlock: the
+sequence goes odd, the payload and length are written, then the sequence goes
+even again. A reader copies the payload out of the shared pages (the only
+copy) and keeps it only if it saw the same even sequence before and after.
+Readers also cache the decoded document by sequence, so polling an unchanged
+snapshot costs one header read.
+"""
+import json
+import mmap
+import os
+import stat
+import struct
+import tempfile
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from instrumentation import registry as instrumentation
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'MCSNAP1\x00'
+# magic, sequence, payload length, capacity, publish time (epoch), writer pid
+HEADER = struct.Struct('<8sQQQdI')
+SEQUENCE = struct.Struct('<Q')
+SEQUENCE_OFFSET = 8
+PAYLOAD_OFFSET = 64
+DEFAULT_CAPACITY = 8 * 1024 * 1024
+_UID = os.getuid() if hasattr(os, 'getuid') else None
+# Per user, so one user's viewers never read (or another user pre-create) someone else's segment
+DEFAULT_PATH = os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+                            f"monitoring_client-{_UID if _UID is not None else os.environ.get('USERNAME', 'user')}.snapshot")
+# A snapshot older than this is treated as abandoned (the agent's longest interval is 60s)
+DEFAULT_MAX_AGE = 120.0
+
+
+class Snapshot(NamedTuple):
+    sequence: int
+    published: float
+    pid: int
+    data: bytes
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.published
+
+
+def _open_owned(path: str, flags: int, mode: int = 0o600) -> int:
+    """Open path without following symlinks; refuse anything but a regular file owned by us"""
+    fd = os.open(path, flags | getattr(os, 'O_NOFOLLOW', 0), mode)
+    try:
+        info = os.fstat(fd)
+        if not stat.S_ISREG(info.st_mode) or (_UID is not None and info.st_uid != _UID):
+            raise PermissionError(f"{path} is not a regular file owned by this user")
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def active_writer(path: str = DEFAULT_PATH) -> Optional[int]:
+    """Pid of another live process attached as the segment's writer, or None"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(header) < HEADER.size:
+        return None
+    magic, _, _, _, _, pid = HEADER.unpack(header)
+    if magic != MAGIC or not pid or pid == os.getpid() or not _alive(pid):
+        return None
+    return pid
+
+
+class SnapshotPublisher:
+    """
+    Writer of the shared segment. With takeover (the agent), attaching takes
+    the segment over from any previous writer; without it (the UI), publish()
+    is skipped while another live process is the writer. Writes are serialized
+    by a thread lock within the process and an flock across processes.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, capacity: int = DEFAULT_CAPACITY, takeover: bool = True):
+        self.path = path
+        self.takeover = takeover
+        self._lock = threading.Lock()
+        # Kept open for the publisher's lifetime: the flock is taken on it for every write
+        self._fd = _open_owned(path, os.O_RDWR | os.O_CREAT)
+        try:
+            with self._locked():
+                size = os.fstat(self._fd).st_size
+                if size < PAYLOAD_OFFSET + capacity:
+                    os.ftruncate(self._fd, PAYLOAD_OFFSET + capacity)
+                else:
+                    capacity = size - PAYLOAD_OFFSET
+                self._map = mmap.mmap(self._fd, PAYLOAD_OFFSET + capacity)
+                self.capacity = capacity
+                magic, sequence, length, _, published, _ = HEADER.unpack_from(self._map, 0)
+                if magic != MAGIC:
+                    sequence = length = 0
+                    published = 0.0
+                # Keep the previous writer's payload readable until our first publish, under a new sequence
+                if self.takeover or self._other_writer() is None:
+                    self._write(None, length, published)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    @contextmanager
+    def _locked(self):
+        """Thread lock plus an exclusive flock on the segment (no flock where fcntl is missing)"""
+        with self._lock:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _other_writer(self) -> Optional[int]:
+        """Pid of another live process that wrote the header last, or None"""
+        magic, _, _, _, _, pid = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or not pid or pid == os.getpid() or not _alive(pid):
+            return None
+        return pid
+
+    def _write(self, payload: Optional[bytes], length: int, published: float):
+        """One seqlock write, continuing from the sequence in the header (whoever wrote it last)"""
+        sequence = SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0]
+        sequence += sequence & 1  # a writer that died mid-write left it odd
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, sequence + 1)
+        if payload is not None:
+            self._map[PAYLOAD_OFFSET:PAYLOAD_OFFSET + length] = payload
+        HEADER.pack_into(self._map, 0, MAGIC, sequence + 1, length, self.capacity, published, os.getpid())
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, sequence + 2)
+
+    def publish(self, payload: bytes) -> bool:
+        if len(payload) > self.capacity:
+            logger.error(f"Snapshot of {len(payload)} bytes exceeds the {self.capacity} byte shared segment")
+            instrumentation.increment('snapshot.oversize')
+            return False
+        with self._locked():
+            # Checked under the flock, so a writer attaching after our caller's active_writer() still wins
+            if not self.takeover and self._other_writer() is not None:
+                instrumentation.increment('snapshot.yielded')
+                return False
+            self._write(payload, len(payload), time.time())
+        instrumentation.increment('snapshot.published')
+        return True
+
+    def publish_json(self, document: str) -> bool:
+        return self.publish(document.encode('utf-8'))
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+class SnapshotReader:
+    def __init__(self, path: str = DEFAULT_PATH, retries: int = 100):
+        self.path = path
+        self.retries = retries
+        self._map: Optional[mmap.mmap] = None
+        self._decoded: Optional[Dict] = None
+        self._decoded_sequence: Optional[int] = None
+        self._published = 0.0
+
+    def _open(self) -> bool:
+        try:
+            fd = _open_owned(self.path, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            size = os.fstat(fd).st_size
+            if size < PAYLOAD_OFFSET:
+                return False
+            self._map = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+            return True
+        except (OSError, ValueError):
+            return False
+        finally:
+            os.close(fd)
+
+    def read(self) -> Optional[Snapshot]:
+        """Latest consistent snapshot, or None if nothing has been published"""
+        if self._map is None and not self._open():
+            return None
+        for _ in range(self.retries):
+            magic, sequence, length, capacity, published, pid = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                return None
+            if PAYLOAD_OFFSET + capacity > len(self._map):
+                # A new writer made the segment bigger; map it again
+                self.close()
+                if not self._open():
+                    return None
+                continue
+            if sequence & 1 or length > capacity:
+                time.sleep(0)
+                continue
+            if length == 0:
+                return None  # a writer has attached but not published yet
+            data = self._map[PAYLOAD_OFFSET:PAYLOAD_OFFSET + length]
+            if SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0] == sequence:
+                return Snapshot(sequence, published, pid, data)
+            instrumentation.increment('snapshot.read_retries')
+        return None
+
+    def sequence(self) -> Optional[int]:
+        """Current sequence number, to check for a new publish without copying the payload"""
+        if self._map is None and not self._open():
+            return None
+        return SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0]
+
+    def read_json(self, max_age: Optional[float] = DEFAULT_MAX_AGE) -> Optional[Dict]:
+        """Decoded latest document, or None if there is none younger than max_age"""
+        if self._decoded is not None and self.sequence() == self._decoded_sequence:
+            return self._decoded if max_age is None or time.time() - self._published <= max_age else None
+        snapshot = self.read()
+        if snapshot is None or (max_age is not None and snapshot.age > max_age):
+            return None
+        self._decoded = json.loads(snapshot.data)
+        self._decoded_sequence = snapshot.sequence
+        self._published = snapshot.published
+        return self._decoded
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+def read_snapshot(path: str = DEFAULT_PATH, max_age: Optional[float] = DEFAULT_MAX_AGE) -> Optional[Dict]:
+    """One-off read of the published system_info (None if no agent published recently)"""
+    reader = SnapshotReader(path)
+    try:
+        return reader.read_json(max_age)
+    finally:
+        reader.close()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modules live at the repository root (see benchmarks/run.py)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
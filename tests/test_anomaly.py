@@ -0,0 +1,66 @@
+import random
+
+from anomaly import AnomalyDetector
+
+
+def sample(cpu, cores=None, memory=40.0):
+    return {'cpu': {'overall_usage': cpu, 'per_core_usage': cores or []}, 'memory': {'percent': memory}}
+
+
+def warm(detector, samples=60, seed=1):
+    rng = random.Random(seed)
+    for _ in range(samples):
+        assert detector.observe(sample(20 + rng.uniform(-2, 2))) == []
+
+
+def kinds(findings):
+    return [(finding['type'], finding['metric']) for finding in findings]
+
+
+def test_quiet_series_has_no_findings_and_learns_its_baseline():
+    detector = AnomalyDetector()
+    warm(detector)
+    baseline = detector.baseline('cpu.percent')
+    assert 18 < baseline['mean'] < 22
+    assert baseline['samples'] == 60
+    assert detector.baseline('absent') is None
+
+
+def test_spike_is_an_outlier_and_does_not_widen_the_band():
+    detector = AnomalyDetector()
+    warm(detector)
+    std = detector.baseline('cpu.percent')['std']
+    assert kinds(detector.observe(sample(95))) == [('Anomalous Reading', 'cpu.percent')]
+    assert detector.baseline('cpu.percent')['std'] == std
+    assert detector.observe(sample(20)) == []
+
+
+def test_nothing_is_reported_during_warmup():
+    detector = AnomalyDetector(warmup=30)
+    for value in [20.0] * 10 + [95.0]:
+        assert detector.observe(sample(value)) == []
+
+
+def test_sustained_change_is_a_level_shift():
+    detector = AnomalyDetector()
+    warm(detector)
+    findings = []
+    for _ in range(5):
+        findings = detector.observe(sample(70))
+    assert kinds(findings) == [('Level Shift', 'cpu.percent')]
+    assert findings[0]['score'] > 0
+
+
+def test_core_pinned_while_others_idle_is_an_imbalance():
+    detector = AnomalyDetector(imbalance_samples=3)
+    findings = []
+    for _ in range(3):
+        findings = detector.observe(sample(25.0, cores=[100.0, 0.0, 0.0, 0.0]))
+    assert ('Core Imbalance', 'core0') in kinds(findings)
+    assert detector.observe(sample(25.0, cores=[25.0, 25.0, 25.0, 25.0])) == []
+
+
+def test_partial_samples_are_tolerated():
+    detector = AnomalyDetector()
+    assert detector.observe({}) == []
+    assert detector.observe({'cpu': None, 'memory': {'percent': 'n/a'}}) == []
@@ -0,0 +1,111 @@
+import os
+import shutil
+
+import pytest
+
+from cgroups import CgroupCollector, detect_version, parse_blkio, parse_io_stat
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def v2_cgroup(root, path, usage_usec, memory, rbytes, wbytes, pids=3):
+    directory = os.path.join(root, path)
+    write(os.path.join(directory, 'cpu.stat'),
+          f"usage_usec {usage_usec}\nuser_usec {usage_usec // 2}\nsystem_usec {usage_usec // 2}\nthrottled_usec 0\n")
+    write(os.path.join(directory, 'memory.current'), f"{memory}\n")
+    write(os.path.join(directory, 'memory.max'), "max\n")
+    write(os.path.join(directory, 'io.stat'), f"8:0 rbytes={rbytes} wbytes={wbytes} rios=1 wios=1 dbytes=0 dios=0\n")
+    write(os.path.join(directory, 'pids.current'), f"{pids}\n")
+
+
+@pytest.fixture
+def v2_root(tmp_path):
+    root = str(tmp_path)
+    write(os.path.join(root, 'cgroup.controllers'), "cpu io memory pids\n")
+    v2_cgroup(root, 'system.slice/ssh.service', 1000000, 4096, 0, 0)
+    v2_cgroup(root, 'system.slice/cron.service', 0, 1024, 0, 0)
+    return root
+
+
+@pytest.fixture
+def v1_root(tmp_path):
+    root = str(tmp_path)
+    service = 'system.slice/ssh.service'
+    write(os.path.join(root, 'cpu,cpuacct', service, 'cpuacct.usage'), "2000000000\n")
+    write(os.path.join(root, 'cpu,cpuacct', service, 'cpuacct.stat'), "user 100\nsystem 50\n")
+    write(os.path.join(root, 'memory', service, 'memory.usage_in_bytes'), "8192\n")
+    write(os.path.join(root, 'memory', service, 'memory.limit_in_bytes'), "9223372036854771712\n")
+    write(os.path.join(root, 'blkio', service, 'blkio.throttle.io_service_bytes'),
+          "8:0 Read 4096\n8:0 Write 1024\n8:16 Read 4096\n8:0 Total 5120\nTotal 9216\n")
+    write(os.path.join(root, 'pids', service, 'pids.current'), "2\n")
+    return root
+
+
+def test_parse_io_stat_sums_devices():
+    text = "8:0 rbytes=100 wbytes=20 rios=1 wios=1\n8:16 rbytes=5 wbytes=1 rios=1 wios=1\n"
+    assert parse_io_stat(text) == (105, 21)
+    assert parse_io_stat(None) == (0, 0)
+
+
+def test_parse_blkio_skips_totals():
+    text = "8:0 Read 4096\n8:0 Write 1024\n8:0 Sync 5120\n8:0 Total 5120\nTotal 5120\n"
+    assert parse_blkio(text) == (4096, 1024)
+    assert parse_blkio('') == (0, 0)
+
+
+def test_detect_version(v2_root, tmp_path_factory):
+    assert detect_version(v2_root) == 'v2'
+    assert detect_version(str(tmp_path_factory.mktemp('empty'))) is None
+
+
+def test_detect_version_v1(v1_root):
+    assert detect_version(v1_root) == 'v1'
+
+
+def test_v2_sample_and_rates(v2_root):
+    collector = CgroupCollector(v2_root)
+    first = collector.sample(now=100.0)
+    ssh = first['/system.slice/ssh.service']
+    assert ssh == {'memory': 4096, 'pids': 3}  # memory.max 'max' means no limit
+
+    # One CPU-second and 1 MiB read over two seconds
+    v2_cgroup(v2_root, 'system.slice/ssh.service', 2000000, 4096, 1048576, 2048)
+    ssh = collector.sample(now=102.0)['/system.slice/ssh.service']
+    assert ssh['cpu_percent'] == pytest.approx(50.0)
+    assert ssh['io_read_per_second'] == pytest.approx(524288.0)
+    assert ssh['io_write_per_second'] == pytest.approx(1024.0)
+
+    top = collector.top(collector.sample(now=104.0), 'memory', 1)
+    assert [path for path, _ in top] == ['/system.slice/ssh.service']
+
+
+def test_v1_merges_controllers(v1_root):
+    collector = CgroupCollector(v1_root)
+    assert collector.version == 'v1'
+    ssh = collector.sample(now=10.0)['/system.slice/ssh.service']
+    # Unlimited v1 memory limit is dropped; blkio Total lines are not double counted
+    assert ssh == {'memory': 8192, 'pids': 2}
+    assert collector.read('/system.slice/ssh.service')['io_read'] == 8192
+
+    write(os.path.join(v1_root, 'cpu,cpuacct', 'system.slice/ssh.service', 'cpuacct.usage'), "3000000000\n")
+    ssh = collector.sample(now=12.0)['/system.slice/ssh.service']
+    assert ssh['cpu_percent'] == pytest.approx(50.0)
+
+
+def test_rescan_after_cgroup_disappears(v2_root):
+    collector = CgroupCollector(v2_root, rescan_interval=3600)
+    assert '/system.slice/cron.service' in collector.sample(now=1.0)
+
+    shutil.rmtree(os.path.join(v2_root, 'system.slice/cron.service'))
+    v2_cgroup(v2_root, 'system.slice/nginx.service', 0, 2048, 0, 0)
+    usage = collector.sample(now=2.0)
+    assert '/system.slice/cron.service' not in usage
+
+    # The vanished cgroup forces a rescan despite the long interval, which also finds the new one
+    usage = collector.sample(now=3.0)
+    assert '/system.slice/nginx.service' in usage
+    assert '/system.slice/cron.service' not in collector.cgroups()
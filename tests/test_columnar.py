@@ -0,0 +1,50 @@
+from columnar import ProcessColumns
+
+
+def snapshot():
+    columns = ProcessColumns()
+    columns.append(pid=1, ppid=0, rss=100, cpu_percent=5.0, name='init', user='root', status='sleeping')
+    columns.append(pid=2, ppid=1, rss=300, cpu_percent=20.0, name='web', user='www', status='running')
+    columns.append(pid=3, ppid=1, rss=200, cpu_percent=None, name='web', user='www', status='sleeping')
+    columns.append(pid=4, ppid=None, rss=None, cpu_percent=1.0, name='cron', user=None)
+    return columns.finalize()
+
+
+def test_missing_values_read_as_none():
+    columns = snapshot()
+    assert len(columns) == 4
+    assert columns.value('rss', 3) is None
+    assert columns.value('user', 3) is None
+    assert columns.rows(('pid', 'cpu_percent'))[2] == {'pid': 3, 'cpu_percent': None}
+
+
+def test_where_never_matches_missing_values():
+    columns = snapshot()
+    assert columns.indices(columns.where('cpu_percent', '<', 10)) == [0, 3]
+    assert columns.indices(columns.where('rss', '!=', 100)) == [1, 2]
+    # A literal -1 is not a way to select missing values
+    assert columns.indices(columns.where('ppid', '==', -1)) == []
+
+
+def test_equals_on_categorical_columns():
+    columns = snapshot()
+    assert columns.indices(columns.equals('name', 'web')) == [1, 2]
+    assert columns.indices(columns.equals('name', 'absent')) == []
+
+
+def test_top_and_take():
+    columns = snapshot()
+    top = columns.top('rss', 2)
+    assert [row['pid'] for row in top.rows(('pid',))] == [2, 3]
+    mine = columns.top('cpu_percent', 5, mask=columns.equals('user', 'www'))
+    assert [row['pid'] for row in mine.rows(('pid',))][0] == 2
+
+
+def test_group_by_skips_missing_values():
+    columns = snapshot()
+    assert columns.group_by('name', 'rss') == {'init': 100, 'web': 500}
+    assert columns.group_by('name', 'cpu_percent', 'count') == {'init': 1, 'web': 1, 'cron': 1}
+    assert columns.group_by('user', 'rss', 'max') == {'root': 100, 'www': 300}
+    assert columns.group_by('ppid', 'rss', 'mean') == {0: 100.0, 1: 250.0}
+    for value in columns.group_by('name', 'rss', 'min').values():
+        assert type(value) is int
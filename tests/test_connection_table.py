@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from connection_table import ConnectionTable
+
+HEADER = '  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n'
+
+
+def socket_line(inode, port=80):
+    return f'   0: 0100007F:{port:04X} 00000000:0000 0A 00000000:00000000 00:00000000 00000000  1000        0 {inode}\n'
+
+
+@pytest.fixture
+def proc(tmp_path):
+    """Fake /proc with one listening TCP socket (inode 100) held by pid 10 on fd 3"""
+    (tmp_path / 'net').mkdir()
+    for table in ('tcp6', 'udp', 'udp6'):
+        (tmp_path / 'net' / table).write_text(HEADER)
+    (tmp_path / 'net' / 'tcp').write_text(HEADER + socket_line(100))
+    open_fd(tmp_path, 10, 3, 100)
+    return tmp_path
+
+
+def open_fd(root, pid, fd, inode):
+    fd_dir = root / str(pid) / 'fd'
+    fd_dir.mkdir(parents=True, exist_ok=True)
+    os.symlink(f'socket:[{inode}]', fd_dir / str(fd))
+
+
+def test_sockets_are_joined_to_their_owner(proc):
+    table = ConnectionTable(str(proc))
+    connections = table.snapshot()
+    assert list(connections) == [10]
+    assert connections[10][0].fd == 3
+    assert connections[10][0].laddr == ('127.0.0.1', 80)
+    table.snapshot()
+    assert table.fd_scans == 1  # the cache answered the second cycle
+
+
+def test_owner_that_closed_its_fd_is_dropped(proc):
+    table = ConnectionTable(str(proc))
+    table.snapshot()
+    # pid 10 hands the socket to pid 20 and closes its own fd; the inode stays live
+    os.remove(proc / '10' / 'fd' / '3')
+    open_fd(proc, 20, 5, 100)
+    connections = table.snapshot()
+    assert list(connections) == [20]
+    assert connections[20][0].fd == 5
+
+
+def test_new_owners_are_found_on_the_rescan_interval(proc):
+    table = ConnectionTable(str(proc), rescan_interval=0)
+    table.snapshot()
+    # A forked child shares the socket; the cached owner is still valid
+    open_fd(proc, 11, 3, 100)
+    assert sorted(table.snapshot()) == [10, 11]
+    assert table.fd_scans == 2
@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import struct
+from datetime import datetime
+
+import package_inventory
+from package_inventory import (RPMTAG_INSTALLTIME, RPMTAG_NAME, RPMTAG_VENDOR, RPMTAG_VERSION, iter_dpkg_status,
+                               iter_rpm_sqlite, parse_registry_output, parse_rpm_query_output)
+
+DPKG_STATUS = """Package: bash
+Status: install ok installed
+Priority: required
+Architecture: amd64
+Maintainer: Bash Maintainers <bash@example.org>
+Version: 5.1-6
+Description: GNU Bourne Again SHell
+ Package: not-a-field continuation line
+
+Package: removed-tool
+Status: deinstall ok config-files
+Version: 1.0
+
+Package: zlib1g
+Status: install ok installed
+Architecture: amd64
+Version: 1:1.2.11
+"""
+
+
+def as_tuple(record):
+    return record.name, record.version, record.publisher, record.install_date
+
+
+def test_dpkg_status_keeps_installed_packages_only(tmp_path, monkeypatch):
+    status = tmp_path / 'status'
+    status.write_text(DPKG_STATUS)
+    info = tmp_path / 'info'
+    info.mkdir()
+    (info / 'bash:amd64.list').write_text('')
+    os.utime(info / 'bash:amd64.list', (0, datetime(2024, 3, 1, 12).timestamp()))
+    monkeypatch.setattr(package_inventory, 'DPKG_INFO_DIR', str(info))
+    records = [as_tuple(record) for record in iter_dpkg_status(str(status))]
+    assert records == [
+        ('bash', '5.1-6', 'Bash Maintainers <bash@example.org>', '2024-03-01'),
+        # Last stanza has no trailing blank line and no file list
+        ('zlib1g', '1:1.2.11', 'Unknown', None),
+    ]
+
+
+def test_rpm_query_output():
+    install_time = int(datetime(2024, 5, 2, 12).timestamp())
+    output = f"bash\t5.2.15\tFedora Project\t{install_time}\nkernel\t6.8.5\n\n"
+    assert [as_tuple(record) for record in parse_rpm_query_output(output)] == [
+        ('bash', '5.2.15', 'Fedora Project', '2024-05-02'),
+        ('kernel', '6.8.5', 'Unknown', None),
+    ]
+
+
+def rpm_header(strings, install_time=None):
+    """On-disk rpm header blob: index entries (tag, type, offset, count) followed by the data store"""
+    entries, data = [], b''
+    for tag, value in strings.items():
+        entries.append(struct.pack('>IIII', tag, 6, len(data), 1))
+        data += value.encode('utf-8') + b'\0'
+    if install_time is not None:
+        data += b'\0' * (-len(data) % 4)
+        entries.append(struct.pack('>IIII', RPMTAG_INSTALLTIME, 4, len(data), 1))
+        data += struct.pack('>I', install_time)
+    return struct.pack('>II', len(entries), len(data)) + b''.join(entries) + data
+
+
+def test_rpm_sqlite_headers(tmp_path):
+    install_time = int(datetime(2024, 5, 2, 12).timestamp())
+    path = str(tmp_path / 'rpmdb.sqlite')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE Packages (hnum INTEGER PRIMARY KEY, blob BLOB)')
+    for blob in (
+        rpm_header({RPMTAG_NAME: 'bash', RPMTAG_VERSION: '5.2.15', RPMTAG_VENDOR: 'Fedora Project'}, install_time),
+        rpm_header({RPMTAG_VERSION: '1.0'}),  # no name: skipped
+        b'\x00\x00',  # truncated: skipped
+        rpm_header({RPMTAG_NAME: 'gpg-pubkey'}),
+    ):
+        connection.execute('INSERT INTO Packages (blob) VALUES (?)', (blob,))
+    connection.commit()
+    connection.close()
+    assert [as_tuple(record) for record in iter_rpm_sqlite(path)] == [
+        ('bash', '5.2.15', 'Fedora Project', '2024-05-02'),
+        ('gpg-pubkey', 'Unknown', 'Unknown', None),
+    ]
+
+
+def test_registry_output():
+    output = (
+        "HKEY_LOCAL_MACHINE\\Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\{1}\n"
+        "    DisplayName    REG_SZ    7-Zip\n"
+        "    DisplayVersion    REG_SZ    19.00\n"
+        "    InstallDate    REG_SZ    20240301\n"
+        "\n"
+        "HKEY_LOCAL_MACHINE\\Software\\Microsoft\\Windows\\CurrentVersion\\Uninstall\\{2}\n"
+        "    DisplayName    REG_SZ    Tool\n"
+        "    InstallDate    REG_SZ    soon\n"
+    )
+    assert [as_tuple(record) for record in parse_registry_output(output)] == [
+        ('7-Zip', '19.00', None, '2024-03-01'),
+        ('Tool', None, None, 'soon'),
+    ]
+
+
+def test_inventory_is_reparsed_only_when_the_file_changes(tmp_path):
+    status = tmp_path / 'status'
+    status.write_text(DPKG_STATUS)
+    calls = []
+
+    def loader(path):
+        calls.append(path)
+        return iter_dpkg_status(path)
+
+    package_inventory.clear_cache()
+    try:
+        first = package_inventory._cached(str(status), loader)
+        assert package_inventory._cached(str(status), loader) == first
+        assert len(calls) == 1
+        status.write_text(DPKG_STATUS.split('\n\n')[0] + '\n')
+        assert [record.name for record in package_inventory._cached(str(status), loader)] == ['bash']
+        assert len(calls) == 2
+    finally:
+        package_inventory.clear_cache()
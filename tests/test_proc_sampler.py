@@ -0,0 +1,103 @@
+import pytest
+
+from proc_sampler import DISKSTATS_SECTOR_SIZE, ProcSampler
+
+pytestmark = pytest.mark.skipif(not ProcSampler.is_supported(), reason='needs Linux /proc and os.preadv')
+
+STAT = """cpu  200 0 100 1000 0 0 0 0 0 0
+cpu0 100 0 50 500 0 0 0 0 0 0
+cpu1 100 0 50 500 0 0 0 0 0 0
+intr 12345
+"""
+
+MEMINFO = """MemTotal:        1000 kB
+MemFree:          200 kB
+MemAvailable:     400 kB
+Buffers:           10 kB
+Cached:           100 kB
+SwapTotal:        500 kB
+SwapFree:         400 kB
+SReclaimable:      20 kB
+"""
+
+NET_DEV = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo:     100       1    0    0    0     0          0         0      100       1    0    0    0     0       0          0
+  eth0:    1000      10    1    2    0     0          0         0     2000      20    3    4    0     0       0          0
+"""
+
+DISKSTATS = """   8       0 sda 10 0 100 0 20 0 200 0 0 0 0
+   8       1 sda1 5 0 50 0 10 0 100 0 0 0 0
+"""
+
+
+@pytest.fixture
+def proc(tmp_path):
+    root = tmp_path / 'proc'
+    (root / 'net').mkdir(parents=True)
+    (root / 'stat').write_text(STAT)
+    (root / 'meminfo').write_text(MEMINFO)
+    (root / 'net' / 'dev').write_text(NET_DEV)
+    (root / 'diskstats').write_text(DISKSTATS)
+    (tmp_path / 'block' / 'sda').mkdir(parents=True)
+    return tmp_path
+
+
+def sampler(proc, **kwargs):
+    return ProcSampler(str(proc / 'proc'), str(proc / 'block'), **kwargs)
+
+
+def test_cpu_percent_per_core_since_last_call(proc):
+    reader = sampler(proc)
+    # cpu0: 10 busy of 20 jiffies; cpu1: all 20 idle
+    (proc / 'proc' / 'stat').write_text(STAT.replace('cpu0 100 0 50 500', 'cpu0 110 0 50 510')
+                                        .replace('cpu1 100 0 50 500', 'cpu1 100 0 50 520'))
+    assert reader.cpu_percent(min_interval=0) == [50.0, 0.0]
+    # Unchanged counters read as idle rather than dividing by zero
+    assert reader.cpu_percent(min_interval=0) == [0.0, 0.0]
+    reader.close()
+
+
+def test_memory_matches_psutil_formulas(proc):
+    reader = sampler(proc)
+    memory = reader.memory()
+    assert memory['total'] == 1000 * 1024
+    assert memory['available'] == 400 * 1024
+    assert memory['used'] == 600 * 1024
+    assert memory['percent'] == 60.0
+    assert memory['swap_used'] == 100 * 1024
+    assert memory['swap_percent'] == 20.0
+    reader.close()
+
+
+def test_memory_without_memavailable(proc):
+    (proc / 'proc' / 'meminfo').write_text(MEMINFO.replace('MemAvailable:     400 kB\n', ''))
+    reader = sampler(proc)
+    # free + buffers + cached + reclaimable
+    assert reader.memory()['available'] == (200 + 10 + 100 + 20) * 1024
+    reader.close()
+
+
+def test_network_sums_interfaces(proc):
+    reader = sampler(proc)
+    assert reader.network() == {
+        'bytes_sent': 2100, 'bytes_recv': 1100, 'packets_sent': 21, 'packets_recv': 11,
+        'errin': 1, 'errout': 3, 'dropin': 2, 'dropout': 4,
+    }
+    reader.close()
+
+
+def test_disk_io_skips_partitions(proc):
+    reader = sampler(proc)
+    assert reader.disk_io() == {
+        'read_count': 10, 'write_count': 20,
+        'read_bytes': 100 * DISKSTATS_SECTOR_SIZE, 'write_bytes': 200 * DISKSTATS_SECTOR_SIZE,
+    }
+    reader.close()
+
+
+def test_buffer_grows_for_large_files(proc):
+    reader = sampler(proc, buffer_size=16)
+    assert reader.network()['bytes_recv'] == 1100
+    assert reader.memory()['total'] == 1000 * 1024
+    reader.close()
@@ -0,0 +1,81 @@
+import random
+
+from columnar import ProcessColumns
+from process_tree import TREE_METRICS, ProcessTree
+
+
+def brute_force_totals(processes, pid):
+    """Subtree totals by walking every process's parent chain"""
+    def under(candidate):
+        seen = set()
+        while candidate is not None and candidate not in seen:
+            if candidate == pid:
+                return True
+            seen.add(candidate)
+            candidate = processes.get(candidate, {}).get('ppid')
+        return False
+    members = [p for p in processes if under(p)]
+    totals = {name: sum(processes[p].get(name, 0) for p in members) for name in TREE_METRICS}
+    totals['process_count'] = len(members)
+    return totals
+
+
+def test_children_before_parent_are_adopted():
+    tree = ProcessTree()
+    tree.add(3, 2, rss=30)
+    tree.add(2, 1, rss=20)
+    tree.add(1, None, rss=10)
+    assert tree.roots() == [1]
+    assert sorted(tree.descendants(1)) == [2, 3]
+    assert tree.subtree_totals(1)['rss'] == 60
+    assert tree.subtree_totals(1)['process_count'] == 3
+
+
+def test_update_remove_and_reparent_keep_totals_in_step():
+    tree = ProcessTree()
+    for pid, ppid in ((1, None), (2, 1), (3, 2), (4, 1)):
+        tree.add(pid, ppid, cpu_percent=1.0, rss=pid * 100)
+    tree.update(3, 2, cpu_percent=5.0, rss=300)
+    assert tree.subtree_totals(1)['cpu_percent'] == 8.0
+    tree.update(3, 4, cpu_percent=5.0, rss=300)
+    assert tree.subtree_totals(2)['rss'] == 200
+    assert tree.subtree_totals(4)['rss'] == 700
+    tree.remove(4)
+    # The orphan stays as a root until it reports a new parent
+    assert sorted(tree.roots()) == [1, 3]
+    assert tree.subtree_totals(1)['process_count'] == 2
+
+
+def test_cycles_and_missing_values_are_rejected():
+    tree = ProcessTree()
+    tree.add(1, 2)
+    tree.add(2, 1)  # would close a loop
+    tree.add(5, 5)
+    assert tree.parent(2) is None
+    assert tree.parent(5) is None
+    tree.add(6, 1, rss=-1, cpu_percent=None)
+    assert tree.own_totals(6)['rss'] == 0
+
+
+def test_sync_matches_brute_force():
+    rng = random.Random(7)
+    tree = ProcessTree()
+    processes = {}
+    for _ in range(5):
+        # Random churn: some processes exit, new ones appear (pids get reused), the rest change.
+        # Parents always have lower pids, so reused pids never form a cycle.
+        for pid in list(processes):
+            if rng.random() < 0.2:
+                del processes[pid]
+        for pid in range(rng.randint(1, 40), 60, rng.randint(2, 5)):
+            if pid not in processes:
+                processes[pid] = {'ppid': rng.choice([0] + [p for p in processes if p < pid]) or None}
+        for values in processes.values():
+            values.update(rss=rng.randint(0, 1000), cpu_percent=float(rng.randint(0, 100)), num_threads=1)
+        columns = ProcessColumns()
+        for pid, values in processes.items():
+            columns.append(pid=pid, **values)
+        tree.sync(columns.finalize())
+        assert len(tree) == len(processes)
+        for pid in processes:
+            assert tree.subtree_totals(pid) == brute_force_totals(processes, pid)
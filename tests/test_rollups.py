@@ -0,0 +1,128 @@
+import math
+import time
+
+import pytest
+
+from rollups import RollupStore, flatten, to_epoch
+
+
+@pytest.fixture
+def base():
+    # Two hours ago, aligned to the hour so minute and hour buckets line up with the samples
+    return (time.time() // 3600 - 2) * 3600
+
+
+def fill(store, base, minutes=3):
+    """One sample per second; cpu.percent is 10 * minute + second / 60, so each minute's max is known"""
+    for second in range(minutes * 60):
+        minute = second // 60
+        store.add_row(base + second, {
+            'cpu.percent': 10.0 * minute + (second % 60) / 60,
+            'disk.percent:/': 50.0,
+            'disk.percent:/home': 70.0 + minute,
+        })
+
+
+def test_flatten_picks_gauges():
+    row = flatten({
+        'cpu': {'overall_usage': 12.5},
+        'memory': {'percent': 40, 'used': 1024},
+        'disks': [{'mountpoint': '/', 'percent': 55.0}],
+        'system': {'battery': None},
+    })
+    assert row == {'cpu.percent': 12.5, 'memory.percent': 40.0, 'memory.used': 1024.0, 'disk.percent:/': 55.0}
+
+
+def test_to_epoch():
+    assert to_epoch('-15m', now=10000.0) == 10000.0 - 900
+    assert to_epoch(None) is None
+    assert to_epoch(123.0) == 123.0
+
+
+def test_raw_query_range(base):
+    store = RollupStore()
+    fill(store, base)
+    result = store.query(['cpu.percent'], base + 60, base + 119, resolution='raw')
+    assert result['resolution'] == 'raw'
+    assert len(result['time']) == 60
+    assert result['time'][0] == base + 60
+    assert result['columns']['cpu.percent'][0] == 10.0
+
+
+def test_minute_rollups(base):
+    store = RollupStore()
+    fill(store, base)
+    # Minutes 0 and 1 are closed; minute 2 is still the open bucket
+    result = store.query(['cpu.percent'], base, base + 180, resolution='minute', aggregate='max')
+    assert list(result['time']) == [base, base + 60]
+    assert list(result['columns']['cpu.percent']) == [pytest.approx(59 / 60), pytest.approx(10 + 59 / 60)]
+    low = store.query(['cpu.percent'], base, base + 180, resolution='minute', aggregate='min')
+    assert list(low['columns']['cpu.percent']) == [0.0, 10.0]
+
+
+def test_glob_and_missing_metrics(base):
+    store = RollupStore()
+    fill(store, base, minutes=1)
+    result = store.query(['disk.percent:*', 'swap.percent'], base, base + 10, resolution='raw')
+    assert list(result['columns']) == ['disk.percent:/', 'disk.percent:/home', 'swap.percent']
+    assert all(math.isnan(value) for value in result['columns']['swap.percent'])
+
+
+def test_summarize(base):
+    store = RollupStore()
+    fill(store, base)
+    summary = store.summarize(['cpu.percent', 'swap.percent'], base, base + 179, how='max', resolution='raw')
+    assert summary == {'cpu.percent': pytest.approx(20 + 59 / 60), 'swap.percent': None}
+    assert store.summarize(['disk.percent:/home'], base, base + 179, how='last', resolution='raw') == \
+        {'disk.percent:/home': 72.0}
+
+
+def test_pick_tier():
+    store = RollupStore()
+    now = time.time()
+    assert store.pick_tier(now - 600, now=now).name == 'raw'
+    assert store.pick_tier(now - 6 * 3600, now=now).name == 'minute'
+    assert store.pick_tier(now - 7 * 86400, now=now).name == 'hour'
+    with pytest.raises(ValueError):
+        store.pick_tier(None, resolution='second')
+
+
+def test_save_and_load(tmp_path, base):
+    store = RollupStore()
+    fill(store, base)
+    path = str(tmp_path / 'history.json.gz')
+    assert store.save(path)
+    restored = RollupStore()
+    assert restored.load(path)
+    assert restored.metrics() == store.metrics()
+    original = store.query(['cpu.percent'], base, base + 180, resolution='minute')
+    loaded = restored.query(['cpu.percent'], base, base + 180, resolution='minute')
+    assert list(loaded['time']) == list(original['time'])
+
+
+def test_save_to_missing_directory_fails_cleanly(tmp_path):
+    assert not RollupStore().save(str(tmp_path / 'missing' / 'history.json.gz'))
+    assert not RollupStore().load(str(tmp_path / 'missing' / 'history.json.gz'))
+
+
+def test_instance_metrics_leave_room_for_core_gauges():
+    store = RollupStore(max_metrics=8, max_instance_metrics=4)
+    row = {f'disk.percent:/snap/{i}': 1.0 for i in range(10)}
+    row['network.recv_per_second'] = 10.0
+    store.add_row(time.time(), row)
+    metrics = store.metrics()
+    assert 'network.recv_per_second' in metrics
+    assert sum(':' in name for name in metrics) == 4
+
+
+def test_expired_instance_metrics_are_released():
+    store = RollupStore(tiers=(('raw', 1, 10),), max_instance_metrics=1)
+    store.add_row(0, {'disk.percent:/media/old': 1.0})
+    store.add_row(1, {'disk.percent:/media/new': 1.0})
+    assert 'disk.percent:/media/new' not in store.metrics()
+    # Fill past the first block so it (and the only row for /media/old) expires
+    for second in range(2, 300):
+        store.add_row(second, {'cpu.percent': 1.0})
+    assert store.metrics() == ['cpu.percent']
+    store.add_row(300, {'disk.percent:/media/new': 1.0})
+    assert 'disk.percent:/media/new' in store.metrics()
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from records import SoftwareRecord, to_serializable
+from section_serializer import SectionSerializer
+
+DOCUMENT = {
+    'hostname': 'host',
+    'os_info': {'system': 'Linux', 'release': '6.8'},
+    'installed_software': [SoftwareRecord('bash', '5.2', 'GNU'), SoftwareRecord('zlib')],
+    'performance_metrics': {'cpu': {'per_core': [1.5, 2.0]}, 'disks': []},
+    'empty': {},
+    'unicode': 'café ✓',
+    'serial_number': None,
+}
+
+
+@pytest.mark.parametrize('indent, separators', [
+    (2, None), (None, None), (4, None), ('\t', None), (None, (',', ':')), (2, (',', ': ')),
+])
+def test_matches_json_dumps(indent, separators):
+    serializer = SectionSerializer(default=to_serializable)
+    expected = json.dumps(DOCUMENT, indent=indent, separators=separators, default=to_serializable)
+    assert serializer.encode(DOCUMENT, indent=indent, separators=separators) == expected
+    # The second, fully cached encode is identical too
+    assert serializer.encode(DOCUMENT, indent=indent, separators=separators) == expected
+
+
+def test_empty_document():
+    assert SectionSerializer().encode({}, indent=2) == json.dumps({}, indent=2)
+
+
+def test_new_objects_are_reencoded_and_in_place_changes_need_invalidate():
+    serializer = SectionSerializer()
+    document = {'a': {'x': 1}, 'b': [1]}
+    serializer.encode(document, indent=2)
+    document['a'] = {'x': 2}
+    assert serializer.encode(document, indent=2) == json.dumps(document, indent=2)
+    document['b'].append(2)
+    assert serializer.encode(document, indent=2) != json.dumps(document, indent=2)
+    serializer.invalidate('b')
+    assert serializer.encode(document, indent=2) == json.dumps(document, indent=2)
+
+
+def test_changed_sections():
+    serializer = SectionSerializer()
+    document = {'a': {'x': 1}, 'b': [1]}
+    previous = serializer.section_hashes(document, indent=2)
+    assert serializer.changed_sections(document, previous, indent=2) == []
+    # A fresh but equal object hashes the same; only real content changes count
+    document['a'] = {'x': 1}
+    document['b'] = [2]
+    document['c'] = True
+    assert serializer.changed_sections(document, previous, indent=2) == ['b', 'c']
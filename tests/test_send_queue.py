@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from send_queue import QueueSender, SendQueue
+
+
+def drain(queue):
+    items = []
+    while len(queue):
+        items.append(queue.get(timeout=0))
+        queue.task_done()
+    return items
+
+
+def test_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        SendQueue(policy='drop_newest')
+
+
+def test_drop_oldest_keeps_newest():
+    queue = SendQueue(maxsize=2, policy='drop_oldest')
+    for payload in ('a', 'b', 'c'):
+        assert queue.put(payload)
+    assert [item.payload for item in drain(queue)] == ['b', 'c']
+    assert queue.join(timeout=0)
+
+
+def test_latest_per_section_replaces_in_place():
+    queue = SendQueue(maxsize=3, policy='latest_per_section')
+    queue.put('info-1', section='device_info')
+    queue.put('inv-1', section='inventory')
+    first = queue._items[0].enqueued
+    queue.put('info-2', section='device_info')
+    items = drain(queue)
+    assert [(item.section, item.payload) for item in items] == [('device_info', 'info-2'), ('inventory', 'inv-1')]
+    assert items[0].enqueued == first  # keeps its place in line and its age
+
+
+def test_latest_per_section_evicts_oldest_when_full():
+    queue = SendQueue(maxsize=2, policy='latest_per_section')
+    for section in ('a', 'b', 'c'):
+        queue.put(section, section=section)
+    assert [item.section for item in drain(queue)] == ['b', 'c']
+
+
+def test_block_times_out_when_full():
+    queue = SendQueue(maxsize=1, policy='block', block_timeout=0.05)
+    assert queue.put('a')
+    started = time.monotonic()
+    assert not queue.put('b')
+    assert time.monotonic() - started >= 0.05
+    assert [item.payload for item in drain(queue)] == ['a']
+
+
+def test_block_waits_for_room():
+    queue = SendQueue(maxsize=1, policy='block', block_timeout=5)
+    queue.put('a')
+    threading.Timer(0.05, lambda: (queue.get(), queue.task_done())).start()
+    assert queue.put('b')
+    assert [item.payload for item in drain(queue)] == ['b']
+
+
+def test_closed_queue_refuses_and_drains():
+    queue = SendQueue(maxsize=2)
+    queue.put('a')
+    queue.close()
+    assert not queue.put('b', section='other')
+    assert queue.get(timeout=0).payload == 'a'
+    assert queue.get(timeout=0) is None
+
+
+def test_sender_sends_in_order_and_flushes():
+    sent = []
+
+    async def send(payload):
+        await asyncio.sleep(0.01)
+        sent.append(payload)
+        return True
+
+    queue = SendQueue(maxsize=4, policy='drop_oldest')
+    sender = QueueSender(queue, send).start()
+    for payload in ('a', 'b', 'c'):
+        queue.put(payload)
+    assert sender.flush(timeout=5)
+    assert sent == ['a', 'b', 'c']
+    assert queue.stats()['sent'] == 3
+    sender.stop(timeout=5)
+
+
+def test_sender_gives_up_after_send_timeout():
+    async def send(payload):
+        await asyncio.sleep(10)
+
+    queue = SendQueue(maxsize=1)
+    sender = QueueSender(queue, send, send_timeout=0.05).start()
+    queue.put('a')
+    assert sender.flush(timeout=5)
+    assert queue.stats()['failed'] == 1
+    sender.stop(timeout=5)
+
+
+def test_stats_are_per_queue():
+    first = SendQueue(maxsize=1, policy='drop_oldest')
+    second = SendQueue(maxsize=1, policy='drop_oldest')
+    for payload in ('a', 'b', 'c'):
+        first.put(payload)
+    assert first.stats()['enqueued'] == 3
+    assert first.stats()['dropped'] == 2
+    assert second.stats() == {'depth': 0, 'maxsize': 1, 'policy': 'drop_oldest',
+                              'enqueued': 0, 'replaced': 0, 'dropped': 0, 'sent': 0, 'failed': 0}
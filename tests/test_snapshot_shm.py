@@ -0,0 +1,112 @@
+import fcntl
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import snapshot_shm
+from snapshot_shm import SEQUENCE, SEQUENCE_OFFSET, SnapshotPublisher, SnapshotReader, active_writer, read_snapshot
+
+
+def test_publish_and_read_json(tmp_path):
+    path = str(tmp_path / 'segment')
+    publisher = SnapshotPublisher(path, capacity=1024)
+    assert SnapshotReader(path).read() is None  # attached, nothing published yet
+    assert publisher.publish_json('{"a": 1}')
+    assert read_snapshot(path) == {'a': 1}
+    publisher.close()
+
+
+def test_oversize_payload_is_refused(tmp_path):
+    publisher = SnapshotPublisher(str(tmp_path / 'segment'), capacity=8)
+    assert not publisher.publish(b'x' * 9)
+    publisher.close()
+
+
+def test_reader_retries_while_write_in_progress(tmp_path, monkeypatch):
+    path = str(tmp_path / 'segment')
+    publisher = SnapshotPublisher(path, capacity=1024)
+    publisher.publish(b'old')
+    sequence = SEQUENCE.unpack_from(publisher._map, SEQUENCE_OFFSET)[0]
+    # Leave the sequence odd, as a writer would mid-write
+    SEQUENCE.pack_into(publisher._map, SEQUENCE_OFFSET, sequence + 1)
+    reader = SnapshotReader(path, retries=5)
+    assert reader.read() is None
+
+    def finish_write(_):
+        publisher._write(b'new', 3, time.time())
+
+    # The reader's first back-off completes the write; the retry then sees a consistent payload
+    monkeypatch.setattr(snapshot_shm.time, 'sleep', finish_write)
+    snapshot = reader.read()
+    assert snapshot.data == b'new'
+    assert snapshot.sequence % 2 == 0
+    publisher.close()
+
+
+def test_reader_caches_decoded_document_by_sequence(tmp_path):
+    path = str(tmp_path / 'segment')
+    publisher = SnapshotPublisher(path, capacity=1024)
+    publisher.publish_json('{"a": 1}')
+    reader = SnapshotReader(path)
+    first = reader.read_json()
+    assert reader.read_json() is first
+    publisher.publish_json('{"a": 2}')
+    assert reader.read_json() == {'a': 2}
+    publisher.close()
+
+
+def test_new_writer_takes_over_sequence_and_payload(tmp_path):
+    path = str(tmp_path / 'segment')
+    first = SnapshotPublisher(path, capacity=1024)
+    first.publish(b'first')
+    sequence = SnapshotReader(path).read().sequence
+    first.close()
+
+    second = SnapshotPublisher(path, capacity=1024)
+    handed_over = SnapshotReader(path).read()
+    assert handed_over.data == b'first'
+    assert handed_over.sequence > sequence
+    second.publish(b'second')
+    assert SnapshotReader(path).read().data == b'second'
+    second.close()
+
+
+def test_publisher_without_takeover_yields_to_live_writer(tmp_path):
+    path = str(tmp_path / 'segment')
+    agent = subprocess.Popen(
+        [sys.executable, '-c',
+         'import sys; from snapshot_shm import SnapshotPublisher; '
+         'p = SnapshotPublisher(sys.argv[1], capacity=1024); p.publish(b"agent"); '
+         'print("ready", flush=True); sys.stdin.read()', path],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    try:
+        assert agent.stdout.readline().strip() == 'ready'
+        assert active_writer(path) == agent.pid
+        ui = SnapshotPublisher(path, capacity=1024, takeover=False)
+        assert not ui.publish(b'ui')
+        assert SnapshotReader(path).read().data == b'agent'
+    finally:
+        agent.communicate('')
+    # Once the agent has exited the UI may publish again
+    assert ui.publish(b'ui')
+    assert SnapshotReader(path).read().data == b'ui'
+    ui.close()
+
+
+def test_publish_waits_for_the_segment_flock(tmp_path):
+    path = str(tmp_path / 'segment')
+    publisher = SnapshotPublisher(path, capacity=1024)
+    with open(path, 'rb') as other:
+        fcntl.flock(other, fcntl.LOCK_EX)
+        writer = threading.Thread(target=publisher.publish, args=(b'locked',))
+        writer.start()
+        writer.join(0.2)
+        assert writer.is_alive()  # blocked behind the other writer's lock
+        fcntl.flock(other, fcntl.LOCK_UN)
+    writer.join(5)
+    assert not writer.is_alive()
+    assert SnapshotReader(path).read().data == b'locked'
+    publisher.close()
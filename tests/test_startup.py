@@ -0,0 +1,13 @@
+from benchmarks.bench_startup import HEAVY_MODULES, check_startup
+
+BUDGET_MS = 150.0
+
+
+def test_help_imports_no_heavy_modules():
+    _, _, heavy = check_startup(['--help'])
+    assert heavy == [], f"heavy modules imported by `cli.py --help`: {heavy} (banned: {HEAVY_MODULES})"
+
+
+def test_help_within_import_budget():
+    _, total_ms, _ = check_startup(['--help'])
+    assert total_ms <= BUDGET_MS
@@ -0,0 +1,125 @@
+"""
+Local WebSocket stub that speaks the device-tracker handshake used by
+send_device_info: send a device_id on connect, then acknowledge each message.
+Given payload_compression dictionaries, it accepts the matching handshake
+header and inflates the binary frames compressed with them.
+
+Used by the benchmarks and load tools; can also be run standalone:
+    python ws_stub_server.py [--host 127.0.0.1] [--port 8765]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import threading
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+from payload_compression import DICTIONARY_HEADER
+
+logger = logging.getLogger(__name__)
+
+
+class StubServer:
+    """Device-tracker WebSocket stub with simple connection/message counters"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, dictionaries: Iterable = ()):
+        self.host = host
+        self.port = port
+        self.dictionaries = {dictionary.id: dictionary for dictionary in dictionaries}
+        self.stats = {'connections': 0, 'messages': 0, 'bytes_received': 0, 'bytes_decoded': 0}
+        self._device_ids = itertools.count(1)
+        self._server = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._stopped: Optional[asyncio.Event] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws/device-tracker/"
+
+    async def _handler(self, websocket, path=None):
+        self.stats['connections'] += 1
+        # websockets >= 14 exposes the handshake as .request; older versions as .request_headers
+        request = getattr(websocket, 'request', None)
+        headers = request.headers if request is not None else websocket.request_headers
+        dictionary = self.dictionaries.get(headers.get(DICTIONARY_HEADER))
+        established = {
+            'type': 'connection_established',
+            'device_id': next(self._device_ids)
+        }
+        if dictionary is not None:
+            established['payload_dictionary'] = dictionary.id
+        await websocket.send(json.dumps(established))
+        try:
+            async for message in websocket:
+                self.stats['messages'] += 1
+                self.stats['bytes_received'] += len(message)
+                if isinstance(message, bytes) and dictionary is not None:
+                    message = dictionary.decompress(message)
+                self.stats['bytes_decoded'] += len(message)
+                await websocket.send(json.dumps({'type': 'ack', 'status': 'received'}))
+        except Exception as e:
+            logger.debug(f"Stub connection closed: {e}")
+
+    async def start(self):
+        """Start serving on the current event loop"""
+        import websockets
+
+        self._server = await websockets.serve(self._handler, self.host, self.port, max_size=None)
+        self.port = next(iter(self._server.sockets)).getsockname()[1]
+        logger.info(f"WebSocket stub listening on {self.url}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self):
+        await self.start()
+        self._stopped = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._ready.set()
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.stop()
+
+    def start_in_thread(self) -> Tuple[str, int]:
+        """Run the stub on its own event loop in a daemon thread"""
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.serve_forever()), daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self.host, self.port
+
+    def stop_thread(self):
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def snapshot_stats(self) -> Dict[str, int]:
+        return dict(self.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local device-tracker WebSocket stub')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--dictionary', action='append', default=[], help='Accept payloads compressed with this zdict')
+    args = parser.parse_args()
+
+    from payload_compression import PayloadDictionary
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    dictionaries = [PayloadDictionary.load(path) for path in args.dictionary]
+    try:
+        asyncio.run(StubServer(args.host, args.port, dictionaries).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()